@@ -32,3 +32,27 @@ def log_action(
         )
     except Exception:
         pass
+
+
+def log_actions(
+    actor,
+    entries,         # iterable of (action, target_repr, detail)
+    ip_address: str | None = None,
+) -> None:
+    """Create many AuditLog entries with one bulk insert. Never raises."""
+    try:
+        from .models import AuditLog
+        user = actor if (actor and actor.pk) else None
+        AuditLog.objects.bulk_create([
+            AuditLog(
+                user=user,
+                action=action,
+                level=AuditLog.ACTION_LEVELS.get(action, AuditLog.LEVEL_IMPORTANT),
+                target_repr=target_repr[:500] if target_repr else '',
+                detail=detail,
+                ip_address=ip_address,
+            )
+            for action, target_repr, detail in entries
+        ], batch_size=500)
+    except Exception:
+        pass
@@ -0,0 +1,130 @@
+"""Management command: ย้าย audit log ของเดือนที่ปิดแล้วไปเก็บใน AuditLogArchive"""
+import json
+import zlib
+from datetime import date, datetime, time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+
+from apps.accounts.models import AuditLog, AuditLogArchive
+
+ARCHIVE_FIELDS = (
+    'id', 'user_id', 'user__username', 'action', 'level', 'target_repr',
+    'detail', 'ip_address', 'created_at', 'target_user_id',
+)
+
+
+def _add_months(d: date, months: int) -> date:
+    total = d.year * 12 + (d.month - 1) + months
+    return date(total // 12, total % 12 + 1, 1)
+
+
+def _aware(d: date):
+    return timezone.make_aware(datetime.combine(d, time.min))
+
+
+class Command(BaseCommand):
+    help = "Archive audit logs of closed months into compressed monthly rows (run weekly; idempotent)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--keep-months',
+            type=int,
+            default=getattr(settings, 'AUDIT_LOG_RETENTION_MONTHS', 12),
+            help='Number of recent months to keep in the live table (default: AUDIT_LOG_RETENTION_MONTHS)',
+        )
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Print months that would be archived without changing anything',
+        )
+
+    def handle(self, *args, **options):
+        keep = max(options['keep_months'], 1)
+        batch_size = options['batch_size']
+        dry_run = options['dry_run']
+
+        this_month = timezone.localdate().replace(day=1)
+        cutoff = _add_months(this_month, -keep)
+
+        oldest = AuditLog.objects.order_by('created_at').values_list('created_at', flat=True).first()
+        if oldest is None or timezone.localtime(oldest).date() >= cutoff:
+            self.stdout.write('Nothing to archive.')
+            return
+
+        month = timezone.localtime(oldest).date().replace(day=1)
+        total = 0
+        while month < cutoff:
+            next_month = _add_months(month, 1)
+            live = AuditLog.objects.filter(
+                created_at__gte=_aware(month), created_at__lt=_aware(next_month),
+            )
+            if dry_run:
+                count = live.count()
+                if count:
+                    self.stdout.write(f'[DRY-RUN] {month:%Y-%m}: {count} rows')
+                total += count
+            else:
+                total += self._archive_month(month, live, batch_size)
+            month = next_month
+
+        self.stdout.write(self.style.SUCCESS(f'Done — archived {total} rows (before {cutoff:%Y-%m}).'))
+
+    def _archive_month(self, month, live, batch_size):
+        archive = AuditLogArchive.objects.filter(month=month).first()
+        already_archived = archive.last_id if archive else 0
+
+        # รอบก่อนอาจหยุดกลางคันหลังบันทึก archive แล้ว — ลบแถวที่เก็บไปแล้วก่อน
+        if already_archived:
+            self._delete(live.filter(id__lte=already_archived), batch_size)
+
+        pending = live.filter(id__gt=already_archived)
+        compressor = zlib.compressobj(9)
+        chunks = []
+        action_counts = dict(archive.action_counts) if archive else {}
+        count = 0
+        first_id = archive.first_id if archive else 0
+        last_id = already_archived
+
+        if archive:
+            chunks.append(compressor.compress(zlib.decompress(bytes(archive.payload))))
+
+        for row in pending.order_by('id').values(*ARCHIVE_FIELDS).iterator(chunk_size=batch_size):
+            line = json.dumps(row, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+            chunks.append(compressor.compress(line.encode('utf-8')))
+            action_counts[row['action']] = action_counts.get(row['action'], 0) + 1
+            first_id = first_id or row['id']
+            last_id = row['id']
+            count += 1
+
+        if not count:
+            return 0
+        chunks.append(compressor.flush())
+
+        with transaction.atomic():
+            AuditLogArchive.objects.update_or_create(
+                month=month,
+                defaults={
+                    'row_count': (archive.row_count if archive else 0) + count,
+                    'action_counts': action_counts,
+                    'first_id': first_id,
+                    'last_id': last_id,
+                    'payload': b''.join(chunks),
+                },
+            )
+
+        self._delete(live.filter(id__lte=last_id), batch_size)
+        self.stdout.write(f'{month:%Y-%m}: archived {count} rows')
+        return count
+
+    def _delete(self, qs, batch_size):
+        # ลบทีละชุดเพื่อไม่ให้ transaction ยาวและไม่ล็อกตารางนาน
+        while True:
+            ids = list(qs.order_by('id').values_list('id', flat=True)[:batch_size])
+            if not ids:
+                return
+            AuditLog.objects.filter(pk__in=ids).delete()
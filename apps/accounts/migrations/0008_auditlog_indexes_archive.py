@@ -0,0 +1,41 @@
+# Generated by Django 5.1.15 on 2026-10-19 14:00
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0007_alter_auditlog_action'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuditLogArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(help_text='วันที่ 1 ของเดือน', unique=True, verbose_name='เดือน')),
+                ('row_count', models.PositiveIntegerField(default=0, verbose_name='จำนวนรายการ')),
+                ('action_counts', models.JSONField(blank=True, default=dict, verbose_name='จำนวนตามการกระทำ')),
+                ('first_id', models.BigIntegerField(default=0, verbose_name='ID แรก')),
+                ('last_id', models.BigIntegerField(default=0, verbose_name='ID สุดท้าย')),
+                ('payload', models.BinaryField(verbose_name='ข้อมูล (zlib)')),
+                ('archived_at', models.DateTimeField(auto_now=True, verbose_name='วันที่จัดเก็บ')),
+            ],
+            options={
+                'verbose_name': 'Audit Log (จัดเก็บ)',
+                'verbose_name_plural': 'Audit Logs (จัดเก็บ)',
+                'ordering': ['-month'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['action', 'created_at', 'id'], name='auditlog_action_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['level', 'created_at', 'id'], name='auditlog_level_created_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.15 on 2026-10-19 16:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0011_auditlog_project_rollover'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='userprofile',
+            name='role',
+            field=models.CharField(choices=[('staff', 'เจ้าหน้าที่'), ('planner', 'เจ้าหน้าที่แผน'), ('head', 'หัวหน้าแผนก'), ('executive', 'ผู้บริหาร'), ('admin', 'ผู้ดูแลระบบ')], default='staff', max_length=10, verbose_name='บทบาท'),
+        ),
+    ]
@@ -1,3 +1,6 @@
+import json
+import zlib
+
 from django.conf import settings
 from django.db import models
 
@@ -114,6 +117,8 @@ class AuditLog(models.Model):
         ('PROJECT_DELETE_REQUEST', 'ขอลบโครงการ'),
         ('PROJECT_DELETE_APPROVE', 'อนุมัติลบโครงการ'),
         ('PROJECT_DELETE_REJECT', 'ปฏิเสธคำขอลบโครงการ'),
+        ('PROJECT_IMPORT', 'นำเข้าแผนโครงการ'),
+        ('PROJECT_ROLLOVER', 'ยกยอดโครงการข้ามปีงบประมาณ'),
         # Critical — Activity
         ('ACTIVITY_CREATE', 'สร้างกิจกรรม'),
         ('ACTIVITY_UPDATE', 'แก้ไขกิจกรรม'),
@@ -121,6 +126,7 @@ class AuditLog(models.Model):
         ('EXPENSE_CREATE', 'บันทึกรายการเบิกจ่าย'),
         ('EXPENSE_UPDATE', 'แก้ไขรายการเบิกจ่าย'),
         ('EXPENSE_DELETE', 'ลบรายการเบิกจ่าย'),
+        ('EXPENSE_IMPORT', 'นำเข้ารายการเบิกจ่ายจาก ERP'),
         ('BUDGET_TRANSFER', 'โอนงบประมาณ'),
         # Important — User management
         ('USER_ROLE_CHANGE', 'เปลี่ยนบทบาทผู้ใช้'),
@@ -152,11 +158,14 @@ class AuditLog(models.Model):
         'PROJECT_DELETE_REQUEST': LEVEL_CRITICAL,
         'PROJECT_DELETE_APPROVE': LEVEL_CRITICAL,
         'PROJECT_DELETE_REJECT': LEVEL_CRITICAL,
+        'PROJECT_IMPORT': LEVEL_CRITICAL,
+        'PROJECT_ROLLOVER': LEVEL_CRITICAL,
         'ACTIVITY_CREATE': LEVEL_CRITICAL,
         'ACTIVITY_UPDATE': LEVEL_CRITICAL,
         'EXPENSE_CREATE': LEVEL_CRITICAL,
         'EXPENSE_UPDATE': LEVEL_CRITICAL,
         'EXPENSE_DELETE': LEVEL_CRITICAL,
+        'EXPENSE_IMPORT': LEVEL_CRITICAL,
         'BUDGET_TRANSFER': LEVEL_CRITICAL,
         'USER_ROLE_CHANGE': LEVEL_IMPORTANT,
         'USER_PASSWORD_RESET': LEVEL_IMPORTANT,
@@ -191,7 +200,39 @@ class AuditLog(models.Model):
         verbose_name = 'Audit Log'
         verbose_name_plural = 'Audit Logs'
         ordering = ['-created_at']
+        # keyset pagination เรียงตาม (created_at, id) — index ของ created_at
+        # ครอบคลุม id อยู่แล้ว (InnoDB/SQLite เก็บ PK ต่อท้าย) ส่วนตัวกรองที่ใช้บ่อย
+        # ต้องมี index ผสมเพื่อให้อ่านตามลำดับได้โดยไม่ต้อง sort
+        indexes = [
+            models.Index(fields=['action', 'created_at', 'id'], name='auditlog_action_created_idx'),
+            models.Index(fields=['level', 'created_at', 'id'], name='auditlog_level_created_idx'),
+        ]
 
     def __str__(self):
         actor = self.user.username if self.user else 'anonymous'
         return f'[{self.action}] by {actor} at {self.created_at}'
+
+
+class AuditLogArchive(models.Model):
+    """Audit log ของเดือนที่ปิดแล้ว — บีบอัดเป็น JSON Lines (zlib) เดือนละ 1 แถว"""
+    month = models.DateField('เดือน', unique=True, help_text='วันที่ 1 ของเดือน')
+    row_count = models.PositiveIntegerField('จำนวนรายการ', default=0)
+    action_counts = models.JSONField('จำนวนตามการกระทำ', default=dict, blank=True)
+    first_id = models.BigIntegerField('ID แรก', default=0)
+    last_id = models.BigIntegerField('ID สุดท้าย', default=0)
+    payload = models.BinaryField('ข้อมูล (zlib)')
+    archived_at = models.DateTimeField('วันที่จัดเก็บ', auto_now=True)
+
+    class Meta:
+        verbose_name = 'Audit Log (จัดเก็บ)'
+        verbose_name_plural = 'Audit Logs (จัดเก็บ)'
+        ordering = ['-month']
+
+    def __str__(self):
+        return f'{self.month:%Y-%m} ({self.row_count} รายการ)'
+
+    def iter_rows(self):
+        """คืน dict ของแต่ละรายการที่จัดเก็บไว้ ตามลำดับ id"""
+        for line in zlib.decompress(bytes(self.payload)).decode('utf-8').splitlines():
+            if line:
+                yield json.loads(line)
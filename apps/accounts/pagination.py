@@ -0,0 +1,162 @@
+"""Keyset (cursor) pagination + จำนวนแถวโดยประมาณ สำหรับตารางขนาดใหญ่
+
+Paginator ของ Django ใช้ COUNT(*) + OFFSET ซึ่งช้าลงตามจำนวนแถวทั้งหมด
+ส่วน keyset pagination อ่านต่อจากคีย์ของแถวสุดท้ายที่เห็น จึงใช้ index
+ได้ตรง ๆ และเวลาแต่ละหน้าคงที่ไม่ว่าตารางจะใหญ่แค่ไหน
+
+    page = keyset_paginate(qs, ('-created_at', '-id'), request.GET.get('cursor'), 50)
+
+ฟิลด์ใน ordering ต้องเป็นฟิลด์ของ model นั้นเอง (ไม่ข้าม relation), ห้ามเป็น
+NULL และฟิลด์สุดท้ายต้อง unique (ปกติคือ id) เพื่อให้ลำดับไม่กำกวม
+"""
+from __future__ import annotations
+
+import base64
+import json
+from dataclasses import dataclass, field
+from datetime import date, datetime, time
+from decimal import Decimal
+from uuid import UUID
+
+from django.db import connections
+from django.db.models import Q
+
+NEXT = 'n'
+PREV = 'p'
+
+
+@dataclass
+class KeysetPage:
+    object_list: list
+    has_next: bool = False
+    has_previous: bool = False
+    next_cursor: str = ''
+    previous_cursor: str = ''
+    ordering: tuple = field(default_factory=tuple)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    @property
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+
+def _jsonable(value):
+    # DjangoJSONEncoder ปัด datetime เหลือระดับมิลลิวินาที ซึ่งทำให้ข้ามแถวได้
+    if isinstance(value, (date, datetime, time)):
+        return value.isoformat()
+    if isinstance(value, (Decimal, UUID)):
+        return str(value)
+    return value
+
+
+def encode_cursor(direction: str, values: list) -> str:
+    raw = json.dumps([direction, [_jsonable(v) for v in values]], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(model, ordering, cursor: str):
+    """คืน (direction, values) หรือ (None, None) ถ้า cursor ผิดรูปแบบ"""
+    if not cursor:
+        return None, None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        direction, raw_values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if direction not in (NEXT, PREV) or len(raw_values) != len(ordering):
+            return None, None
+        values = [
+            model._meta.get_field(name.lstrip('-')).to_python(raw)
+            for name, raw in zip(ordering, raw_values)
+        ]
+        return direction, values
+    except Exception:
+        return None, None
+
+
+def _seek_filter(ordering, values, forward: bool) -> Q:
+    """สร้างเงื่อนไข (a, b, c) > (x, y, z) แบบแยกทิศทางรายฟิลด์
+
+    MySQL ใช้ row comparison กับ index ผสมทิศทางได้ไม่ดี จึงแตกเป็น
+    a > x OR (a = x AND b > y) OR (a = x AND b = y AND c > z)
+    """
+    condition = Q()
+    equal_prefix = Q()
+    for name, value in zip(ordering, values):
+        descending = name.startswith('-')
+        column = name.lstrip('-')
+        lookup = 'lt' if descending == forward else 'gt'
+        condition |= equal_prefix & Q(**{f'{column}__{lookup}': value})
+        equal_prefix &= Q(**{column: value})
+    return condition
+
+
+def _key_values(obj, model, ordering):
+    return [
+        getattr(obj, model._meta.get_field(name.lstrip('-')).attname)
+        for name in ordering
+    ]
+
+
+def keyset_paginate(queryset, ordering, cursor: str = '', per_page: int = 50) -> KeysetPage:
+    ordering = tuple(ordering)
+    model = queryset.model
+    direction, values = decode_cursor(model, ordering, cursor)
+
+    forward = direction != PREV
+    if forward:
+        qs = queryset.order_by(*ordering)
+    else:
+        qs = queryset.order_by(*[
+            name.lstrip('-') if name.startswith('-') else f'-{name}' for name in ordering
+        ])
+    if values is not None:
+        qs = qs.filter(_seek_filter(ordering, values, forward))
+
+    rows = list(qs[:per_page + 1])
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if not forward:
+        rows.reverse()
+
+    page = KeysetPage(object_list=rows, ordering=ordering)
+    if forward:
+        page.has_next = has_more
+        page.has_previous = values is not None
+    else:
+        page.has_next = True
+        page.has_previous = has_more
+    if rows:
+        if page.has_next:
+            page.next_cursor = encode_cursor(NEXT, _key_values(rows[-1], model, ordering))
+        if page.has_previous:
+            page.previous_cursor = encode_cursor(PREV, _key_values(rows[0], model, ordering))
+    return page
+
+
+def approximate_count(queryset, cap: int = 10000) -> tuple[int, bool]:
+    """นับจำนวนแถวแบบไม่สแกนทั้งตาราง — คืน (จำนวน, เป็นค่าที่แน่นอนหรือไม่)
+
+    - ไม่มี filter บน MySQL: อ่าน TABLE_ROWS จาก information_schema (ค่าประมาณของ InnoDB)
+    - มี filter: นับได้สูงสุด cap แถว ถ้าเกินจะคืน (cap, False) ให้แสดงผลเป็น "มากกว่า"
+    """
+    model = queryset.model
+    connection = connections[queryset.db]
+    if not queryset.query.where and connection.vendor == 'mysql':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT TABLE_ROWS FROM information_schema.TABLES '
+                'WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s',
+                [model._meta.db_table],
+            )
+            row = cursor.fetchone()
+        if row and row[0] is not None:
+            return int(row[0]), False
+
+    count = queryset.order_by()[:cap + 1].count()
+    if count > cap:
+        return cap, False
+    return count, True
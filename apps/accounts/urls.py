@@ -7,6 +7,8 @@ from .views import (
     approved_org_delete,
     approved_org_edit,
     approved_org_list,
+    audit_log_archive_download,
+    audit_log_export,
     audit_log_list,
     department_create,
     department_delete,
@@ -68,4 +70,6 @@ urlpatterns = [
 
     # Audit log
     path('manage/audit-log/', audit_log_list, name='audit_log_list'),
+    path('manage/audit-log/export/', audit_log_export, name='audit_log_export'),
+    path('manage/audit-log/archive/<int:year>/<int:month>/', audit_log_archive_download, name='audit_log_archive_download'),
 ]
@@ -1,10 +1,14 @@
+import zlib
+from datetime import date, datetime, time, timedelta
+
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
 from django.contrib.auth.views import LoginView, LogoutView
-from django.core.paginator import Paginator
 from django.db.models import Count, Q
+from django.http import HttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.utils import timezone
 
 from .audit import get_client_ip, log_action
 from .decorators import role_required
@@ -18,9 +22,11 @@ from .forms import (
     UserCreateForm,
     UserEditForm,
 )
-from .models import ApprovedOrganization, AuditLog, Department, UserProfile
+from .models import ApprovedOrganization, AuditLog, AuditLogArchive, Department, UserProfile
+from .pagination import approximate_count, keyset_paginate
 from apps.projects.models import FiscalYear, Project
 from apps.budget.models import Expense
+from apps.reports import streaming
 
 
 class CustomLoginView(LoginView):
@@ -473,9 +479,24 @@ def pending_user_action(request, pk):
 
 # ── Audit Log ────────────────────────────────────────────────────────
 
-@role_required(['admin'])
-def audit_log_list(request):
-    logs = AuditLog.objects.select_related('user', 'target_user').all()
+AUDIT_LOG_PAGE_SIZE = 50
+AUDIT_LOG_ORDERING = ('-created_at', '-id')
+
+
+def _parse_date(value):
+    try:
+        return date.fromisoformat(value) if value else None
+    except ValueError:
+        return None
+
+
+def _day_start(d):
+    return timezone.make_aware(datetime.combine(d, time.min))
+
+
+def _filtered_audit_logs(request):
+    """audit log ตามตัวกรองใน request.GET — คืน (queryset, ค่าตัวกรอง)"""
+    logs = AuditLog.objects.all()
 
     # Filters
     action = request.GET.get('action', '').strip()
@@ -493,24 +514,98 @@ def audit_log_list(request):
             Q(user__username__icontains=username) |
             Q(target_repr__icontains=username)
         )
-    if date_from:
-        logs = logs.filter(created_at__date__gte=date_from)
-    if date_to:
-        logs = logs.filter(created_at__date__lte=date_to)
+    # กรองเป็นช่วงเวลา (>= วันเริ่ม, < วันถัดจากวันสิ้นสุด) แทน created_at__date
+    # เพื่อให้ใช้ index ของ created_at ได้
+    d_from, d_to = _parse_date(date_from), _parse_date(date_to)
+    if d_from:
+        logs = logs.filter(created_at__gte=_day_start(d_from))
+    if d_to:
+        logs = logs.filter(created_at__lt=_day_start(d_to + timedelta(days=1)))
+
+    return logs, {
+        'action': action, 'level': level, 'username': username,
+        'date_from': date_from, 'date_to': date_to,
+    }
+
 
-    paginator = Paginator(logs, 50)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+@role_required(['admin'])
+def audit_log_list(request):
+    logs, filters = _filtered_audit_logs(request)
+    action = filters['action']
+    logs = logs.select_related('user', 'target_user')
+
+    page_obj = keyset_paginate(
+        logs, AUDIT_LOG_ORDERING, request.GET.get('cursor', ''), AUDIT_LOG_PAGE_SIZE,
+    )
+    total_count, total_is_exact = approximate_count(logs)
+
+    querystring = request.GET.copy()
+    querystring.pop('cursor', None)
+
+    # ข้อมูลที่จัดเก็บมีจำนวนแยกตามการกระทำเท่านั้น — เมื่อกรองระดับ/ผู้ใช้/วันที่ จึงไม่แสดงจำนวน
+    archive_counts_shown = not any(filters[k] for k in ('level', 'username', 'date_from', 'date_to'))
+    archives = AuditLogArchive.objects.only('month', 'row_count', 'action_counts')
+    archive_rows = [
+        {
+            'month': a.month,
+            'row_count': (
+                (a.action_counts.get(action, 0) if action else a.row_count)
+                if archive_counts_shown else None
+            ),
+        }
+        for a in archives
+    ]
 
     context = {
         'page_obj': page_obj,
         'action_choices': AuditLog.ACTION_CHOICES,
         'level_choices': AuditLog.LEVEL_CHOICES,
         'current_action': action,
-        'current_level': level,
-        'current_username': username,
-        'current_date_from': date_from,
-        'current_date_to': date_to,
-        'total_count': logs.count(),
+        'current_level': filters['level'],
+        'current_username': filters['username'],
+        'current_date_from': filters['date_from'],
+        'current_date_to': filters['date_to'],
+        'total_count': total_count,
+        'total_is_exact': total_is_exact,
+        'filter_querystring': querystring.urlencode(),
+        'archive_rows': archive_rows,
+        'archive_counts_shown': archive_counts_shown,
     }
     return render(request, 'manage/audit_log.html', context)
+
+
+@role_required(['admin'])
+def audit_log_export(request):
+    """audit log ตามตัวกรองเป็น CSV/TSV (?format=csv|tsv) เรียงใหม่ → เก่า"""
+    logs, _ = _filtered_audit_logs(request)
+    rows = logs.order_by(*AUDIT_LOG_ORDERING).values_list(
+        'created_at', 'action', 'level', 'user__username', 'target_user__username',
+        'target_repr', 'detail', 'ip_address',
+    ).iterator(chunk_size=streaming.ITERATOR_CHUNK_SIZE)
+    action_labels = dict(AuditLog.ACTION_CHOICES)
+
+    def export_rows():
+        for created_at, action, level, username, target_username, target, detail, ip in rows:
+            yield [
+                timezone.localtime(created_at).strftime('%Y-%m-%d %H:%M:%S'),
+                action, action_labels.get(action, action), level,
+                username or '', target_username or '', target, detail, ip or '',
+            ]
+
+    header = [
+        'เวลา', 'รหัสการกระทำ', 'การกระทำ', 'ระดับ', 'ผู้ดำเนินการ',
+        'ผู้ใช้เป้าหมาย', 'เป้าหมาย', 'รายละเอียด', 'IP Address',
+    ]
+    return streaming.export_response(request, f'audit-log-{timezone.localdate():%Y%m%d}', header, export_rows())
+
+
+@role_required(['admin'])
+def audit_log_archive_download(request, year, month):
+    """ดาวน์โหลด audit log ของเดือนที่จัดเก็บแล้ว (JSON Lines)"""
+    archive = get_object_or_404(AuditLogArchive, month__year=year, month__month=month)
+    response = HttpResponse(
+        zlib.decompress(bytes(archive.payload)),
+        content_type='application/x-ndjson; charset=utf-8',
+    )
+    response['Content-Disposition'] = f'attachment; filename="audit-log-{archive.month:%Y-%m}.jsonl"'
+    return response
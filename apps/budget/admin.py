@@ -1,12 +1,57 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 
-from .models import Expense
+from . import reservations
+from .models import BudgetBalance, Expense, SpendRollup
 
 
 @admin.register(Expense)
 class ExpenseAdmin(admin.ModelAdmin):
     list_display = ['activity', 'description', 'amount', 'expense_date', 'status', 'created_by', 'approved_by']
-    list_filter = ['status', 'expense_date', 'activity__project__fiscal_year']
+    list_filter = ['status', 'expense_date', 'fiscal_year']
     search_fields = ['description', 'receipt_number', 'activity__name', 'activity__project__name']
     raw_id_fields = ['activity', 'created_by', 'approved_by']
     date_hierarchy = 'expense_date'
+
+    # บันทึก/ลบผ่านชั้นจองงบ เพื่อให้ BudgetBalance ตรงกับรายการเสมอ
+    def save_model(self, request, obj, form, change):
+        try:
+            reservations.save_expense(obj)
+        except reservations.ReservationError as exc:
+            self.message_user(request, f'ไม่ได้บันทึก: {exc}', messages.ERROR)
+
+    def delete_model(self, request, obj):
+        reservations.delete_expense(obj)
+
+    def delete_queryset(self, request, queryset):
+        for obj in queryset.order_by('pk'):
+            reservations.delete_expense(obj)
+
+
+@admin.register(BudgetBalance)
+class BudgetBalanceAdmin(admin.ModelAdmin):
+    list_display = ['activity', 'source', 'spent', 'reserved', 'updated_at']
+    list_filter = ['source', 'activity__project__fiscal_year']
+    search_fields = ['activity__name', 'activity__project__project_code']
+    raw_id_fields = ['activity']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(SpendRollup)
+class SpendRollupAdmin(admin.ModelAdmin):
+    list_display = [
+        'month', 'activity', 'source', 'approved_amount', 'approved_count', 'pending_amount', 'pending_count',
+    ]
+    list_filter = ['fiscal_year', 'source', 'department']
+    search_fields = ['activity__name', 'project__project_code']
+    raw_id_fields = ['activity', 'project']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,188 @@
+"""คาดการณ์การใช้งบของกิจกรรมถึงวันสิ้นสุด (burn-rate forecasting)
+
+โหลดยอดเบิกจ่ายรายเดือนของทุกกิจกรรมในปีงบจาก SpendRollup เป็นเมทริกซ์ NumPy
+(กิจกรรม × เดือน) แล้วคำนวณ 3 วิธีพร้อมกันทั้งเมทริกซ์ — ไม่มี loop ต่อกิจกรรม:
+
+- run-rate:  ยอดที่ใช้ ÷ จำนวนเดือนที่ผ่านไป × เดือนที่เหลือ
+- linear:    ความชันของยอดสะสมรายเดือน (least squares) × เดือนที่เหลือ
+- seasonal:  สัดส่วนการเบิกจ่ายรายเดือนของทั้งองค์กรในปีงบก่อนหน้า (ไม่มีข้อมูล = เท่ากันทุกเดือน)
+
+ค่าคาดการณ์ = มัธยฐานของ 3 วิธี บวกยอดรออนุมัติ (ถือว่าผูกพันแล้ว)
+ผลลัพธ์เก็บใน cache ต่อ (ปีงบ, วันนี้, เวอร์ชันข้อมูลกิจกรรม, เวอร์ชัน SpendRollup)
+"""
+from calendar import monthrange
+
+import numpy as np
+from django.core.cache import cache
+from django.db.models import Sum
+from django.utils import timezone
+
+from apps.projects.models import Activity, FiscalYear
+from apps.projects.timeline import data_version
+
+from . import rollup
+from .models import SpendRollup
+
+CACHE_TIMEOUT = 60 * 30
+OPEN_STATUSES = ('pending', 'in_progress')
+
+OVERSPEND = 'over'
+UNDERSPEND = 'under'
+UNDERSPEND_RATIO = 0.7   # คาดว่าใช้ไม่ถึง 70% ของงบ
+MIN_ELAPSED_SHARE = 0.25  # ผ่านไปอย่างน้อย 25% ของช่วงกิจกรรมก่อนจะแจ้งว่าใช้ไม่หมด
+
+
+def _month_index(d, start):
+    return (d.year - start.year) * 12 + d.month - start.month
+
+
+def seasonal_profile(fiscal_year, months):
+    """สัดส่วนยอดอนุมัติรายเดือนของปีงบก่อนหน้า (รวมทุกกิจกรรม) — ผลรวม = 1"""
+    previous = FiscalYear.objects.filter(year=fiscal_year.year - 1).first()
+    profile = np.zeros(months)
+    if previous is not None:
+        start = previous.start_date.replace(day=1)
+        for row in SpendRollup.objects.filter(fiscal_year=previous).values('month').annotate(
+            total=Sum('approved_amount'),
+        ).order_by():
+            i = _month_index(row['month'], start)
+            if 0 <= i < months:
+                profile[i] = float(row['total'])
+    if profile.sum() <= 0:
+        profile[:] = 1
+    return profile / profile.sum()
+
+
+def project_spend(approved, pending, start_idx, end_idx, allocated, now_idx, now_frac, profile):
+    """คำนวณค่าคาดการณ์ของทุกกิจกรรมพร้อมกัน — อาร์เรย์ทั้งหมดยาว n (approved: n × เดือน)
+
+    now_idx/now_frac: เดือนปัจจุบันในปีงบ และสัดส่วนของเดือนที่ผ่านไปแล้ว
+    คืน dict ของอาร์เรย์: committed, run_rate, linear, seasonal, forecast, elapsed_share, flag
+    """
+    n, months = approved.shape
+    x = np.arange(months)
+    cumulative = approved.cumsum(axis=1)
+    spent = cumulative[:, now_idx] if n else np.zeros(0)
+    committed = spent + pending
+
+    started = now_idx >= start_idx
+    elapsed = np.where(started, now_idx - start_idx + now_frac, 0.0)
+    remaining = np.clip(end_idx - now_idx + (1 - now_frac), 0, None)
+    window = np.maximum(end_idx - start_idx + 1, 1)
+    elapsed_share = np.clip(elapsed / window, 0, 1)
+
+    # run-rate
+    rate = np.divide(spent, elapsed, out=np.zeros(n), where=elapsed > 0)
+    run_rate = committed + rate * remaining
+
+    # linear — least squares ของยอดสะสมเฉพาะเดือนในช่วง [เริ่ม, เดือนปัจจุบัน]
+    mask = (x >= start_idx[:, None]) & (x <= now_idx)
+    weight = mask.sum(axis=1)
+    safe_weight = np.maximum(weight, 1)
+    mean_x = (mask * x).sum(axis=1) / safe_weight
+    mean_y = (mask * cumulative).sum(axis=1) / safe_weight
+    dx = (x - mean_x[:, None]) * mask
+    var = (dx * dx).sum(axis=1)
+    cov = (dx * (cumulative - mean_y[:, None])).sum(axis=1)
+    slope = np.where(var > 0, np.divide(cov, var, out=np.zeros(n), where=var > 0), rate)
+    linear = committed + np.maximum(slope, 0) * remaining
+
+    # seasonal — สัดส่วนที่ "ควร" ใช้ไปแล้วในช่วงของกิจกรรม เทียบกับสัดส่วนที่เหลือถึงวันสิ้นสุด
+    share_before = np.concatenate([[0.0], profile.cumsum()])  # share_before[i] = ผลรวมเดือน < i
+    done = share_before[now_idx] + profile[now_idx] * now_frac - share_before[np.minimum(start_idx, now_idx)]
+    rest = share_before[np.maximum(end_idx + 1, now_idx)] - share_before[now_idx] - profile[now_idx] * now_frac
+    rest = np.where(end_idx >= now_idx, np.maximum(rest, 0), 0)
+    seasonal = committed + np.divide(spent * rest, done, out=np.zeros(n), where=(done > 0) & started)
+
+    forecast = np.where(started, np.median(np.vstack([run_rate, linear, seasonal]), axis=0), committed)
+
+    budgeted = allocated > 0
+    flag = np.full(n, '', dtype=object)
+    flag[budgeted & (forecast > allocated)] = OVERSPEND
+    flag[
+        budgeted & (forecast < allocated * UNDERSPEND_RATIO) & (elapsed_share >= MIN_ELAPSED_SHARE)
+    ] = UNDERSPEND
+    return {
+        'committed': committed,
+        'run_rate': run_rate,
+        'linear': linear,
+        'seasonal': seasonal,
+        'forecast': forecast,
+        'elapsed_share': elapsed_share,
+        'flag': flag,
+    }
+
+
+def compute(fiscal_year, today=None):
+    """โหลดข้อมูลทั้งปีงบด้วย 3 query แล้วคาดการณ์ทุกกิจกรรมที่ยังเปิดอยู่ (ไม่ผ่าน cache)"""
+    today = today or timezone.localdate()
+    months = rollup.fiscal_months(fiscal_year)
+    start = months[0]
+    count = len(months)
+
+    activities = list(
+        Activity.objects.filter(project__fiscal_year=fiscal_year, status__in=OPEN_STATUSES, no_budget=False)
+        .order_by('pk').values_list('pk', 'allocated_budget', 'start_date', 'end_date')
+    )
+    ids = [row[0] for row in activities]
+    position = {pk: i for i, pk in enumerate(ids)}
+    n = len(ids)
+
+    approved = np.zeros((n, count))
+    pending = np.zeros(n)
+    rows = SpendRollup.objects.filter(fiscal_year=fiscal_year, activity_id__in=ids).values_list(
+        'activity_id', 'month', 'approved_amount', 'pending_amount',
+    )
+    if n:
+        data = [
+            (position[activity_id], _month_index(month, start), float(amount), float(reserved))
+            for activity_id, month, amount, reserved in rows.iterator()
+        ]
+        if data:
+            row_idx, month_idx, amount, reserved = (np.array(column) for column in zip(*data))
+            month_idx = month_idx.astype(int)
+            inside = (month_idx >= 0) & (month_idx < count)
+            np.add.at(approved, (row_idx[inside].astype(int), month_idx[inside]), amount[inside])
+            np.add.at(pending, row_idx.astype(int), reserved)
+
+    allocated = np.fromiter((float(row[1]) for row in activities), float, n)
+    start_idx = np.clip(np.fromiter((_month_index(row[2], start) for row in activities), int, n), 0, count - 1)
+    end_idx = np.clip(np.fromiter((_month_index(row[3], start) for row in activities), int, n), 0, count - 1)
+    now_idx = min(max(_month_index(today, start), 0), count - 1)
+    if today < start:
+        now_frac = 0.0
+    elif today > fiscal_year.end_date:
+        now_frac = 1.0
+    else:
+        now_frac = today.day / monthrange(today.year, today.month)[1]
+
+    result = project_spend(
+        approved, pending, start_idx, end_idx, allocated, now_idx, now_frac,
+        seasonal_profile(fiscal_year, count),
+    )
+    return {
+        'ids': ids,
+        'allocated': allocated.round(2).tolist(),
+        **{key: (value.tolist() if key == 'flag' else value.round(2).tolist()) for key, value in result.items()},
+    }
+
+
+def get_forecast(fiscal_year, today=None):
+    """ผลคาดการณ์ของปีงบ (จาก cache ถ้ามี) — dict ของ list เรียงตาม activity pk"""
+    today = today or timezone.localdate()
+    key = f'forecast:{fiscal_year.pk}:{today.isoformat()}:{data_version()}:{rollup.data_version()}'
+    result = cache.get(key)
+    if result is None:
+        result = compute(fiscal_year, today)
+        cache.set(key, result, CACHE_TIMEOUT)
+    return result
+
+
+def flagged(result, flag):
+    """[(activity_id, ค่าคาดการณ์, งบ)] ของกิจกรรมที่ถูกแจ้ง เรียงจากส่วนต่างมากไปน้อย"""
+    rows = [
+        (pk, forecast, allocated)
+        for pk, forecast, allocated, value in zip(result['ids'], result['forecast'], result['allocated'], result['flag'])
+        if value == flag
+    ]
+    return sorted(rows, key=lambda row: abs(row[1] - row[2]), reverse=True)
@@ -115,7 +115,11 @@ class ExpenseForm(forms.ModelForm):
             if budget_source:
                 project = activity.project
                 exclude_pk = self.instance.pk if self.instance.pk and self.instance.status == 'approved' else None
-                remaining_source = project.remaining_by_source(budget_source, exclude_expense_pk=exclude_pk)
+                sources = {
+                    s['source_type']: s
+                    for s in project.budget_breakdown(exclude_expense_pk=exclude_pk)['sources']
+                }
+                remaining_source = sources[budget_source]['remaining'] if budget_source in sources else 0
                 source_label = dict(SOURCE_CHOICES).get(budget_source, budget_source)
                 if amount > remaining_source:
                     raise ValidationError(
@@ -166,6 +170,29 @@ class ExpenseApprovalForm(forms.Form):
     )
 
 
+class ExpenseBulkApprovalForm(forms.Form):
+    """อนุมัติ/ไม่อนุมัติหลายรายการจากหน้ารายการรออนุมัติ"""
+    MAX_ITEMS = 500
+
+    action = forms.ChoiceField(choices=ExpenseApprovalForm.ACTION_CHOICES)
+    expenses = forms.ModelMultipleChoiceField(
+        queryset=Expense.objects.none(),
+        error_messages={'required': 'กรุณาเลือกรายการที่ต้องการดำเนินการ'},
+    )
+    remark = forms.CharField(label='หมายเหตุ', required=False, max_length=1000)
+
+    def __init__(self, *args, queryset=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if queryset is not None:
+            self.fields['expenses'].queryset = queryset
+
+    def clean_expenses(self):
+        expenses = self.cleaned_data['expenses']
+        if len(self.data.getlist('expenses')) > self.MAX_ITEMS:
+            raise ValidationError(f'เลือกได้ครั้งละไม่เกิน {self.MAX_ITEMS} รายการ')
+        return expenses
+
+
 class BudgetTransferForm(forms.Form):
     BUDGET_TYPE_CHOICES = [
         ('government', 'เงินแผ่นดิน'),
@@ -232,3 +259,31 @@ class BudgetTransferForm(forms.Form):
                     f'(ติดค่าใช้จ่ายที่อนุมัติแล้ว)'
                 )
         return cleaned_data
+
+
+class ExpenseImportForm(forms.Form):
+    """อัปโหลด statement รายการเบิกจ่ายจาก ERP (.xlsx หรือ .csv)"""
+    fiscal_year = forms.ModelChoiceField(
+        queryset=None, label='ปีงบประมาณ', empty_label=None,
+        widget=forms.Select(attrs={'class': TAILWIND_INPUT}),
+    )
+    file = forms.FileField(
+        label='ไฟล์ statement (.xlsx / .csv)',
+        widget=forms.ClearableFileInput(attrs={'class': TAILWIND_FILE, 'accept': '.xlsx,.csv'}),
+    )
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        from apps.projects.models import FiscalYear
+        self.fields['fiscal_year'].queryset = FiscalYear.objects.order_by('-year')
+        active = FiscalYear.objects.filter(is_active=True).first()
+        if active:
+            self.fields['fiscal_year'].initial = active.pk
+
+    def clean_file(self):
+        f = self.cleaned_data['file']
+        if not f.name.lower().endswith(('.xlsx', '.csv')):
+            raise ValidationError('อนุญาตเฉพาะไฟล์ .xlsx หรือ .csv')
+        if f.size > 10 * 1024 * 1024:
+            raise ValidationError('ขนาดไฟล์ต้องไม่เกิน 10 MB')
+        return f
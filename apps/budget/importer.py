@@ -0,0 +1,287 @@
+"""นำเข้ารายการเบิกจ่ายจาก statement ของ ERP (.xlsx แผ่นงานแรก หรือ .csv)
+
+แต่ละแถวจับคู่โครงการ/หมวดเงินด้วยรหัสโครงการ ERP (ProjectBudgetSource.erp_code) ในปีงบที่เลือก
+และใช้เลขที่เอกสารเป็นเลขที่ใบเสร็จ — ตรวจทั้งไฟล์ในรอบเดียวด้วยยอดคงเหลือที่โหลดไว้ล่วงหน้า
+(ยอดใช้ + ยอดจองจาก BudgetBalance ต่อกิจกรรม/แหล่งเงิน แบบเดียวกับตอน commit และยอด approved
+ต่อหมวดเงินของโครงการ แทนการ query ต่อแถวแบบ ExpenseForm.clean) และตรวจรายการซ้ำ
+ด้วย hash index ของ (โครงการ, หมวดเงิน, เลขที่เอกสาร, จำนวนเงิน) ทั้งในไฟล์และในระบบ
+
+commit_expenses จองงบของทั้งไฟล์ภายใต้ล็อก (reservations.apply_changes) แล้วบันทึกด้วย bulk_create
+ใน transaction เดียว จากนั้นทำงานของ signal ครั้งเดียวต่อไฟล์:
+ดัชนีค้นหา และการแจ้งเตือน LINE แบบรวม (แจ้งเตือนงบต่อกิจกรรม/ผู้รับ 1 ครั้ง + สรุปถึงผู้นำเข้า)
+"""
+from collections import defaultdict
+from dataclasses import dataclass, field
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from apps.projects.importer import (
+    clean_model_field, parse_date, parse_decimal, parse_text, read_table,
+)
+from apps.projects.models import Activity, ProjectBudgetSource
+from apps.projects.utils import get_projects_for_user
+
+from . import reservations
+from .models import SOURCE_CHOICES, Expense
+from .utils import notify_budget_alerts
+
+ERP_COLUMNS = [
+    ('erp_code', 'รหัสโครงการ ERP'),
+    ('receipt_number', 'เลขที่เอกสาร'),
+    ('expense_date', 'วันที่'),
+    ('amount', 'จำนวนเงิน'),
+    ('description', 'รายละเอียด'),
+    ('activity_number', 'ลำดับกิจกรรม'),
+]
+REQUIRED_COLUMNS = {'erp_code', 'receipt_number', 'amount'}
+SOURCE_LABELS = dict(SOURCE_CHOICES)
+ACTIVE_ACTIVITY_STATUSES = ('pending', 'in_progress')
+
+
+@dataclass
+class ExpenseImport:
+    fiscal_year: object
+    auto_approve: bool
+    rows: list = field(default_factory=list)
+    errors: list = field(default_factory=list)
+
+    def error(self, row, message):
+        self.errors.append({'row': row, 'message': message})
+
+    @property
+    def is_valid(self):
+        return not self.errors and bool(self.rows)
+
+    @property
+    def total_amount(self):
+        return sum((r['amount'] for r in self.rows), Decimal('0'))
+
+
+def _duplicate_key(project_id, source_type, receipt_number, amount):
+    return (project_id, source_type, receipt_number.casefold(), amount)
+
+
+def parse_expenses(fiscal_year, user, file):
+    """อ่านและตรวจ statement — ไม่เขียนฐานข้อมูล"""
+    role = getattr(getattr(user, 'profile', None), 'role', 'staff')
+    plan = ExpenseImport(fiscal_year=fiscal_year, auto_approve=role in ('planner', 'admin'))
+    try:
+        raw_rows = read_table(file, ERP_COLUMNS, REQUIRED_COLUMNS)
+    except ValidationError as e:
+        plan.error(None, ' '.join(e.messages))
+        return plan
+
+    # ── preload: แหล่งเงินตามรหัส ERP, กิจกรรม, ยอดคงเหลือ, รายการที่มีอยู่แล้ว ──
+    erp_codes = {parse_text(values.get('erp_code')).casefold() for _, values in raw_rows}
+    sources_by_code = defaultdict(list)
+    for source in ProjectBudgetSource.objects.filter(
+        project__in=get_projects_for_user(user),
+        project__fiscal_year=fiscal_year,
+    ).exclude(erp_code='').select_related('project'):
+        if source.erp_code.strip().casefold() in erp_codes:
+            sources_by_code[source.erp_code.strip().casefold()].append(source)
+    project_ids = {s.project_id for sources in sources_by_code.values() for s in sources}
+
+    activities = {}
+    activities_by_project = defaultdict(list)
+    for activity in Activity.objects.filter(project_id__in=project_ids).only(
+        'pk', 'project_id', 'activity_number', 'name', 'status', 'allocated_budget',
+        'budget_government', 'budget_accumulated', 'budget_revenue',
+    ):
+        activities[(activity.project_id, activity.activity_number)] = activity
+        activities_by_project[activity.project_id].append(activity)
+
+    # งบคงเหลือของกิจกรรมตามกฎเดียวกับตอน commit (reservations.apply_changes): วงเงิน - ยอดใช้ - ยอดจอง
+    activity_available = reservations.available(a.pk for a in activities.values())
+    # งบหมวดเงินของโครงการตามกฎของ ExpenseForm.clean: งบ - ยอด approved
+    source_spent = {
+        (row['project_id'], row['budget_source']): row['total']
+        for row in Expense.objects.filter(project_id__in=project_ids, status='approved')
+        .values('project_id', 'budget_source').annotate(total=Sum('amount')).order_by()
+    }
+    source_remaining = {
+        (s.project_id, s.source_type): s.amount - source_spent.get((s.project_id, s.source_type), 0)
+        for sources in sources_by_code.values() for s in sources
+    }
+
+    receipts = {parse_text(values.get('receipt_number')) for _, values in raw_rows}
+    seen = {
+        _duplicate_key(project_id, source_type, receipt, amount): None
+        for project_id, source_type, receipt, amount in Expense.objects.filter(
+            project_id__in=project_ids, receipt_number__in=receipts,
+        ).values_list('project_id', 'budget_source', 'receipt_number', 'amount')
+    }
+
+    # ── ตรวจทีละแถวในรอบเดียว ──
+    for row, values in raw_rows:
+        errors = []
+        erp_code = parse_text(values.get('erp_code'))
+        sources = sources_by_code.get(erp_code.casefold(), [])
+        if not sources:
+            plan.error(row, f'ไม่พบรหัสโครงการ ERP "{erp_code}" ในปีงบประมาณ {fiscal_year.year} ที่คุณมีสิทธิ์')
+            continue
+        if len(sources) > 1:
+            plan.error(row, f'รหัส ERP "{erp_code}" ตรงกับหลายโครงการ/หมวดเงิน — แก้ไขรหัสในโครงการให้ไม่ซ้ำ')
+            continue
+        source = sources[0]
+        project = source.project
+        source_field = f'budget_{source.source_type}'
+
+        activity = None
+        number_text = parse_text(values.get('activity_number'))
+        if number_text:
+            try:
+                activity = activities.get((project.pk, int(Decimal(number_text))))
+            except (ArithmeticError, ValueError):
+                pass
+            if activity is None:
+                errors.append(f'ไม่พบกิจกรรมที่ {number_text} ในโครงการ {project.project_code}')
+        else:
+            # ไม่ระบุกิจกรรม — ใช้ได้เมื่อมีกิจกรรมเดียวที่ได้รับงบหมวดนี้
+            candidates = [
+                a for a in activities_by_project[project.pk]
+                if a.status in ACTIVE_ACTIVITY_STATUSES and getattr(a, source_field) > 0
+            ]
+            if len(candidates) == 1:
+                activity = candidates[0]
+            else:
+                errors.append(
+                    f'โครงการ {project.project_code} มีกิจกรรมที่ใช้งบ{SOURCE_LABELS[source.source_type]} '
+                    f'{len(candidates)} กิจกรรม — ระบุลำดับกิจกรรม'
+                )
+        if activity is not None and activity.status not in ACTIVE_ACTIVITY_STATUSES:
+            errors.append(f'กิจกรรมที่ {activity.activity_number} ไม่อยู่ในสถานะที่บันทึกเบิกจ่ายได้')
+
+        receipt_number = clean_model_field(
+            Expense, 'receipt_number', parse_text(values.get('receipt_number')), errors,
+        )
+        if not receipt_number:
+            errors.append('ต้องระบุเลขที่เอกสาร')
+        try:
+            amount = parse_decimal(values.get('amount'))
+            if amount <= 0:
+                raise ValidationError('จำนวนเงินต้องมากกว่า 0')
+            amount = clean_model_field(Expense, 'amount', amount, errors)
+        except ValidationError as e:
+            errors.extend(e.messages)
+            amount = None
+        try:
+            expense_date = parse_date(values.get('expense_date')) or timezone.localdate()
+        except ValidationError as e:
+            errors.extend(e.messages)
+            expense_date = None
+        description = parse_text(values.get('description')) or f'ERP {erp_code} เลขที่ {receipt_number}'
+        description = clean_model_field(Expense, 'description', description[:500], errors)
+
+        if amount and receipt_number:
+            key = _duplicate_key(project.pk, source.source_type, receipt_number, amount)
+            if key in seen:
+                where = f'กับแถว {seen[key]}' if seen[key] else 'กับที่มีอยู่ในระบบ'
+                errors.append(f'รายการซ้ำ{where} (เลขที่ {receipt_number}, {amount:,.2f} บาท)')
+            else:
+                seen[key] = row
+
+        if not errors and activity is not None:
+            keys = [
+                ((activity.pk, reservations.TOTAL), 'งบประมาณ'),
+                ((activity.pk, source.source_type), f'งบ{SOURCE_LABELS[source.source_type]}'),
+            ]
+            for key, label in keys:
+                remaining = activity_available[key]
+                if remaining is not None and amount > remaining:
+                    errors.append(
+                        f'จำนวนเงินเกิน{label}คงเหลือของกิจกรรม รวมยอดที่รออนุมัติ (คงเหลือ {remaining:,.2f} บาท)'
+                    )
+            remaining_source = source_remaining[(project.pk, source.source_type)]
+            if amount > remaining_source:
+                errors.append(
+                    f'จำนวนเงินเกินงบ{SOURCE_LABELS[source.source_type]}คงเหลือของโครงการ '
+                    f'(คงเหลือ {remaining_source:,.2f} บาท)'
+                )
+            if not errors:
+                # หักยอดคงเหลือทันที — แถวถัดไปในไฟล์เดียวกันต้องเห็นยอดที่ลดลงแล้ว
+                for key, _ in keys:
+                    if activity_available[key] is not None:
+                        activity_available[key] -= amount
+                source_remaining[(project.pk, source.source_type)] -= amount
+
+        for message in errors:
+            plan.error(row, message)
+        plan.rows.append({
+            'row': row,
+            'erp_code': erp_code,
+            'project': project,
+            'activity': activity,
+            'budget_source': source.source_type,
+            'source_label': SOURCE_LABELS[source.source_type],
+            'receipt_number': receipt_number,
+            'expense_date': expense_date,
+            'amount': amount,
+            'description': description,
+        })
+
+    if not raw_rows:
+        plan.error(None, 'ไม่พบรายการในไฟล์')
+    return plan
+
+
+def commit_expenses(plan, user):
+    """บันทึกรายการที่ผ่านการตรวจแล้ว — คืนจำนวนรายการ"""
+    if not plan.is_valid:
+        raise ValidationError('ไฟล์ยังมีข้อผิดพลาด')
+    from apps.search.indexing import index_objects
+
+    now = timezone.now()
+    status = 'approved' if plan.auto_approve else 'pending'
+    with transaction.atomic():
+        # จอง/ตัดงบภายใต้ล็อกก่อนเขียน — ถ้าเกินงบ (มีรายการอื่นแทรกหลังตรวจ) ทั้งไฟล์จะถูกยกเลิก
+        reservations.apply_changes([
+            (None, (r['activity'].pk, r['budget_source'], status, r['amount'])) for r in plan.rows
+        ])
+        Expense.objects.bulk_create([
+            Expense(
+                activity=r['activity'],
+                project=r['project'],
+                department_id=r['project'].department_id,
+                fiscal_year_id=r['project'].fiscal_year_id,
+                description=r['description'],
+                amount=r['amount'],
+                expense_date=r['expense_date'],
+                receipt_number=r['receipt_number'],
+                budget_source=r['budget_source'],
+                status=status,
+                created_by=user,
+                approved_by=user if plan.auto_approve else None,
+                approved_at=now if plan.auto_approve else None,
+                remark=f'นำเข้าจาก ERP ({r["erp_code"]})',
+            )
+            for r in plan.rows
+        ], batch_size=1000)
+        # bulk_create บน MySQL ไม่คืน pk — อ่านกลับด้วยผู้สร้าง/เวลา/เลขที่เอกสาร
+        created = Expense.objects.filter(
+            created_by=user, created_at__gte=now,
+            receipt_number__in={r['receipt_number'] for r in plan.rows},
+        ).select_related('activity__project')
+        index_objects('expense', created)
+
+        activity_ids = {r['activity'].pk for r in plan.rows}
+        if plan.auto_approve:
+            transaction.on_commit(lambda: notify_budget_alerts(activity_ids))
+        transaction.on_commit(lambda: notify_import_summary(user, len(plan.rows), plan.total_amount, status))
+    return len(plan.rows)
+
+
+def notify_import_summary(user, count, total, status):
+    """สรุปผลถึงผู้นำเข้า 1 ข้อความ (แทนการแจ้งทีละรายการ)"""
+    profile = getattr(user, 'profile', None)
+    if not profile or not profile.line_user_id:
+        return
+    from apps.notifications.services import LINEService
+    try:
+        LINEService().send_expense_import_summary(user, count, total, status)
+    except Exception:
+        pass
@@ -0,0 +1,51 @@
+"""Management command: สร้างตารางยอดเบิกจ่ายรายเดือน (SpendRollup) ใหม่จากรายการเบิกจ่าย
+
+ปกติตารางถูกปรับอัตโนมัติทีละกิจกรรมหลังบันทึก — ใช้คำสั่งนี้หลังแก้ข้อมูลตรงในฐานข้อมูล
+หรือเมื่อต้องการตรวจว่าตารางตรงกับรายการจริง (--dry-run แสดงจำนวนแถวที่ต่างโดยไม่เขียน)
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.budget import reconcile, rollup
+from apps.budget.models import Expense, SpendRollup
+from apps.projects.models import FiscalYear
+
+
+class Command(BaseCommand):
+    help = "Rebuild the monthly spend rollup table from expenses (safe to re-run)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fiscal-year',
+            type=int,
+            help='Only rebuild this fiscal year (e.g. 2569); default: all years',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Compare the table with freshly computed rows without writing anything',
+        )
+
+    def handle(self, *args, **options):
+        fiscal_year = None
+        if options['fiscal_year']:
+            fiscal_year = FiscalYear.objects.filter(year=options['fiscal_year']).first()
+            if fiscal_year is None:
+                raise CommandError(f'ไม่พบปีงบประมาณ {options["fiscal_year"]}')
+        scope = f'ปีงบ {fiscal_year.year}' if fiscal_year else 'ทุกปีงบ'
+
+        if options['dry_run']:
+            expenses = Expense.objects.all()
+            existing = SpendRollup.objects.all()
+            if fiscal_year is not None:
+                expenses = expenses.filter(fiscal_year=fiscal_year)
+                existing = existing.filter(fiscal_year=fiscal_year)
+            differ = sum(1 for _ in reconcile.rollup_drift(fiscal_year))
+            self.stdout.write(
+                f'[DRY-RUN] {scope}: คำนวณได้ {rollup.count_rollup_rows(expenses)} แถว, '
+                f'ในตาราง {existing.count()} แถว, ต่างกัน {differ} แถว'
+            )
+            self.stdout.write(self.style.SUCCESS('Done (dry-run) — nothing written'))
+            return
+
+        created = rollup.rebuild(fiscal_year)
+        self.stdout.write(self.style.SUCCESS(f'Done — rebuilt {created} rollup rows ({scope})'))
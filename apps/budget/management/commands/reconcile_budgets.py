@@ -0,0 +1,75 @@
+"""Management command: ตรวจความสอดคล้องของยอดงบประมาณทั้งฐานข้อมูล (apps/budget/reconcile.py)
+
+ค่าเริ่มต้นรายงานอย่างเดียว — --repair ซ่อมรายการที่ซ่อมได้เป็นชุด (--batch-size รายการต่อ transaction)
+การตรวจที่ไม่มีวิธีซ่อมอัตโนมัติ (เช่น งบกิจกรรมเกินงบโครงการ) ต้องตรวจสอบและแก้ไขด้วยผู้ดูแล
+Celery beat รันการตรวจนี้ทุกคืน (CELERY_BEAT_SCHEDULE['reconcile-budgets'])
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.budget import reconcile
+
+
+class Command(BaseCommand):
+    help = "Check that budget totals, allocations, transfers, balances and rollups agree; optionally repair"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='append',
+            choices=reconcile.CHECK_NAMES,
+            help='Only run this check (repeatable); default: all checks',
+        )
+        parser.add_argument(
+            '--repair',
+            action='store_true',
+            help='Repair repairable discrepancies after reporting them',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Rows repaired per transaction (default 500)',
+        )
+        parser.add_argument(
+            '--samples',
+            type=int,
+            default=5,
+            help='Discrepancies listed per check (default 5)',
+        )
+        parser.add_argument(
+            '--fail-on-drift',
+            action='store_true',
+            help='Exit with an error when discrepancies remain (for cron/CI)',
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size ต้องมากกว่า 0')
+
+        report = reconcile.reconcile(
+            names=options['check'], repair=options['repair'],
+            batch_size=options['batch_size'], sample=options['samples'],
+        )
+        remaining = 0
+        for result in report:
+            count = result['count']
+            if not count:
+                self.stdout.write(f'OK    {result["name"]:<26} {result["label"]}')
+                continue
+            note = '' if result['repairable'] else ' (ต้องแก้ไขด้วยผู้ดูแล)'
+            self.stdout.write(self.style.WARNING(
+                f'DRIFT {result["name"]:<26} {result["label"]}: {count} รายการ{note}'
+            ))
+            for key, expected, actual in result['samples']:
+                self.stdout.write(f'      {key}: ควรเป็น {expected}, ปัจจุบัน {actual}')
+            if result['repaired']:
+                self.stdout.write(self.style.SUCCESS(f'      ซ่อมแล้ว {result["repaired"]} รายการ'))
+            remaining += count - result['repaired']
+
+        if remaining and options['fail_on_drift']:
+            raise CommandError(f'ยังมีรายการไม่ตรงกัน {remaining} รายการ')
+        total = sum(result['count'] for result in report)
+        repaired = sum(result['repaired'] for result in report)
+        self.stdout.write(self.style.SUCCESS(
+            f'Done — {len(report)} checks, {total} discrepancies, {repaired} repaired'
+        ))
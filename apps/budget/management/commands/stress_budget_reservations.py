@@ -0,0 +1,175 @@
+"""Management command: ทดสอบการจอง/อนุมัติงบพร้อมกันหลาย thread บนกิจกรรมเดียว
+
+ยิงคำขอจองงบ (รายการรออนุมัติ) พร้อมกัน แล้วให้ "ผู้อนุมัติสองคน" อนุมัติแต่ละรายการพร้อมกัน
+จากนั้นตรวจว่า BudgetBalance ตรงกับยอดจริง ไม่มีการใช้เกินงบ และไม่มี deadlock — รายการทดสอบถูกลบคืนเมื่อจบ
+ต้องใช้ฐานข้อมูลที่มี row lock (SELECT ... FOR UPDATE เช่น MySQL) — SQLite ล็อกทั้งไฟล์ ผลจึงไม่ได้พิสูจน์อะไร
+เรื่องการแย่งกันจอง คำสั่งจะไม่รันบน SQLite เว้นแต่ระบุ --allow-no-row-locks (จบด้วยคำเตือน ไม่ใช่ Done)
+ทุก phase ต้องสำเร็จครบ — มี database error หรือจำนวนที่สำเร็จไม่ครบจะจบด้วย error
+"""
+import queue
+import threading
+import time
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connection
+from django.db.models.signals import post_save
+from django.utils import timezone
+
+from apps.budget import reservations
+from apps.budget.models import BudgetBalance, Expense
+from apps.budget.signals import check_budget_threshold
+from apps.projects.models import Activity
+
+STRESS_DESCRIPTION = 'STRESS TEST — budget reservation'
+
+
+class Command(BaseCommand):
+    help = "Hammer budget reservations/approvals on one activity from many threads and verify the balances"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--activity', type=int, required=True, help='Activity pk to run against')
+        parser.add_argument('--user', required=True, help='Username recorded as creator/approver')
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--requests', type=int, default=100, help='Number of expenses to reserve')
+        parser.add_argument('--amount', type=Decimal, default=Decimal('1000'))
+        parser.add_argument('--source', default='', help='budget_source of the test expenses')
+        parser.add_argument('--keep', action='store_true', help='Keep the test expenses instead of deleting them')
+        parser.add_argument(
+            '--allow-no-row-locks', action='store_true',
+            help='Run on a backend without SELECT ... FOR UPDATE (e.g. SQLite); the result says nothing about contention',
+        )
+
+    def handle(self, *args, **options):
+        row_locks = connection.features.has_select_for_update
+        if not row_locks and not options['allow_no_row_locks']:
+            raise CommandError(
+                f'ฐานข้อมูล {connection.vendor} ไม่มี row lock (SELECT ... FOR UPDATE) — ผลการทดสอบไม่มีความหมาย '
+                f'ให้รันบน MySQL หรือระบุ --allow-no-row-locks'
+            )
+        activity = Activity.objects.filter(pk=options['activity']).first()
+        if activity is None:
+            raise CommandError('ไม่พบกิจกรรม')
+        user = get_user_model().objects.filter(username=options['user']).first()
+        if user is None:
+            raise CommandError(f'ไม่พบผู้ใช้ "{options["user"]}"')
+        self.activity, self.user, self.options = activity, user, options
+        self.spent_before = reservations.totals_from_expenses([activity.pk])[(activity.pk, '')][0]
+
+        # ไม่ส่ง LINE ระหว่างทดสอบ
+        post_save.disconnect(check_budget_threshold, sender=Expense)
+        pks = []
+        try:
+            created = self._phase('reserve', range(options['requests']), self._reserve)
+            pks = [pk for pk in created['results'] if pk]
+            # เกินงบเป็นผลที่ถูกต้องเมื่อคำขอรวมเกินยอดจัดสรร — แต่ต้องจองได้อย่างน้อย 1 รายการจึงจะมีอะไรให้ทดสอบ
+            self._require('reserve', created, created['ok'] + created['exceeded'], options['requests'])
+            if not pks:
+                raise CommandError('reserve: ไม่มีรายการใดจองสำเร็จ — ไม่ได้ทดสอบการอนุมัติ')
+            # ผู้อนุมัติสองคนกดอนุมัติรายการเดียวกันพร้อมกัน — ต้องสำเร็จเพียงครั้งเดียว
+            approved = self._phase('approve', [pk for pk in pks for _ in range(2)], self._approve)
+            self._require('approve', approved, approved['ok'], len(pks))
+            self._verify()
+            if not options['keep']:
+                cleanup = self._phase('cleanup', pks, self._delete)
+                pks = []
+                self._require('cleanup', cleanup, cleanup['ok'], len(cleanup['results']))
+                self._verify()
+        finally:
+            if pks and not options['keep']:
+                # จบก่อนขั้น cleanup (error) — ลบรายการทดสอบที่ยังเหลือทีละรายการ
+                for expense in Expense.objects.filter(pk__in=pks):
+                    reservations.delete_expense(expense)
+            post_save.connect(check_budget_threshold, sender=Expense)
+        if not row_locks:
+            self.stdout.write(self.style.WARNING(
+                f'Finished on {connection.vendor} without row locks — balances consistent, '
+                f'but this run does not test concurrent reservations'
+            ))
+            return
+        self.stdout.write(self.style.SUCCESS('Done — balances consistent'))
+
+    def _require(self, name, stats, handled, expected):
+        """จบด้วย error ถ้ามี database error หรือจำนวนที่ทำสำเร็จไม่ครบตามที่สั่ง"""
+        if stats['errors'] or handled != expected:
+            raise CommandError(
+                f'{name}: สำเร็จ {handled} จาก {expected} รายการ '
+                f'(conflict {stats["conflict"]}, db errors {stats["errors"]})'
+            )
+
+    def _phase(self, name, items, work):
+        tasks = queue.Queue()
+        for item in items:
+            tasks.put(item)
+        stats = {'ok': 0, 'exceeded': 0, 'conflict': 0, 'errors': 0, 'results': []}
+        lock = threading.Lock()
+
+        def worker():
+            try:
+                while True:
+                    try:
+                        item = tasks.get_nowait()
+                    except queue.Empty:
+                        return
+                    try:
+                        result, outcome = work(item), 'ok'
+                    except reservations.BudgetExceeded:
+                        result, outcome = None, 'exceeded'
+                    except reservations.ReservationError:
+                        result, outcome = None, 'conflict'
+                    except DatabaseError as exc:
+                        result, outcome = None, 'errors'
+                        self.stderr.write(f'  {name}: {exc}')
+                    with lock:
+                        stats[outcome] += 1
+                        stats['results'].append(result)
+            finally:
+                connection.close()
+
+        started = time.perf_counter()
+        threads = [threading.Thread(target=worker) for _ in range(self.options['threads'])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        total = len(stats['results'])
+        self.stdout.write(
+            f'{name:8} {total} ops in {elapsed:.2f}s ({total / elapsed if elapsed else 0:.0f} ops/s) — '
+            f'ok {stats["ok"]}, over budget {stats["exceeded"]}, conflict {stats["conflict"]}, db errors {stats["errors"]}'
+        )
+        return stats
+
+    def _reserve(self, n):
+        expense = Expense(
+            activity=self.activity, description=STRESS_DESCRIPTION, amount=self.options['amount'],
+            expense_date=timezone.localdate(), receipt_number=f'STRESS-{n}',
+            budget_source=self.options['source'], created_by=self.user,
+        )
+        return reservations.save_expense(expense).pk
+
+    def _approve(self, pk):
+        expense = Expense.objects.get(pk=pk)
+        expense.status = 'approved'
+        expense.approved_by = self.user
+        expense.approved_at = timezone.now()
+        return reservations.save_expense(expense, expected_status='pending').pk
+
+    def _delete(self, pk):
+        reservations.delete_expense(Expense.objects.get(pk=pk))
+        return pk
+
+    def _verify(self):
+        expected = reservations.totals_from_expenses([self.activity.pk])
+        limit = Activity.objects.get(pk=self.activity.pk).allocated_budget
+        for balance in BudgetBalance.objects.filter(activity=self.activity):
+            spent, reserved = expected[(balance.activity_id, balance.source)]
+            if (balance.spent, balance.reserved) != (spent, reserved):
+                raise CommandError(
+                    f'balance {balance.source or "total"} drifted: row {balance.spent}/{balance.reserved}, '
+                    f'expenses {spent}/{reserved}'
+                )
+            if not balance.source and balance.spent > max(limit, self.spent_before):
+                raise CommandError(f'overspent: {balance.spent} > {limit}')
+        self.stdout.write(f'  verified — spent/reserved match expenses, within allocated {limit:,.2f}')
@@ -0,0 +1,52 @@
+# Generated by Django 5.1.15 on 2026-10-19 14:33
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def fill_budget_balances(apps, schema_editor):
+    Expense = apps.get_model('budget', 'Expense')
+    BudgetBalance = apps.get_model('budget', 'BudgetBalance')
+    totals = {}
+    rows = (
+        Expense.objects.filter(status__in=['approved', 'pending'])
+        .values('activity_id', 'budget_source', 'status').annotate(total=Sum('amount')).order_by()
+    )
+    for row in rows:
+        field = 'spent' if row['status'] == 'approved' else 'reserved'
+        for source in {'', row['budget_source']}:
+            balance = totals.setdefault((row['activity_id'], source), {'spent': 0, 'reserved': 0})
+            balance[field] += row['total']
+    BudgetBalance.objects.bulk_create(
+        [BudgetBalance(activity_id=a, source=s, **values) for (a, s), values in totals.items()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('budget', '0005_expense_budget_source'),
+        ('projects', '0015_activity_status_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BudgetBalance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(blank=True, choices=[('government', 'เงินแผ่นดิน'), ('accumulated', 'เงินสะสม'), ('revenue', 'เงินรายได้')], max_length=20, verbose_name='แหล่งเงิน')),
+                ('spent', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='ใช้ไป (อนุมัติแล้ว)')),
+                ('reserved', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='จองไว้ (รออนุมัติ)')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='แก้ไขเมื่อ')),
+                ('activity', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='budget_balances', to='projects.activity', verbose_name='กิจกรรม')),
+            ],
+            options={
+                'verbose_name': 'ยอดงบคงเหลือ',
+                'verbose_name_plural': 'ยอดงบคงเหลือ',
+                'unique_together': {('activity', 'source')},
+            },
+        ),
+        migrations.RunPython(fill_budget_balances, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.15 on 2026-10-19 14:40
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('budget', '0006_budgetbalance'),
+        ('projects', '0016_activity_composite_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['activity', 'status', 'budget_source'], name='expense_act_status_src_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['status', 'activity_report'], name='expense_status_report_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['created_by', 'status'], name='expense_creator_status_idx'),
+        ),
+    ]
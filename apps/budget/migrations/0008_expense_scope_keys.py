@@ -0,0 +1,58 @@
+# Generated by Django 5.1.15 on 2026-10-19 14:42
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def fill_scope_keys(apps, schema_editor):
+    Expense = apps.get_model('budget', 'Expense')
+    Activity = apps.get_model('projects', 'Activity')
+    activity = Activity.objects.filter(pk=OuterRef('activity_id'))
+    Expense.objects.update(
+        project_id=Subquery(activity.values('project_id')),
+        department_id=Subquery(activity.values('project__department_id')),
+        fiscal_year_id=Subquery(activity.values('project__fiscal_year_id')),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0011_auditlog_project_rollover'),
+        ('budget', '0007_expense_composite_indexes'),
+        ('projects', '0016_activity_composite_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='expense',
+            name='department',
+            field=models.ForeignKey(db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='accounts.department', verbose_name='แผนก'),
+        ),
+        migrations.AddField(
+            model_name='expense',
+            name='fiscal_year',
+            field=models.ForeignKey(db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='projects.fiscalyear', verbose_name='ปีงบประมาณ'),
+        ),
+        migrations.AddField(
+            model_name='expense',
+            name='project',
+            field=models.ForeignKey(db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='projects.project', verbose_name='โครงการ'),
+        ),
+        migrations.RunPython(fill_scope_keys, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['project', 'status'], name='expense_proj_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['department', 'status'], name='expense_dept_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['fiscal_year', 'status'], name='expense_fy_status_idx'),
+        ),
+    ]
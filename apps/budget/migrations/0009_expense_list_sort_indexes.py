@@ -0,0 +1,33 @@
+# Generated by Django 5.1.15 on 2026-10-19 14:45
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0011_auditlog_project_rollover'),
+        ('budget', '0008_expense_scope_keys'),
+        ('projects', '0016_activity_composite_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['created_at'], name='expense_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['expense_date'], name='expense_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['department', 'created_at'], name='expense_dept_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='expense',
+            index=models.Index(fields=['department', 'expense_date'], name='expense_dept_date_idx'),
+        ),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 5.1.15 on 2026-10-19 14:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncMonth
+
+
+def fill_spend_rollup(apps, schema_editor):
+    Expense = apps.get_model('budget', 'Expense')
+    SpendRollup = apps.get_model('budget', 'SpendRollup')
+    approved, pending = Q(status='approved'), Q(status='pending')
+    rows = (
+        Expense.objects.filter(status__in=['approved', 'pending'])
+        .values('fiscal_year_id', 'department_id', 'project_id', 'activity_id', 'budget_source')
+        .annotate(
+            month_start=TruncMonth('expense_date'),
+            approved_amount=Sum('amount', filter=approved),
+            approved_count=Count('id', filter=approved),
+            pending_amount=Sum('amount', filter=pending),
+            pending_count=Count('id', filter=pending),
+        )
+        .order_by()
+    )
+    SpendRollup.objects.bulk_create([
+        SpendRollup(
+            fiscal_year_id=row['fiscal_year_id'], department_id=row['department_id'],
+            project_id=row['project_id'], activity_id=row['activity_id'], source=row['budget_source'],
+            month=row['month_start'],
+            approved_amount=row['approved_amount'] or 0, approved_count=row['approved_count'],
+            pending_amount=row['pending_amount'] or 0, pending_count=row['pending_count'],
+        )
+        for row in rows
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0011_auditlog_project_rollover'),
+        ('budget', '0009_expense_list_sort_indexes'),
+        ('projects', '0016_activity_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SpendRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(help_text='วันที่ 1 ของเดือนที่เบิกจ่าย', verbose_name='เดือน')),
+                ('source', models.CharField(blank=True, choices=[('government', 'เงินแผ่นดิน'), ('accumulated', 'เงินสะสม'), ('revenue', 'เงินรายได้')], max_length=20, verbose_name='แหล่งเงิน')),
+                ('approved_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='ยอดอนุมัติ')),
+                ('approved_count', models.PositiveIntegerField(default=0, verbose_name='จำนวนรายการอนุมัติ')),
+                ('pending_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='ยอดรออนุมัติ')),
+                ('pending_count', models.PositiveIntegerField(default=0, verbose_name='จำนวนรายการรออนุมัติ')),
+                ('activity', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='projects.activity', verbose_name='กิจกรรม')),
+                ('department', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='accounts.department', verbose_name='แผนก')),
+                ('fiscal_year', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='projects.fiscalyear', verbose_name='ปีงบประมาณ')),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='projects.project', verbose_name='โครงการ')),
+            ],
+            options={
+                'verbose_name': 'ยอดเบิกจ่ายรายเดือน',
+                'verbose_name_plural': 'ยอดเบิกจ่ายรายเดือน',
+                'indexes': [models.Index(fields=['fiscal_year', 'month'], name='rollup_fy_month_idx'), models.Index(fields=['department', 'fiscal_year', 'month'], name='rollup_dept_fy_month_idx')],
+                'unique_together': {('activity', 'month', 'source')},
+            },
+        ),
+        migrations.RunPython(fill_spend_rollup, migrations.RunPython.noop),
+    ]
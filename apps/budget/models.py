@@ -7,6 +7,9 @@ SOURCE_CHOICES = [
     ('revenue', 'เงินรายได้'),
 ]
 
+# ฟิลด์ที่ Expense คัดลอกจากโครงการของกิจกรรม
+SCOPE_FIELDS = ('project', 'department', 'fiscal_year')
+
 
 class Expense(models.Model):
     STATUS_CHOICES = [
@@ -21,6 +24,35 @@ class Expense(models.Model):
         related_name='expenses',
         verbose_name='กิจกรรม',
     )
+    # คีย์ขอบเขตคัดลอกจาก activity.project (ดู sync_scope) — กรองตามสิทธิ์/ปีงบได้โดยไม่ต้อง join
+    # index อยู่ใน Meta.indexes คู่กับ status
+    project = models.ForeignKey(
+        'projects.Project',
+        on_delete=models.CASCADE,
+        null=True,
+        editable=False,
+        db_index=False,
+        related_name='+',
+        verbose_name='โครงการ',
+    )
+    department = models.ForeignKey(
+        'accounts.Department',
+        on_delete=models.PROTECT,
+        null=True,
+        editable=False,
+        db_index=False,
+        related_name='+',
+        verbose_name='แผนก',
+    )
+    fiscal_year = models.ForeignKey(
+        'projects.FiscalYear',
+        on_delete=models.PROTECT,
+        null=True,
+        editable=False,
+        db_index=False,
+        related_name='+',
+        verbose_name='ปีงบประมาณ',
+    )
     description = models.CharField('รายละเอียด', max_length=500)
     amount = models.DecimalField('จำนวนเงิน', max_digits=12, decimal_places=2)
     expense_date = models.DateField('วันที่เบิกจ่าย')
@@ -68,10 +100,110 @@ class Expense(models.Model):
         verbose_name = 'รายการเบิกจ่าย'
         verbose_name_plural = 'รายการเบิกจ่าย'
         ordering = ['-created_at']
+        indexes = [
+            # (activity, status) และ (activity, status, budget_source) — ยอดใช้/รออนุมัติรายกิจกรรม/แหล่งเงิน
+            models.Index(fields=['activity', 'status', 'budget_source'], name='expense_act_status_src_idx'),
+            # รายการที่ยังไม่ผูกกิจกรรมย่อย (dashboard/รายงาน)
+            models.Index(fields=['status', 'activity_report'], name='expense_status_report_idx'),
+            models.Index(fields=['created_by', 'status'], name='expense_creator_status_idx'),
+            models.Index(fields=['project', 'status'], name='expense_proj_status_idx'),
+            models.Index(fields=['department', 'status'], name='expense_dept_status_idx'),
+            models.Index(fields=['fiscal_year', 'status'], name='expense_fy_status_idx'),
+            # การเรียงของรายการเบิกจ่าย (keyset pagination) — ทั้งหมด และตามแผนก (ขอบเขตของ staff/head/planner)
+            models.Index(fields=['created_at'], name='expense_created_idx'),
+            models.Index(fields=['expense_date'], name='expense_date_idx'),
+            models.Index(fields=['department', 'created_at'], name='expense_dept_created_idx'),
+            models.Index(fields=['department', 'expense_date'], name='expense_dept_date_idx'),
+        ]
 
     def __str__(self):
         return f'{self.activity} - {self.description} ({self.amount:,.2f} บาท)'
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # กิจกรรมตอนโหลด — save() คัดลอกคีย์ขอบเขตใหม่เฉพาะเมื่อย้ายกิจกรรม
+        instance._scope_activity_id = instance.__dict__.get('activity_id')
+        return instance
+
+    def sync_scope(self):
+        """คัดลอกโครงการ/แผนก/ปีงบจากกิจกรรม (บันทึกแบบ bulk ต้องเรียกเองก่อน bulk_create)"""
+        project = self.activity.project
+        self.project = project
+        self.department_id = project.department_id
+        self.fiscal_year_id = project.fiscal_year_id
+        self._scope_activity_id = self.activity_id
+
+    def save(self, *args, **kwargs):
+        if self.project_id is None or getattr(self, '_scope_activity_id', None) != self.activity_id:
+            self.sync_scope()
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], *SCOPE_FIELDS}
+        super().save(*args, **kwargs)
+
+
+class BudgetBalance(models.Model):
+    """ยอดใช้/ยอดจองงบต่อ (กิจกรรม, แหล่งเงิน) — แถวที่ถูกล็อกตอนบันทึก/อนุมัติรายการเบิกจ่าย
+
+    source ว่าง = งบรวมทั้งกิจกรรม; ปรับค่าผ่าน apps.budget.reservations เท่านั้น
+    """
+    activity = models.ForeignKey(
+        'projects.Activity',
+        on_delete=models.CASCADE,
+        related_name='budget_balances',
+        verbose_name='กิจกรรม',
+    )
+    source = models.CharField('แหล่งเงิน', max_length=20, choices=SOURCE_CHOICES, blank=True)
+    spent = models.DecimalField('ใช้ไป (อนุมัติแล้ว)', max_digits=14, decimal_places=2, default=0)
+    reserved = models.DecimalField('จองไว้ (รออนุมัติ)', max_digits=14, decimal_places=2, default=0)
+    updated_at = models.DateTimeField('แก้ไขเมื่อ', auto_now=True)
+
+    class Meta:
+        verbose_name = 'ยอดงบคงเหลือ'
+        verbose_name_plural = 'ยอดงบคงเหลือ'
+        unique_together = ['activity', 'source']
+
+    def __str__(self):
+        return f'{self.activity_id}/{self.source or "รวม"}: ใช้ {self.spent:,.2f} จอง {self.reserved:,.2f}'
+
+
+class SpendRollup(models.Model):
+    """ยอดเบิกจ่ายรายเดือน (fact table) ต่อ (ปีงบ, เดือน, แผนก, โครงการ, กิจกรรม, แหล่งเงิน)
+
+    สร้างใหม่ทีละกิจกรรมจากรายการเบิกจ่ายจริงหลัง commit (apps.budget.rollup) —
+    กราฟแนวโน้มอ่านตารางนี้แทนการสแกนรายการเบิกจ่ายทั้งหมด
+    """
+    fiscal_year = models.ForeignKey(
+        'projects.FiscalYear', on_delete=models.CASCADE, related_name='+', verbose_name='ปีงบประมาณ',
+    )
+    month = models.DateField('เดือน', help_text='วันที่ 1 ของเดือนที่เบิกจ่าย')
+    department = models.ForeignKey(
+        'accounts.Department', on_delete=models.CASCADE, related_name='+', verbose_name='แผนก',
+    )
+    project = models.ForeignKey(
+        'projects.Project', on_delete=models.CASCADE, related_name='+', verbose_name='โครงการ',
+    )
+    activity = models.ForeignKey(
+        'projects.Activity', on_delete=models.CASCADE, related_name='+', verbose_name='กิจกรรม',
+    )
+    source = models.CharField('แหล่งเงิน', max_length=20, choices=SOURCE_CHOICES, blank=True)
+    approved_amount = models.DecimalField('ยอดอนุมัติ', max_digits=14, decimal_places=2, default=0)
+    approved_count = models.PositiveIntegerField('จำนวนรายการอนุมัติ', default=0)
+    pending_amount = models.DecimalField('ยอดรออนุมัติ', max_digits=14, decimal_places=2, default=0)
+    pending_count = models.PositiveIntegerField('จำนวนรายการรออนุมัติ', default=0)
+
+    class Meta:
+        verbose_name = 'ยอดเบิกจ่ายรายเดือน'
+        verbose_name_plural = 'ยอดเบิกจ่ายรายเดือน'
+        unique_together = ['activity', 'month', 'source']
+        indexes = [
+            models.Index(fields=['fiscal_year', 'month'], name='rollup_fy_month_idx'),
+            models.Index(fields=['department', 'fiscal_year', 'month'], name='rollup_dept_fy_month_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.activity_id} {self.month:%Y-%m} {self.source or "-"}: {self.approved_amount:,.2f}'
+
 
 class ExpenseComment(models.Model):
     expense = models.ForeignKey(
@@ -0,0 +1,325 @@
+"""ตรวจความสอดคล้องของยอดงบประมาณทั้งฐานข้อมูล (reconciliation)
+
+ค่าที่เก็บซ้ำ/สรุปไว้หลายจุดอาจคลาดกันได้ (signal ไม่ทำงานเพราะแก้ข้อมูลตรง, queryset.update, ฯลฯ)
+แต่ละการตรวจเป็น query แบบ set-based เดียว (หรือสองชุดที่อ่านแบบ stream แล้ว merge กัน)
+ไม่มี loop query ต่อโครงการ — คืนรายการที่ไม่ตรง และซ่อมได้เป็นชุด (ชุดละ transaction)
+
+    CHECKS: (ชื่อ, คำอธิบาย, ฟังก์ชันตรวจ, ฟังก์ชันซ่อม | None = รายงานอย่างเดียว ต้องแก้ด้วยคน)
+
+รันจากคำสั่ง reconcile_budgets หรือ Celery beat ทุกคืน (apps.budget.tasks.reconcile_budgets)
+"""
+from collections import defaultdict
+from decimal import Decimal
+from itertools import groupby
+from operator import attrgetter
+
+from django.db import transaction
+from django.db.models import Count, DecimalField, F, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from apps.projects import counters
+from apps.projects.models import Activity, Project, ProjectBudgetSource
+from apps.projects.signals import recalc_project_total_budget
+
+from . import reservations, rollup
+from .models import BudgetBalance, BudgetTransfer, Expense, SpendRollup
+
+ZERO = Value(Decimal('0'), output_field=DecimalField(max_digits=14, decimal_places=2))
+ROLLUP_FIELDS = ('approved_amount', 'approved_count', 'pending_amount', 'pending_count')
+
+
+def _batches(items, size):
+    items = list(items)
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+# ── งบรวมโครงการ = ผลรวมแหล่งเงิน ──
+
+def find_project_total_budget():
+    source_total = (
+        ProjectBudgetSource.objects.filter(project=OuterRef('pk'))
+        .values('project').annotate(total=Sum('amount')).values('total')
+    )
+    rows = (
+        Project.objects.annotate(expected=Coalesce(Subquery(source_total), ZERO))
+        .exclude(total_budget=F('expected'))
+        .order_by('pk').values_list('pk', 'expected', 'total_budget')
+    )
+    return rows.iterator()
+
+
+def repair_project_total_budget(keys):
+    recalc_project_total_budget(keys)
+
+
+# ── ตัวนับสถานะกิจกรรมบนโครงการ ──
+
+def find_activity_counters():
+    annotations = {
+        f'n_{status}': Count('activities', filter=Q(activities__status=status))
+        for status in counters.COUNTER_FIELD
+    }
+    rows = (
+        Project.objects.annotate(**annotations)
+        .exclude(**{field: F(f'n_{status}') for status, field in counters.COUNTER_FIELD.items()})
+        .order_by('pk')
+        .values_list('pk', *annotations, *counters.COUNTER_FIELD.values())
+    )
+    size = len(counters.COUNTER_FIELD)
+    for row in rows.iterator():
+        yield row[0], row[1:1 + size], row[1 + size:]
+
+
+def repair_activity_counters(keys):
+    counters.recount_activity_status(keys)
+
+
+# ── งบกิจกรรม = ผลรวมรายหมวดเงิน (Activity.save) ──
+
+SPLIT_TOTAL = F('budget_government') + F('budget_accumulated') + F('budget_revenue')
+
+
+def find_activity_allocation():
+    rows = (
+        Activity.objects.annotate(split=SPLIT_TOTAL)
+        .filter(
+            Q(no_budget=True, split__gt=0)
+            | Q(no_budget=True, allocated_budget__gt=0)
+            | Q(no_budget=False, split__gt=0) & ~Q(allocated_budget=F('split'))
+        )
+        .order_by('pk').values_list('pk', 'no_budget', 'split', 'allocated_budget')
+    )
+    for pk, no_budget, split, allocated in rows.iterator():
+        yield pk, Decimal('0') if no_budget else split, allocated
+
+
+def repair_activity_allocation(keys):
+    activities = Activity.objects.filter(pk__in=keys)
+    activities.filter(no_budget=True).update(
+        allocated_budget=0, budget_government=0, budget_accumulated=0, budget_revenue=0,
+    )
+    activities.filter(no_budget=False).update(allocated_budget=SPLIT_TOTAL)
+
+
+def find_activity_negative_budget():
+    rows = (
+        Activity.objects.filter(
+            Q(budget_government__lt=0) | Q(budget_accumulated__lt=0) | Q(budget_revenue__lt=0),
+        )
+        .order_by('pk').values_list('pk', 'budget_government', 'budget_accumulated', 'budget_revenue')
+    )
+    for pk, *split in rows.iterator():
+        yield pk, '>= 0', tuple(split)
+
+
+# ── งบที่จัดสรรให้กิจกรรมรวมกันต้องไม่เกินงบโครงการ (รวมผลของการโอนงบ) ──
+
+def find_project_over_allocated():
+    allocated = (
+        Activity.objects.filter(project=OuterRef('pk'))
+        .values('project').annotate(total=Sum('allocated_budget')).values('total')
+    )
+    rows = (
+        Project.objects.annotate(allocated=Coalesce(Subquery(allocated), ZERO))
+        .filter(allocated__gt=F('total_budget'))
+        .order_by('pk').values_list('pk', 'total_budget', 'allocated')
+    )
+    return rows.iterator()
+
+
+# ── การโอนงบต้องอยู่ภายในโครงการเดียวกัน ──
+
+def find_transfer_scope():
+    rows = (
+        BudgetTransfer.objects.filter(
+            ~Q(from_activity__project_id=F('project_id'))
+            | ~Q(to_activity__project_id=F('project_id'))
+            | Q(from_activity_id=F('to_activity_id'))
+        )
+        .order_by('pk').values_list('pk', 'project_id', 'from_activity__project_id', 'to_activity__project_id')
+    )
+    for pk, project_id, from_project_id, to_project_id in rows.iterator():
+        yield pk, project_id, (from_project_id, to_project_id)
+
+
+# ── คีย์ขอบเขตบนรายการเบิกจ่าย (project/department/fiscal_year) ตรงกับกิจกรรม ──
+
+def find_expense_scope():
+    scope = {
+        'p': Coalesce('project_id', 0), 'd': Coalesce('department_id', 0), 'f': Coalesce('fiscal_year_id', 0),
+        'ep': F('activity__project_id'),
+        'ed': Coalesce('activity__project__department_id', 0),
+        'ef': F('activity__project__fiscal_year_id'),
+    }
+    rows = (
+        Expense.objects.annotate(**scope).filter(~Q(p=F('ep')) | ~Q(d=F('ed')) | ~Q(f=F('ef')))
+        .order_by('pk').values_list('pk', 'ep', 'ed', 'ef', 'p', 'd', 'f')
+    )
+    for pk, *values in rows.iterator():
+        yield pk, tuple(values[:3]), tuple(values[3:])
+
+
+def repair_expense_scope(keys):
+    activity = Activity.objects.filter(pk=OuterRef('activity_id'))
+    expenses = Expense.objects.filter(pk__in=keys)
+    activity_ids = set(expenses.values_list('activity_id', flat=True))
+    expenses.update(
+        project_id=Subquery(activity.values('project_id')),
+        department_id=Subquery(activity.values('project__department_id')),
+        fiscal_year_id=Subquery(activity.values('project__fiscal_year_id')),
+    )
+    rollup.refresh_activities(activity_ids)
+
+
+# ── BudgetBalance (spent/reserved) = ยอดจากรายการเบิกจ่ายจริง ──
+
+def find_budget_balance():
+    """อ่านยอดรวมจากรายการเบิกจ่ายและแถว BudgetBalance แบบ stream เรียงตามกิจกรรมทั้งสองฝั่ง แล้ว merge
+    (ไม่มีแถว = ยังไม่เคยจอง — reservations สร้างจากรายการจริงเองเมื่อใช้ จึงตรวจเฉพาะแถวที่มีอยู่)"""
+    expense_rows = (
+        Expense.objects.filter(status__in=['approved', 'pending'])
+        .values_list('activity_id', 'budget_source', 'status').annotate(total=Sum('amount'))
+        .order_by('activity_id')
+    ).iterator()
+    balance_rows = (
+        BudgetBalance.objects.order_by('activity_id', 'source')
+        .values_list('activity_id', 'source', 'spent', 'reserved')
+    ).iterator()
+
+    expense_groups = groupby(expense_rows, key=lambda row: row[0])
+    current = next(expense_groups, None)
+    for activity_id, balances in groupby(balance_rows, key=lambda row: row[0]):
+        while current is not None and current[0] < activity_id:
+            current = next(expense_groups, None)
+        totals = defaultdict(lambda: [Decimal('0'), Decimal('0')])
+        if current is not None and current[0] == activity_id:
+            for _, source, status, total in current[1]:
+                index = 0 if status == 'approved' else 1
+                for key in {reservations.TOTAL, source}:
+                    totals[key][index] += total
+        for _, source, spent, reserved in balances:
+            expected = tuple(totals[source]) if source in totals else (Decimal('0'), Decimal('0'))
+            if expected != (spent, reserved):
+                yield (activity_id, source), expected, (spent, reserved)
+
+
+def repair_budget_balance(keys):
+    """ล็อกแถว BudgetBalance (ลำดับเดียวกับ reservations) แล้วคำนวณจากรายการจริงใหม่ภายใต้ล็อก"""
+    activity_ids = {activity_id for activity_id, _ in keys}
+    rows = list(
+        BudgetBalance.objects.select_for_update().filter(activity_id__in=activity_ids)
+        .order_by('activity_id', 'source')
+    )
+    totals = reservations.totals_from_expenses(activity_ids)
+    now = timezone.now()
+    for row in rows:
+        row.spent, row.reserved = totals[(row.activity_id, row.source)]
+        row.updated_at = now
+    BudgetBalance.objects.bulk_update(rows, ['spent', 'reserved', 'updated_at'])
+
+
+# ── SpendRollup = ยอดรายเดือนจากรายการเบิกจ่ายจริง ──
+
+def _rollup_key(row):
+    return (row.fiscal_year_id, row.department_id, row.project_id, row.activity_id, row.source, row.month)
+
+
+def _merge_by_activity(left, right):
+    """merge สอง stream ของแถวที่เรียงตาม activity_id — yield (activity_id, [แถวซ้าย], [แถวขวา])"""
+    left = ((key, list(rows)) for key, rows in groupby(left, key=attrgetter('activity_id')))
+    right = ((key, list(rows)) for key, rows in groupby(right, key=attrgetter('activity_id')))
+    current_left, current_right = next(left, None), next(right, None)
+    while current_left is not None or current_right is not None:
+        if current_right is None or (current_left is not None and current_left[0] < current_right[0]):
+            yield current_left[0], current_left[1], []
+            current_left = next(left, None)
+        elif current_left is None or current_right[0] < current_left[0]:
+            yield current_right[0], [], current_right[1]
+            current_right = next(right, None)
+        else:
+            yield current_left[0], current_left[1], current_right[1]
+            current_left, current_right = next(left, None), next(right, None)
+
+
+def rollup_drift(fiscal_year=None):
+    """yield (key, แถวที่ควรเป็น | None, แถวในตาราง | None) ที่ต่างกัน — key ขึ้นต้นด้วย (ปีงบ, แผนก, โครงการ, กิจกรรม)
+
+    อ่านยอดจากรายการเบิกจ่ายและแถว SpendRollup แบบ stream เรียงตามกิจกรรมทั้งสองฝั่ง แล้ว merge ทีละกิจกรรม
+    """
+    expenses = Expense.objects.all()
+    existing = SpendRollup.objects.all()
+    if fiscal_year is not None:
+        expenses = expenses.filter(fiscal_year=fiscal_year)
+        existing = existing.filter(fiscal_year=fiscal_year)
+    merged = _merge_by_activity(
+        rollup.iter_rollup_rows(expenses), existing.order_by('activity_id').iterator(),
+    )
+    for _, fresh_rows, stored_rows in merged:
+        fresh = {_rollup_key(row): row for row in fresh_rows}
+        stored = {_rollup_key(row): row for row in stored_rows}
+        for key in sorted(fresh.keys() | stored.keys(), key=str):
+            if (
+                key not in fresh or key not in stored
+                or any(getattr(fresh[key], f) != getattr(stored[key], f) for f in ROLLUP_FIELDS)
+            ):
+                yield key, fresh.get(key), stored.get(key)
+
+
+def find_spend_rollup():
+    def values(row):
+        return tuple(getattr(row, f) for f in ROLLUP_FIELDS) if row is not None else None
+
+    for key, fresh, stored in rollup_drift():
+        yield key, values(fresh), values(stored)
+
+
+def repair_spend_rollup(keys):
+    rollup.refresh_activities({key[3] for key in keys})
+
+
+CHECKS = [
+    ('project_total_budget', 'งบรวมโครงการ ≠ ผลรวมแหล่งเงิน', find_project_total_budget, repair_project_total_budget),
+    ('activity_counters', 'ตัวนับสถานะกิจกรรมบนโครงการไม่ตรง', find_activity_counters, repair_activity_counters),
+    ('activity_allocation', 'งบกิจกรรม ≠ ผลรวมรายหมวดเงิน', find_activity_allocation, repair_activity_allocation),
+    ('activity_negative_budget', 'งบรายหมวดของกิจกรรมติดลบ (หลังโอนงบ)', find_activity_negative_budget, None),
+    ('project_over_allocated', 'งบที่จัดสรรให้กิจกรรมเกินงบโครงการ', find_project_over_allocated, None),
+    ('transfer_scope', 'การโอนงบข้ามโครงการ/โอนให้กิจกรรมเดียวกัน', find_transfer_scope, None),
+    ('expense_scope', 'คีย์โครงการ/แผนก/ปีงบบนรายการเบิกจ่ายไม่ตรงกับกิจกรรม', find_expense_scope, repair_expense_scope),
+    ('budget_balance', 'ยอดใช้/จอง (BudgetBalance) ≠ รายการเบิกจ่ายจริง', find_budget_balance, repair_budget_balance),
+    ('spend_rollup', 'ยอดรายเดือน (SpendRollup) ≠ รายการเบิกจ่ายจริง', find_spend_rollup, repair_spend_rollup),
+]
+CHECK_NAMES = [name for name, *_ in CHECKS]
+
+
+def reconcile(names=None, repair=False, batch_size=500, sample=20):
+    """รันการตรวจ (ทั้งหมดหรือเฉพาะ names) — คืน [{'name', 'label', 'count', 'samples', 'repairable', 'repaired'}]
+
+    samples: [(key, ค่าที่ควรเป็น, ค่าปัจจุบัน)] ไม่เกิน sample รายการ
+    repair=True ซ่อมเฉพาะการตรวจที่มีฟังก์ชันซ่อม ทีละ batch_size รายการ (ชุดละ transaction)
+    """
+    report = []
+    for name, label, find, fix in CHECKS:
+        if names and name not in names:
+            continue
+        keys, samples = [], []
+        for key, expected, actual in find():
+            keys.append(key)
+            if len(samples) < sample:
+                samples.append((key, expected, actual))
+        repaired = 0
+        if repair and fix is not None and keys:
+            for batch in _batches(keys, batch_size):
+                with transaction.atomic():
+                    fix(batch)
+                repaired += len(batch)
+        report.append({
+            'name': name,
+            'label': label,
+            'count': len(keys),
+            'samples': samples,
+            'repairable': fix is not None,
+            'repaired': repaired,
+        })
+    return report
@@ -0,0 +1,238 @@
+"""การจองงบประมาณต่อ (กิจกรรม, แหล่งเงิน)
+
+รายการรออนุมัติ "จอง" งบไว้ (reserved) ส่วนรายการที่อนุมัติแล้วนับเป็นยอดใช้ (spent) ในแถว BudgetBalance
+ทุกการเปลี่ยนแปลงจะล็อกแถวที่เกี่ยวข้องด้วย select_for_update ตามลำดับ (activity_id, source) เสมอ
+แล้วตรวจยอดและปรับค่าใน transaction เดียวกัน ไม่มีงานภายนอกระหว่างถือล็อก (แจ้งเตือนส่งหลัง commit)
+ลำดับล็อกคงที่: แถว Expense (เรียงตาม pk) → แถว BudgetBalance (เรียงตาม activity_id, source)
+"""
+from collections import defaultdict
+from decimal import Decimal
+from functools import reduce
+from operator import or_
+
+from django.db import models, transaction
+from django.db.models import Q, Sum
+from django.utils import timezone
+
+from apps.projects.models import Activity
+
+from . import rollup
+from .models import SOURCE_CHOICES, BudgetBalance, Expense
+
+TOTAL = ''  # source ของแถวงบรวมทั้งกิจกรรม
+STATE_FIELDS = ('activity_id', 'budget_source', 'status', 'amount')
+
+
+class ReservationError(Exception):
+    """บันทึกรายการเบิกจ่ายไม่ได้ — ข้อความพร้อมแสดงให้ผู้ใช้"""
+
+
+class BudgetExceeded(ReservationError):
+    """ยอดเกินงบคงเหลือของกิจกรรม/แหล่งเงิน"""
+
+
+def expense_state(expense):
+    """(activity_id, budget_source, status, amount) — ส่วนของรายการที่มีผลต่อยอดงบ"""
+    return tuple(getattr(expense, field) for field in STATE_FIELDS)
+
+
+def _contributions(state):
+    """{(activity_id, source): (spent, reserved)} ที่รายการในสถานะนี้ถืออยู่"""
+    if state is None:
+        return {}
+    activity_id, source, status, amount = state
+    if status == 'approved':
+        value = (amount, Decimal('0'))
+    elif status == 'pending':
+        value = (Decimal('0'), amount)
+    else:
+        return {}
+    keys = {(activity_id, TOTAL), (activity_id, source)}
+    return {key: value for key in keys}
+
+
+def totals_from_expenses(activity_ids):
+    """คำนวณยอดใช้/ยอดจองจากรายการเบิกจ่ายจริง — {(activity_id, source): [spent, reserved]}"""
+    totals = defaultdict(lambda: [Decimal('0'), Decimal('0')])
+    rows = (
+        Expense.objects.filter(activity_id__in=activity_ids, status__in=['approved', 'pending'])
+        .values('activity_id', 'budget_source', 'status').annotate(total=Sum('amount')).order_by()
+    )
+    for row in rows:
+        index = 0 if row['status'] == 'approved' else 1
+        for source in {TOTAL, row['budget_source']}:
+            totals[(row['activity_id'], source)][index] += row['total']
+    return totals
+
+
+def _ensure_rows(keys):
+    """สร้างแถว BudgetBalance ที่ยังไม่มี โดยตั้งต้นจากรายการที่ commit แล้ว"""
+    activity_ids = {activity_id for activity_id, _ in keys}
+    existing = set(
+        BudgetBalance.objects.filter(activity_id__in=activity_ids).values_list('activity_id', 'source')
+    )
+    missing = set(keys) - existing
+    if not missing:
+        return
+    totals = totals_from_expenses({activity_id for activity_id, _ in missing})
+    BudgetBalance.objects.bulk_create([
+        BudgetBalance(activity_id=activity_id, source=source,
+                      spent=totals[(activity_id, source)][0], reserved=totals[(activity_id, source)][1])
+        for activity_id, source in sorted(missing)
+    ], ignore_conflicts=True)
+
+
+def _limits(activity_ids):
+    """วงเงินของแต่ละ (activity_id, source) — None = ไม่จำกัดรายแหล่ง (กิจกรรมไม่ได้แยกงบตามหมวดเงิน)
+    และชื่อกิจกรรมที่ key = activity_id (ใช้ในข้อความแจ้งเตือน)"""
+    limits = {}
+    for activity in Activity.objects.filter(pk__in=activity_ids).only(
+        'name', 'allocated_budget', 'budget_government', 'budget_accumulated', 'budget_revenue',
+    ):
+        limits[activity.pk] = activity.name
+        limits[(activity.pk, TOTAL)] = activity.allocated_budget
+        split = {source: getattr(activity, f'budget_{source}') for source, _ in SOURCE_CHOICES}
+        for source, amount in split.items():
+            limits[(activity.pk, source)] = amount if any(split.values()) else None
+    return limits
+
+
+def available(activity_ids):
+    """งบคงเหลือ (วงเงิน - ยอดใช้ - ยอดจอง) ต่อ (activity_id, source) ตามกฎของ apply_changes — ไม่ล็อกแถว
+
+    ใช้ตรวจล่วงหน้า (เช่นหน้า preview การนำเข้า) — None = ไม่จำกัดรายแหล่ง
+    """
+    activity_ids = set(activity_ids)
+    keys = [(a, s) for a in activity_ids for s in (TOTAL, *(source for source, _ in SOURCE_CHOICES))]
+    balances = {
+        (activity_id, source): spent + reserved
+        for activity_id, source, spent, reserved in BudgetBalance.objects.filter(
+            activity_id__in=activity_ids,
+        ).values_list('activity_id', 'source', 'spent', 'reserved')
+    }
+    # แถวที่ยังไม่มี — ตั้งต้นจากรายการที่ commit แล้วแบบเดียวกับ _ensure_rows
+    missing = {activity_id for activity_id, source in keys if (activity_id, source) not in balances}
+    totals = totals_from_expenses(missing) if missing else {}
+    limits = _limits(activity_ids)
+    result = {}
+    for key in keys:
+        limit = limits.get(key)
+        used = balances[key] if key in balances else sum(totals[key])
+        result[key] = None if limit is None else limit - used
+    return result
+
+
+def apply_changes(changes):
+    """ปรับยอดตามคู่ (สถานะเดิม, สถานะใหม่) ของรายการเบิกจ่าย — ต้องเรียกภายใน transaction.atomic()
+
+    ตรวจเฉพาะแถวที่ยอดเพิ่มขึ้น: ยอดใช้ต้องไม่เกินวงเงิน และยอดใช้ + ยอดจองต้องไม่เกินวงเงิน
+    (อนุมัติรายการที่จองไว้แล้วจึงไม่ถูกกันด้วยยอดจองของรายการอื่น) — ยกเว้น BudgetExceeded
+    กิจกรรมทั้งฝั่งเดิม/ใหม่ถูก mark ให้คำนวณยอดรายเดือน (SpendRollup) ใหม่หลัง commit
+    """
+    changes = list(changes)
+    rollup.mark_activities(*{state[0] for pair in changes for state in pair if state is not None})
+    deltas = defaultdict(lambda: [Decimal('0'), Decimal('0')])
+    for old, new in changes:
+        for key, (spent, reserved) in _contributions(new).items():
+            deltas[key][0] += spent
+            deltas[key][1] += reserved
+        for key, (spent, reserved) in _contributions(old).items():
+            deltas[key][0] -= spent
+            deltas[key][1] -= reserved
+    deltas = {key: value for key, value in deltas.items() if any(value)}
+    if not deltas:
+        return
+
+    _ensure_rows(deltas)
+    rows = list(
+        BudgetBalance.objects.select_for_update()
+        .filter(reduce(or_, (Q(activity_id=a, source=s) for a, s in deltas)))
+        .order_by('activity_id', 'source')
+    )
+    limits = _limits({activity_id for activity_id, _ in deltas})
+    labels = dict(SOURCE_CHOICES)
+    now = timezone.now()
+    for row in rows:
+        d_spent, d_reserved = deltas[(row.activity_id, row.source)]
+        spent, reserved = row.spent + d_spent, row.reserved + d_reserved
+        limit = limits.get((row.activity_id, row.source))
+        if limit is not None:
+            label = f'งบ{labels[row.source]}' if row.source else 'งบประมาณ'
+            activity = limits[row.activity_id]
+            if d_spent > 0 and spent > limit:
+                raise BudgetExceeded(
+                    f'จำนวนเงินเกิน{label}คงเหลือของกิจกรรม "{activity}" '
+                    f'(คงเหลือ {limit - row.spent:,.2f} บาท)'
+                )
+            if d_spent + d_reserved > 0 and spent + reserved > limit:
+                raise BudgetExceeded(
+                    f'จำนวนเงินเกิน{label}คงเหลือของกิจกรรม "{activity}" รวมยอดที่รออนุมัติ '
+                    f'(คงเหลือ {limit - row.spent - row.reserved:,.2f} บาท)'
+                )
+        row.spent, row.reserved, row.updated_at = spent, reserved, now
+    BudgetBalance.objects.bulk_update(rows, ['spent', 'reserved', 'updated_at'])
+
+
+def _lock_states(pks):
+    """ล็อกแถว Expense (เรียงตาม pk) และคืนสถานะปัจจุบันใน DB"""
+    return {
+        row[0]: row[1:]
+        for row in Expense.objects.select_for_update().filter(pk__in=pks).order_by('pk')
+        .values_list('pk', *STATE_FIELDS)
+    }
+
+
+def save_expense(expense, expected_status=None):
+    """บันทึกรายการเบิกจ่ายพร้อมจอง/ตัดงบภายใต้ล็อก
+
+    expected_status: สถานะที่ผู้เรียกเห็นก่อนแก้ (เช่น 'pending' ตอนอนุมัติ) — ถ้าใน DB เปลี่ยนไปแล้ว
+    ยกเว้น ReservationError แทนการเขียนทับ
+    """
+    # เขียนไฟล์หลักฐานลง storage ก่อนเข้าล็อก — transaction จะได้สั้นที่สุด
+    for field in expense._meta.concrete_fields:
+        if isinstance(field, models.FileField):
+            field.pre_save(expense, expense._state.adding)
+    with transaction.atomic():
+        old = None
+        if expense.pk:
+            old = _lock_states([expense.pk]).get(expense.pk)
+            if old and expected_status and old[2] != expected_status:
+                raise ReservationError('รายการนี้ถูกดำเนินการโดยผู้ใช้อื่นแล้ว')
+        apply_changes([(old, expense_state(expense))])
+        expense.save()
+    return expense
+
+
+def decide_expenses(pks, status, approver, remark=''):
+    """อนุมัติ/ไม่อนุมัติรายการรออนุมัติหลายรายการใน transaction เดียว
+
+    ล็อกทุกรายการ (เรียงตาม pk) แล้วตรวจงบของทั้งชุดในรอบเดียว — ถ้าเกินงบจะไม่มีรายการใดถูกบันทึก
+    รายการที่ผู้อื่นดำเนินการไปก่อนแล้วจะถูกข้าม; คืน (รายการที่บันทึก, จำนวนที่ข้าม)
+    ไม่ผ่าน save() — ผู้เรียกต้องทำงานแทน signal เอง (audit/แจ้งเตือน/ดัชนีค้นหา)
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        states = _lock_states(pks)
+        pending = sorted(pk for pk, state in states.items() if state[2] == 'pending')
+        apply_changes([(states[pk], states[pk][:2] + (status, states[pk][3])) for pk in pending])
+        expenses = list(Expense.objects.filter(pk__in=pending).select_related(
+            'activity__project', 'created_by__profile',
+        ))
+        for expense in expenses:
+            expense.status = status
+            expense.approved_by = approver
+            expense.approved_at = now
+            expense.remark = remark
+            expense.updated_at = now
+        Expense.objects.bulk_update(
+            expenses, ['status', 'approved_by', 'approved_at', 'remark', 'updated_at'], batch_size=500,
+        )
+    return expenses, len(pks) - len(expenses)
+
+
+def delete_expense(expense):
+    """ลบรายการเบิกจ่ายและคืนยอดที่จอง/ใช้ไว้"""
+    with transaction.atomic():
+        old = _lock_states([expense.pk]).get(expense.pk)
+        apply_changes([(old, None)])
+        expense.delete()
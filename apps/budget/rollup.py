@@ -0,0 +1,157 @@
+"""ยอดเบิกจ่ายรายเดือน (SpendRollup)
+
+แถวของกิจกรรมที่รายการเบิกจ่ายเปลี่ยนจะถูกคำนวณใหม่ทั้งชุดจากรายการจริงหลัง commit
+(recalc 'spend_rollup' — idempotent) จึงถูกต้องเสมอไม่ว่าการเปลี่ยนจะมาจาก save(), bulk_update
+หรือ bulk_create ขอเพียงเรียก mark_activities() — ต้นทางหลักคือ reservations.apply_changes และ signal
+ของ Expense; rebuild() ใช้สร้างทั้งตารางใหม่ (คำสั่ง rebuild_spend_rollup)
+"""
+from datetime import date
+
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncMonth
+
+from apps.projects import recalc, versions
+from apps.projects.models import Activity
+
+from .models import SOURCE_CHOICES, Expense, SpendRollup
+
+APPROVED, PENDING = Q(status='approved'), Q(status='pending')
+VERSION_KEY = 'spend_rollup'
+
+
+def data_version():
+    """เวอร์ชันของตาราง — เปลี่ยนทุกครั้งที่มีการเขียนแถว (ใช้ประกอบ cache key ของผลที่คำนวณจากตาราง)"""
+    return versions.get(VERSION_KEY)
+
+
+def bump_data_version():
+    versions.bump_on_commit(VERSION_KEY)
+
+
+def mark_activities(*activity_ids):
+    """คำนวณยอดรายเดือนของกิจกรรมเหล่านี้ใหม่เมื่อ transaction ปัจจุบัน commit"""
+    recalc.mark_dirty('spend_rollup', *activity_ids)
+
+
+def _grouped(expenses):
+    return (
+        expenses.filter(status__in=['approved', 'pending'])
+        .values('fiscal_year_id', 'department_id', 'project_id', 'activity_id', 'budget_source')
+        .annotate(
+            month_start=TruncMonth('expense_date'),
+            approved_amount=Sum('amount', filter=APPROVED),
+            approved_count=Count('id', filter=APPROVED),
+            pending_amount=Sum('amount', filter=PENDING),
+            pending_count=Count('id', filter=PENDING),
+        )
+    )
+
+
+def _rollup_row(row):
+    return SpendRollup(
+        fiscal_year_id=row['fiscal_year_id'],
+        department_id=row['department_id'],
+        project_id=row['project_id'],
+        activity_id=row['activity_id'],
+        source=row['budget_source'],
+        month=row['month_start'],
+        approved_amount=row['approved_amount'] or 0,
+        approved_count=row['approved_count'],
+        pending_amount=row['pending_amount'] or 0,
+        pending_count=row['pending_count'],
+    )
+
+
+def rollup_rows(expenses):
+    """รวมรายการเบิกจ่าย (approved/pending) เป็นแถว SpendRollup — GROUP BY เดียวใน SQL"""
+    return [_rollup_row(row) for row in _grouped(expenses).order_by()]
+
+
+def iter_rollup_rows(expenses):
+    """แบบเดียวกับ rollup_rows แต่อ่านแบบ stream เรียงตามกิจกรรม (ใช้ merge กับตาราง — ไม่โหลดทั้งชุด)"""
+    rows = _grouped(expenses).order_by('activity_id').iterator()
+    return (_rollup_row(row) for row in rows)
+
+
+def count_rollup_rows(expenses):
+    """จำนวนแถวที่ rollup_rows จะได้ — นับใน SQL"""
+    return _grouped(expenses).order_by().count()
+
+
+@recalc.handler('spend_rollup')
+def refresh_activities(activity_ids):
+    """แทนที่แถวของกิจกรรมเหล่านี้ด้วยยอดที่คำนวณใหม่ — ล็อกแถวกิจกรรมกันการคำนวณซ้อน"""
+    with transaction.atomic():
+        activity_ids = list(
+            Activity.objects.select_for_update().filter(pk__in=activity_ids)
+            .order_by('pk').values_list('pk', flat=True)
+        )
+        SpendRollup.objects.filter(activity_id__in=activity_ids).delete()
+        SpendRollup.objects.bulk_create(
+            rollup_rows(Expense.objects.filter(activity_id__in=activity_ids)), batch_size=1000,
+        )
+        bump_data_version()
+
+
+def rebuild(fiscal_year=None):
+    """สร้างตารางใหม่ทั้งหมด (หรือเฉพาะปีงบ) — คืนจำนวนแถวที่สร้าง"""
+    expenses = Expense.objects.all()
+    existing = SpendRollup.objects.all()
+    if fiscal_year is not None:
+        expenses = expenses.filter(fiscal_year=fiscal_year)
+        existing = existing.filter(fiscal_year=fiscal_year)
+    with transaction.atomic():
+        rows = rollup_rows(expenses)
+        existing.delete()
+        SpendRollup.objects.bulk_create(rows, batch_size=1000)
+        bump_data_version()
+    return len(rows)
+
+
+def fiscal_months(fiscal_year):
+    """วันที่ 1 ของทุกเดือนในปีงบ (เช่น ต.ค. – ก.ย.)"""
+    months = []
+    current = fiscal_year.start_date.replace(day=1)
+    while current <= fiscal_year.end_date:
+        months.append(current)
+        current = date(current.year + current.month // 12, current.month % 12 + 1, 1)
+    return months
+
+
+def monthly_burn(fiscal_year, total_budget):
+    """ชุดข้อมูลกราฟยอดเบิกจ่ายรายเดือนของปีงบ — อ่านแถวที่รวมแล้วไม่เกิน (เดือน × แหล่งเงิน)
+
+    คืน {'months', 'by_source': {source: [...]}, 'untagged', 'pending', 'cumulative', 'cumulative_pct', 'plan_pct'}
+    plan_pct = เส้นเบิกจ่ายตามแผนแบบเฉลี่ยเท่ากันทุกเดือน
+    """
+    months = fiscal_months(fiscal_year)
+    position = {month: i for i, month in enumerate(months)}
+    rows = SpendRollup.objects.filter(fiscal_year=fiscal_year).values('month', 'source').annotate(
+        approved=Sum('approved_amount'), pending=Sum('pending_amount'),
+    ).order_by()
+
+    by_source = {source: [0.0] * len(months) for source, _ in SOURCE_CHOICES}
+    untagged = [0.0] * len(months)
+    pending = [0.0] * len(months)
+    for row in rows:
+        i = position.get(row['month'])
+        if i is None:  # วันที่เบิกจ่ายอยู่นอกช่วงปีงบ
+            continue
+        (by_source[row['source']] if row['source'] else untagged)[i] += float(row['approved'])
+        pending[i] += float(row['pending'])
+
+    cumulative, running = [], 0.0
+    for i in range(len(months)):
+        running += untagged[i] + sum(series[i] for series in by_source.values())
+        cumulative.append(round(running, 2))
+    budget = float(total_budget or 0)
+    return {
+        'months': [month.isoformat() for month in months],
+        'by_source': by_source,
+        'untagged': untagged,
+        'pending': pending,
+        'cumulative': cumulative,
+        'cumulative_pct': [round(value / budget * 100, 1) if budget else 0 for value in cumulative],
+        'plan_pct': [round((i + 1) / len(months) * 100, 1) for i in range(len(months))],
+    }
@@ -1,15 +1,71 @@
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
+from . import rollup
 from .models import Expense
 
 
+@receiver(post_save, sender='projects.Project')
+def sync_expense_scope_from_project(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    """แผนก/ปีงบของโครงการเปลี่ยน — ปรับคีย์ขอบเขตบนรายการเบิกจ่ายของโครงการให้ตรง (ไม่เปลี่ยน = ไม่มี query)"""
+    if raw or created or (update_fields is not None and not {'department', 'fiscal_year'} & set(update_fields)):
+        return
+    scope = (instance.department_id, instance.fiscal_year_id)
+    loaded = (getattr(instance, '_loaded_department_id', None), getattr(instance, '_loaded_fiscal_year_id', None))
+    if loaded == scope:
+        return
+    moved = Expense.objects.filter(project_id=instance.pk).exclude(
+        department_id=instance.department_id, fiscal_year_id=instance.fiscal_year_id,
+    ).update(department_id=instance.department_id, fiscal_year_id=instance.fiscal_year_id)
+    if moved:
+        rollup.mark_activities(*instance.activities.values_list('pk', flat=True))
+    instance._loaded_department_id, instance._loaded_fiscal_year_id = scope
+
+
+@receiver(post_save, sender='projects.Activity')
+def sync_expense_scope_from_activity(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    """กิจกรรมถูกย้ายไปโครงการอื่น — ย้ายคีย์ขอบเขตของรายการเบิกจ่ายตาม (ไม่ย้าย = ไม่มี query)"""
+    if raw or created or (update_fields is not None and 'project' not in update_fields):
+        return
+    if getattr(instance, '_loaded_project_id', None) == instance.project_id:
+        return
+    project = instance.project
+    if Expense.objects.filter(activity_id=instance.pk).exclude(project_id=project.pk).update(
+        project_id=project.pk, department_id=project.department_id, fiscal_year_id=project.fiscal_year_id,
+    ):
+        rollup.mark_activities(instance.pk)
+    instance._loaded_project_id = instance.project_id
+
+
+@receiver([post_save, post_delete], sender=Expense)
+def clear_spent_cache(sender, instance, **kwargs):
+    """ยอดใช้จ่ายที่จำไว้บน activity/project ของรายการนี้ไม่ถูกต้องแล้ว — ล้างก่อน handler อื่นอ่าน"""
+    from apps.projects.models import clear_budget_cache
+    if not Expense.activity.is_cached(instance):
+        return
+    activity = instance.activity
+    clear_budget_cache(activity)
+    if type(activity).project.is_cached(activity):
+        clear_budget_cache(activity.project)
+
+
+@receiver([post_save, post_delete], sender=Expense)
+def refresh_spend_rollup(sender, instance, raw=False, **kwargs):
+    """ยอด/วันที่/สถานะของรายการเปลี่ยน — คำนวณยอดรายเดือนของกิจกรรมใหม่หลัง commit"""
+    if not raw:
+        rollup.mark_activities(instance.activity_id)
+
+
 @receiver(post_save, sender=Expense)
 def check_budget_threshold(sender, instance, **kwargs):
-    """When expense is approved/rejected, send LINE notifications."""
+    """When expense is approved/rejected, send LINE notifications (after commit — outside budget locks)."""
     if instance.status not in ('approved', 'rejected'):
         return
+    transaction.on_commit(lambda: send_expense_notifications(instance))
+
 
+def send_expense_notifications(instance):
     from apps.notifications.services import LINEService
     service = LINEService()
 
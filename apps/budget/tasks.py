@@ -0,0 +1,20 @@
+import logging
+
+from celery import shared_task
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def reconcile_budgets(repair=False):
+    """ตรวจความสอดคล้องของยอดงบทั้งฐานข้อมูล (รันจาก Celery beat ทุกคืน) — คืน {ชื่อการตรวจ: จำนวนที่ไม่ตรง}"""
+    from .reconcile import reconcile
+
+    report = reconcile(repair=repair)
+    for result in report:
+        if result['count']:
+            logger.warning(
+                'Budget reconciliation: %s — %d discrepancies (%d repaired), e.g. %s',
+                result['name'], result['count'], result['repaired'], result['samples'][:3],
+            )
+    return {result['name']: result['count'] for result in report}
@@ -8,8 +8,10 @@ urlpatterns = [
     path('', views.expense_list, name='expense_list'),
     path('create/', views.expense_create, name='expense_create'),
     path('create/<int:activity_pk>/', views.expense_create, name='expense_create_for_activity'),
+    path('import/', views.expense_import, name='expense_import'),
     path('<int:pk>/edit/', views.expense_edit, name='expense_edit'),
     path('approvals/', views.approval_list, name='approval_list'),
+    path('approvals/bulk/', views.expense_bulk_approve, name='expense_bulk_approve'),
     path('<int:pk>/approve/', views.expense_approve, name='expense_approve'),
     path('<int:pk>/link-report/', views.expense_link_report, name='expense_link_report'),
     path('<int:pk>/delete/', views.expense_delete, name='expense_delete'),
@@ -1,3 +1,7 @@
+from collections import defaultdict
+
+from django.db.models import Sum
+
 from .models import Expense
 
 
@@ -11,8 +15,82 @@ def get_expenses_for_user(user):
     if role in ('admin', 'executive'):
         return Expense.objects.all()
     elif role in ('planner', 'head', 'staff'):
-        return Expense.objects.filter(
-            activity__project__department=user.profile.department
-        )
+        return Expense.objects.filter(department=user.profile.department)
     else:
         return Expense.objects.filter(created_by=user)
+
+
+def get_expense_projects_for_user(user):
+    """โครงการที่อาจมีรายการเบิกจ่ายในขอบเขตของผู้ใช้ (ตัวเลือกกรองโครงการของรายการเบิกจ่าย)"""
+    from apps.projects.models import Project
+
+    if not hasattr(user, 'profile'):
+        return Project.objects.none()
+
+    role = user.profile.role
+
+    if role in ('admin', 'executive'):
+        return Project.objects.all()
+    elif role in ('planner', 'head', 'staff'):
+        return Project.objects.filter(department=user.profile.department)
+    else:
+        return Project.objects.filter(pk__in=Expense.objects.filter(created_by=user).values('project_id'))
+
+
+def notify_budget_alerts(activity_ids):
+    """แจ้งเตือนงบเกินเกณฑ์แบบรวม — ผู้รับ 1 ข้อความต่อชุด (แทนการแจ้งต่อรายการใน signal)"""
+    from apps.notifications.services import LINEService
+    from apps.projects.models import Activity
+
+    spent = dict(
+        Expense.objects.filter(activity_id__in=activity_ids, status='approved')
+        .values('activity_id').annotate(total=Sum('amount')).order_by()
+        .values_list('activity_id', 'total')
+    )
+    alerts = defaultdict(list)
+    recipients = {}
+    for activity in Activity.objects.filter(pk__in=activity_ids).select_related('project').prefetch_related(
+        'notify_persons__profile',
+    ):
+        if activity.allocated_budget <= 0:
+            continue
+        usage_percent = float(spent.get(activity.pk, 0) / activity.allocated_budget * 100)
+        for person in activity.notify_persons.all():
+            profile = getattr(person, 'profile', None)
+            if not profile or not profile.line_user_id or not profile.notify_budget_alert:
+                continue
+            if usage_percent >= profile.budget_threshold:
+                recipients[person.pk] = person
+                alerts[person.pk].append((activity, usage_percent))
+
+    service = LINEService()
+    for person_pk, items in alerts.items():
+        try:
+            if len(items) == 1:
+                service.send_budget_alert(recipients[person_pk], *items[0])
+            else:
+                service.send_budget_alert_summary(recipients[person_pk], items)
+        except Exception:
+            pass
+
+
+def notify_expense_decisions(expenses):
+    """แจ้งผลอนุมัติ/ไม่อนุมัติถึงผู้บันทึก — 1 ข้อความต่อผู้บันทึก"""
+    from apps.notifications.services import LINEService
+
+    by_creator = defaultdict(list)
+    for expense in expenses:
+        creator = expense.created_by
+        profile = getattr(creator, 'profile', None)
+        if profile and profile.line_user_id:
+            by_creator[creator].append(expense)
+
+    service = LINEService()
+    for creator, items in by_creator.items():
+        try:
+            if len(items) == 1:
+                service.send_expense_notification(creator, items[0], items[0].status)
+            else:
+                service.send_expense_decisions(creator, items)
+        except Exception:
+            pass
@@ -1,40 +1,129 @@
+import uuid
+from datetime import date
+from decimal import Decimal
+
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.core.exceptions import PermissionDenied
+from django.core.files.storage import default_storage
+from django.db.models import Q, Sum
+from django.db.models.functions import Coalesce
+from django.http import QueryDict
 from django.shortcuts import get_object_or_404, redirect, render
+from django.urls import reverse
 from django.utils import timezone
 
-from apps.accounts.audit import get_client_ip, log_action
+from apps.accounts.audit import get_client_ip, log_action, log_actions
 from apps.accounts.decorators import role_required
+from apps.accounts.pagination import approximate_count, keyset_paginate
+from apps.projects.models import FiscalYear
 from apps.projects.utils import get_projects_for_user
+from apps.search.models import SearchDocument
+from apps.search.query import filter_objects
+
+from . import importer, reservations
+from .forms import (
+    ExpenseApprovalForm, ExpenseAttachmentForm, ExpenseBulkApprovalForm, ExpenseForm, ExpenseImportForm,
+)
+from .models import SOURCE_CHOICES, Expense, ExpenseAttachment, ExpenseComment
+from .utils import (
+    get_expense_projects_for_user, get_expenses_for_user, notify_budget_alerts, notify_expense_decisions,
+)
+
+EXPENSE_LIST_PAGE_SIZE = 50
+
+# ตัวเลือกการเรียง — ทุกแบบมี index รองรับ (Expense.Meta.indexes) จึงใช้ keyset pagination ได้
+EXPENSE_SORTS = {
+    'newest': ('บันทึกล่าสุด', ('-created_at', '-id')),
+    'oldest': ('บันทึกเก่าสุด', ('created_at', 'id')),
+    'date_desc': ('วันที่เบิกจ่าย ใหม่ → เก่า', ('-expense_date', '-id')),
+    'date_asc': ('วันที่เบิกจ่าย เก่า → ใหม่', ('expense_date', 'id')),
+}
+
+
+def _parse_date(value):
+    try:
+        return date.fromisoformat(value) if value else None
+    except ValueError:
+        return None
+
+
+def _filter_expenses(request, expenses, statuses=True):
+    """กรองรายการเบิกจ่ายตาม query string — คืน (queryset, ค่าตัวกรองสำหรับ template)"""
+    params = request.GET
+    filters = {
+        'status': params.get('status', '') if statuses else '',
+        'source': params.get('source', ''),
+        'fiscal_year': params.get('fiscal_year', ''),
+        'project': params.get('project', ''),
+        'date_from': params.get('date_from', ''),
+        'date_to': params.get('date_to', ''),
+        'search': params.get('search', ''),
+        'sort': params.get('sort', '') if params.get('sort') in EXPENSE_SORTS else 'newest',
+    }
+    if filters['status'] in dict(Expense.STATUS_CHOICES):
+        expenses = expenses.filter(status=filters['status'])
+    if filters['source'] in dict(SOURCE_CHOICES):
+        expenses = expenses.filter(budget_source=filters['source'])
+    if filters['fiscal_year'].isdigit():
+        expenses = expenses.filter(fiscal_year_id=filters['fiscal_year'])
+    if filters['project'].isdigit():
+        expenses = expenses.filter(project_id=filters['project'])
+    d_from, d_to = _parse_date(filters['date_from']), _parse_date(filters['date_to'])
+    if d_from:
+        expenses = expenses.filter(expense_date__gte=d_from)
+    if d_to:
+        expenses = expenses.filter(expense_date__lte=d_to)
+    if filters['search']:
+        expenses = filter_objects(
+            expenses, SearchDocument.KIND_EXPENSE, filters['search'], ('receipt_number', 'description'),
+        )
+    return expenses, filters
 
-from .forms import ExpenseApprovalForm, ExpenseAttachmentForm, ExpenseForm
-from .models import Expense, ExpenseAttachment, ExpenseComment
-from .utils import get_expenses_for_user
+
+def _paginated_expenses(request, expenses, filters):
+    """หน้าแบบ keyset + ยอดรวมของหน้าที่รวมใน SQL (เฉพาะ pk ในหน้า) + จำนวนโดยประมาณ"""
+    page_obj = keyset_paginate(
+        expenses.select_related('activity__project', 'created_by', 'approved_by'),
+        EXPENSE_SORTS[filters['sort']][1], request.GET.get('cursor', ''), EXPENSE_LIST_PAGE_SIZE,
+    )
+    zero = Decimal('0')
+    page_totals = Expense.objects.filter(pk__in=[e.pk for e in page_obj]).aggregate(
+        total=Coalesce(Sum('amount'), zero),
+        approved=Coalesce(Sum('amount', filter=Q(status='approved')), zero),
+        pending=Coalesce(Sum('amount', filter=Q(status='pending')), zero),
+    )
+    total_count, total_is_exact = approximate_count(expenses)
+
+    querystring = request.GET.copy()
+    querystring.pop('cursor', None)
+
+    projects = get_expense_projects_for_user(request.user)
+    if filters['fiscal_year'].isdigit():
+        projects = projects.filter(fiscal_year_id=filters['fiscal_year'])
+    return {
+        'expenses': page_obj.object_list,
+        'page_obj': page_obj,
+        'page_totals': page_totals,
+        'total_count': total_count,
+        'total_is_exact': total_is_exact,
+        'filter_querystring': querystring.urlencode(),
+        'filters': filters,
+        'sort_choices': [(key, label) for key, (label, _) in EXPENSE_SORTS.items()],
+        'source_choices': SOURCE_CHOICES,
+        'fiscal_years': FiscalYear.objects.all(),
+        'project_choices': projects.select_related('fiscal_year').order_by(
+            '-fiscal_year__year', 'code_sort_key',
+        ).only('pk', 'project_code', 'name', 'fiscal_year__year'),
+    }
 
 
 @login_required
 def expense_list(request):
-    expenses = get_expenses_for_user(request.user)
-
-    status = request.GET.get('status')
-    search = request.GET.get('search')
-
-    if status:
-        expenses = expenses.filter(status=status)
-    if search:
-        expenses = expenses.filter(description__icontains=search)
-
-    expenses = expenses.select_related(
-        'activity__project', 'created_by', 'approved_by'
-    )
+    expenses, filters = _filter_expenses(request, get_expenses_for_user(request.user))
 
-    context = {
-        'expenses': expenses,
-        'status_choices': Expense.STATUS_CHOICES,
-        'current_status': status,
-        'current_search': search or '',
-    }
+    context = _paginated_expenses(request, expenses, filters)
+    context['status_choices'] = Expense.STATUS_CHOICES
     return render(request, 'budget/expense_list.html', context)
 
 
@@ -54,17 +143,21 @@ def expense_create(request, activity_pk=None):
                 expense.status = 'approved'
                 expense.approved_by = request.user
                 expense.approved_at = timezone.now()
-            expense.save()
-            log_action(
-                actor=request.user, action='EXPENSE_CREATE',
-                target_repr=f'{expense.activity.project.project_code} / {expense.activity.name} — {expense.description}',
-                detail=f'จำนวน: {expense.amount} บาท' + (' (อนุมัติอัตโนมัติ)' if role in ('planner', 'admin') else ''),
-                ip_address=get_client_ip(request),
-            )
-            messages.success(request, 'บันทึกรายการเบิกจ่ายสำเร็จ' + (' — อนุมัติอัตโนมัติแล้ว' if role in ('planner', 'admin') else ''))
-            return redirect('projects:activity_detail',
-                            project_pk=expense.activity.project_id,
-                            pk=expense.activity_id)
+            try:
+                reservations.save_expense(expense)
+            except reservations.ReservationError as exc:
+                form.add_error(None, str(exc))
+            else:
+                log_action(
+                    actor=request.user, action='EXPENSE_CREATE',
+                    target_repr=f'{expense.activity.project.project_code} / {expense.activity.name} — {expense.description}',
+                    detail=f'จำนวน: {expense.amount} บาท' + (' (อนุมัติอัตโนมัติ)' if role in ('planner', 'admin') else ''),
+                    ip_address=get_client_ip(request),
+                )
+                messages.success(request, 'บันทึกรายการเบิกจ่ายสำเร็จ' + (' — อนุมัติอัตโนมัติแล้ว' if role in ('planner', 'admin') else ''))
+                return redirect('projects:activity_detail',
+                                project_pk=expense.activity.project_id,
+                                pk=expense.activity_id)
     else:
         initial = {}
         if activity_pk:
@@ -72,15 +165,11 @@ def expense_create(request, activity_pk=None):
         form = ExpenseForm(initial=initial, activity_pk=activity_pk)
 
     projects = get_projects_for_user(request.user)
-    from django.db.models import FloatField
-    from django.db.models.functions import Cast
     from apps.projects.models import Activity
     form.fields['activity'].queryset = Activity.objects.filter(
         project__in=projects,
         status__in=['pending', 'in_progress'],
-    ).annotate(
-        project_code_num=Cast('project__project_code', FloatField())
-    ).order_by('project_code_num', 'project__project_code', 'activity_number')
+    ).order_by('project__code_sort_key', 'activity_number')
 
     # สรุปแหล่งเงินของโครงการที่กิจกรรมนี้สังกัด
     source_summary = []
@@ -88,15 +177,7 @@ def expense_create(request, activity_pk=None):
         from apps.projects.models import Activity as Act
         try:
             act = Act.objects.select_related('project').get(pk=activity_pk)
-            for source in act.project.budget_sources.all():
-                spent = act.project.spent_by_source(source.source_type)
-                source_summary.append({
-                    'source_type': source.source_type,
-                    'label': source.get_source_type_display(),
-                    'amount': source.amount,
-                    'spent': spent,
-                    'remaining': source.amount - spent,
-                })
+            source_summary = act.project.budget_breakdown()['sources']
         except Act.DoesNotExist:
             pass
 
@@ -109,6 +190,85 @@ def expense_create(request, activity_pk=None):
     })
 
 
+EXPENSE_IMPORT_SESSION_KEY = 'expense_import'
+
+
+def _discard_expense_upload(request):
+    """ลบไฟล์ statement ที่พักไว้รอยืนยัน (ถ้ามี)"""
+    pending = request.session.pop(EXPENSE_IMPORT_SESSION_KEY, None)
+    if pending and default_storage.exists(pending['file']):
+        default_storage.delete(pending['file'])
+
+
+@role_required(['planner', 'head', 'admin'])
+def expense_import(request):
+    """นำเข้ารายการเบิกจ่ายจาก ERP: อัปโหลด → ตรวจ/แสดงตัวอย่าง → ยืนยันบันทึก"""
+    from apps.projects.models import FiscalYear
+
+    action = request.POST.get('action')
+    pending = request.session.get(EXPENSE_IMPORT_SESSION_KEY)
+    batch = None
+    form = ExpenseImportForm()
+
+    if request.method == 'POST' and action == 'cancel':
+        _discard_expense_upload(request)
+        return redirect('budget:expense_import')
+
+    if request.method == 'POST' and action == 'confirm':
+        if not pending:
+            messages.error(request, 'ไม่พบไฟล์ที่รอนำเข้า กรุณาอัปโหลดใหม่')
+            return redirect('budget:expense_import')
+        fiscal_year = get_object_or_404(FiscalYear, pk=pending['fiscal_year'])
+        with default_storage.open(pending['file']) as f:
+            # ตรวจซ้ำก่อนบันทึก — ยอดคงเหลืออาจเปลี่ยนไประหว่างที่แสดงตัวอย่าง
+            batch = importer.parse_expenses(fiscal_year, request.user, f)
+        if batch.is_valid:
+            try:
+                count = importer.commit_expenses(batch, request.user)
+            except reservations.ReservationError as exc:
+                batch.error(None, str(exc))
+        if batch.is_valid:
+            _discard_expense_upload(request)
+            log_action(
+                actor=request.user, action='EXPENSE_IMPORT',
+                target_repr=f'ปีงบประมาณ {fiscal_year.year} - {pending["filename"]}',
+                detail=(
+                    f'{count} รายการ, รวม {batch.total_amount:,.2f} บาท'
+                    + (' (อนุมัติอัตโนมัติ)' if batch.auto_approve else '')
+                ),
+                ip_address=get_client_ip(request),
+            )
+            messages.success(
+                request,
+                f'นำเข้ารายการเบิกจ่าย {count} รายการสำเร็จ'
+                + (' — อนุมัติอัตโนมัติแล้ว' if batch.auto_approve else ''),
+            )
+            return redirect('budget:expense_list')
+        _discard_expense_upload(request)
+
+    elif request.method == 'POST':
+        form = ExpenseImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            _discard_expense_upload(request)
+            upload = form.cleaned_data['file']
+            batch = importer.parse_expenses(form.cleaned_data['fiscal_year'], request.user, upload)
+            if batch.is_valid:
+                upload.seek(0)
+                name = default_storage.save(f'imports/expense/{uuid.uuid4().hex}/{upload.name}', upload)
+                request.session[EXPENSE_IMPORT_SESSION_KEY] = {
+                    'fiscal_year': batch.fiscal_year.pk,
+                    'file': name,
+                    'filename': upload.name,
+                }
+
+    return render(request, 'budget/expense_import.html', {
+        'form': form,
+        'batch': batch,
+        'errors': batch.errors[:500] if batch else [],
+        'columns': importer.ERP_COLUMNS,
+    })
+
+
 @login_required
 def expense_edit(request, pk):
     expense = get_object_or_404(Expense, pk=pk)
@@ -126,30 +286,30 @@ def expense_edit(request, pk):
     if request.method == 'POST':
         form = ExpenseForm(request.POST, request.FILES, instance=expense)
         if form.is_valid():
-            form.save()
-            log_action(
-                actor=request.user, action='EXPENSE_UPDATE',
-                target_repr=f'{expense.activity.project.project_code} / {expense.activity.name} — {expense.description}',
-                detail=f'จำนวน: {expense.amount} บาท',
-                ip_address=get_client_ip(request),
-            )
-            messages.success(request, 'แก้ไขรายการเบิกจ่ายสำเร็จ')
-            return redirect('projects:activity_detail',
-                            project_pk=expense.activity.project_id,
-                            pk=expense.activity_id)
+            try:
+                reservations.save_expense(form.save(commit=False))
+            except reservations.ReservationError as exc:
+                form.add_error(None, str(exc))
+            else:
+                log_action(
+                    actor=request.user, action='EXPENSE_UPDATE',
+                    target_repr=f'{expense.activity.project.project_code} / {expense.activity.name} — {expense.description}',
+                    detail=f'จำนวน: {expense.amount} บาท',
+                    ip_address=get_client_ip(request),
+                )
+                messages.success(request, 'แก้ไขรายการเบิกจ่ายสำเร็จ')
+                return redirect('projects:activity_detail',
+                                project_pk=expense.activity.project_id,
+                                pk=expense.activity_id)
     else:
         form = ExpenseForm(instance=expense)
 
     projects = get_projects_for_user(request.user)
-    from django.db.models import FloatField
-    from django.db.models.functions import Cast
     from apps.projects.models import Activity, ActivityReport
     form.fields['activity'].queryset = Activity.objects.filter(
         project__in=projects,
         status__in=['pending', 'in_progress'],
-    ).annotate(
-        project_code_num=Cast('project__project_code', FloatField())
-    ).order_by('project_code_num', 'project__project_code', 'activity_number')
+    ).order_by('project__code_sort_key', 'activity_number')
     form.fields['activity_report'].queryset = ActivityReport.objects.filter(
         activity=expense.activity
     )
@@ -158,17 +318,9 @@ def expense_edit(request, pk):
     )
 
     # source_summary สำหรับ info box
-    source_summary = []
-    project = expense.activity.project
-    for source in project.budget_sources.all():
-        spent = project.spent_by_source(source.source_type, exclude_expense_pk=expense.pk if expense.status == 'approved' else None)
-        source_summary.append({
-            'source_type': source.source_type,
-            'label': source.get_source_type_display(),
-            'amount': source.amount,
-            'spent': spent,
-            'remaining': source.amount - spent,
-        })
+    source_summary = expense.activity.project.budget_breakdown(
+        exclude_expense_pk=expense.pk if expense.status == 'approved' else None,
+    )['sources']
 
     return render(request, 'budget/expense_form.html', {
         'form': form,
@@ -236,7 +388,7 @@ def expense_delete(request, pk):
     activity_pk = expense.activity_id
     expense_repr = f'{expense.activity.project.project_code} / {expense.activity.name} — {expense.description}'
     expense_amount = expense.amount
-    expense.delete()
+    reservations.delete_expense(expense)
     log_action(
         actor=request.user, action='EXPENSE_DELETE',
         target_repr=expense_repr,
@@ -249,14 +401,66 @@ def expense_delete(request, pk):
 
 @role_required(['head', 'admin'])
 def approval_list(request):
-    expenses = get_expenses_for_user(request.user).filter(status='pending')
-    expenses = expenses.select_related(
-        'activity__project', 'created_by'
+    expenses, filters = _filter_expenses(
+        request, get_expenses_for_user(request.user).filter(status='pending'), statuses=False,
     )
 
-    return render(request, 'budget/approval_list.html', {
-        'expenses': expenses,
-    })
+    return render(request, 'budget/approval_list.html', _paginated_expenses(request, expenses, filters))
+
+
+@role_required(['head', 'admin'])
+def expense_bulk_approve(request):
+    """อนุมัติ/ไม่อนุมัติรายการที่เลือกทั้งชุด — ตรวจงบรอบเดียว, audit และแจ้งเตือนแบบรวม"""
+    if request.method != 'POST':
+        from django.http import HttpResponseNotAllowed
+        return HttpResponseNotAllowed(['POST'])
+
+    # กลับไปหน้ารายการพร้อมตัวกรองเดิม (เริ่มหน้าแรก — รายการที่ดำเนินการแล้วหายจากหน้าเดิม)
+    back_url = reverse('budget:approval_list')
+    filters = QueryDict(request.POST.get('filters', ''))
+    if filters:
+        back_url = f'{back_url}?{filters.urlencode()}'
+
+    # ไม่กรองเฉพาะ pending ที่นี่ — รายการที่ถูกดำเนินการไปแล้วจะถูกข้ามใน decide_expenses
+    form = ExpenseBulkApprovalForm(request.POST, queryset=get_expenses_for_user(request.user))
+    if not form.is_valid():
+        for errors in form.errors.values():
+            for error in errors:
+                messages.error(request, error)
+        return redirect(back_url)
+
+    action = form.cleaned_data['action']
+    remark = form.cleaned_data['remark']
+    pks = list(form.cleaned_data['expenses'].values_list('pk', flat=True))
+    try:
+        expenses, skipped = reservations.decide_expenses(pks, action, request.user, remark)
+    except reservations.ReservationError as exc:
+        messages.error(request, f'ยังไม่ได้บันทึกรายการใด — {exc}')
+        return redirect(back_url)
+
+    audit_action = 'EXPENSE_APPROVE' if action == 'approved' else 'EXPENSE_REJECT'
+    log_actions(request.user, [
+        (
+            audit_action,
+            f'{e.activity.project.project_code} / {e.activity.name} — {e.description}',
+            f'จำนวน: {e.amount} บาท | หมายเหตุ: {remark} (ดำเนินการแบบกลุ่ม)',
+        )
+        for e in expenses
+    ], ip_address=get_client_ip(request))
+    if remark:
+        from apps.search.indexing import index_objects
+        index_objects('expense', expenses)
+    if action == 'approved':
+        notify_budget_alerts({e.activity_id for e in expenses})
+    notify_expense_decisions(expenses)
+
+    if expenses:
+        status_text = 'อนุมัติ' if action == 'approved' else 'ไม่อนุมัติ'
+        total = sum(e.amount for e in expenses)
+        messages.success(request, f'{status_text} {len(expenses)} รายการ รวม {total:,.2f} บาท สำเร็จ')
+    if skipped:
+        messages.warning(request, f'ข้าม {skipped} รายการที่ถูกดำเนินการไปแล้ว')
+    return redirect(back_url)
 
 
 @role_required(['head', 'admin'])
@@ -276,7 +480,11 @@ def expense_approve(request, pk):
             expense.approved_by = request.user
             expense.approved_at = timezone.now()
             expense.remark = form.cleaned_data.get('remark', '')
-            expense.save()
+            try:
+                reservations.save_expense(expense, expected_status='pending')
+            except reservations.ReservationError as exc:
+                messages.error(request, str(exc))
+                return redirect('budget:approval_list')
 
             audit_action = 'EXPENSE_APPROVE' if action == 'approved' else 'EXPENSE_REJECT'
             log_action(
@@ -7,8 +7,10 @@ from django.shortcuts import render
 from django.utils import timezone
 
 from apps.accounts.models import Department
+from apps.budget import forecast, rollup
 from apps.budget.models import Expense
 from apps.budget.utils import get_expenses_for_user
+from apps.projects.history import department_activity_sla
 from apps.projects.models import Activity, ActivityReport, FiscalYear, Project, ProjectBudgetSource
 from apps.projects.utils import get_viewable_projects
 
@@ -214,14 +216,14 @@ def executive(request):
     # Budget totals
     total_budget = all_projects.aggregate(t=Sum('total_budget'))['t'] or 0
     total_spent = Expense.objects.filter(
-        activity__project__in=all_projects, status='approved'
+        project__in=all_projects, status='approved'
     ).aggregate(t=Sum('amount'))['t'] or 0
     remaining = total_budget - total_spent
     budget_pct = float(total_spent / total_budget * 100) if total_budget > 0 else 0
 
     # Pending expenses
     pending_expenses = Expense.objects.filter(
-        activity__project__in=all_projects, status='pending'
+        project__in=all_projects, status='pending'
     ).count()
 
     # Budget by source type
@@ -230,13 +232,14 @@ def executive(request):
     ).values('source_type').annotate(total=Sum('amount'))
     source_map = {s['source_type']: s['total'] for s in budget_sources}
 
-    spent_by_source = {}
-    for src in ['government', 'accumulated', 'revenue']:
-        spent_by_source[src] = Expense.objects.filter(
-            activity__project__in=all_projects,
+    spent_by_source = {src: 0 for src in ['government', 'accumulated', 'revenue']}
+    spent_by_source.update(
+        Expense.objects.filter(
+            project__in=all_projects,
             status='approved',
-            budget_source=src,
-        ).aggregate(t=Sum('amount'))['t'] or 0
+            budget_source__in=list(spent_by_source),
+        ).order_by().values_list('budget_source').annotate(t=Sum('amount'))
+    )
 
     source_breakdown = []
     source_labels = {'government': 'เงินแผ่นดิน', 'accumulated': 'เงินสะสม', 'revenue': 'เงินรายได้'}
@@ -266,7 +269,7 @@ def executive(request):
         d_activity_count = Activity.objects.filter(project__in=dept_projects).count()
         d_budget = dept_projects.aggregate(t=Sum('total_budget'))['t'] or 0
         d_spent = Expense.objects.filter(
-            activity__project__in=dept_projects, status='approved'
+            project__in=dept_projects, status='approved'
         ).aggregate(t=Sum('amount'))['t'] or 0
         d_pct = float(d_spent / d_budget * 100) if d_budget > 0 else 0
         dept_stats.append({
@@ -293,7 +296,7 @@ def executive(request):
             qs = all_projects.filter(pk__in=pk_list)
             d_budget = qs.aggregate(t=Sum('total_budget'))['t'] or 0
             d_spent = Expense.objects.filter(
-                activity__project__in=qs, status='approved'
+                project__in=qs, status='approved'
             ).aggregate(t=Sum('amount'))['t'] or 0
             d_pct = float(d_spent / d_budget * 100) if d_budget > 0 else 0
             dept_stats.append({
@@ -359,9 +362,32 @@ def executive(request):
     not_started_list = _not_started_qs[:4]
     not_started_list_all = _not_started_qs
 
+    # คาดการณ์การใช้งบถึงวันสิ้นสุดกิจกรรม (คำนวณแบบ vectorized จาก SpendRollup, cache ต่อปีงบ)
+    forecast_over_list_all, forecast_under_list_all = [], []
+    if fiscal_year:
+        result = forecast.get_forecast(fiscal_year, today)
+        over_rows = forecast.flagged(result, forecast.OVERSPEND)
+        under_rows = forecast.flagged(result, forecast.UNDERSPEND)
+        activity_map = Activity.objects.select_related('project').in_bulk(
+            [pk for pk, _, _ in over_rows + under_rows]
+        )
+        for rows, target in ((over_rows, forecast_over_list_all), (under_rows, forecast_under_list_all)):
+            for pk, projected, allocated in rows:
+                if pk in activity_map:
+                    target.append({
+                        'activity': activity_map[pk],
+                        'forecast': projected,
+                        'allocated': allocated,
+                        'diff': projected - allocated,
+                        'pct': round(projected / allocated * 100, 1) if allocated else 0,
+                    })
+    forecast_over_count = len(forecast_over_list_all)
+    forecast_under_count = len(forecast_under_list_all)
+    forecast_list = (forecast_over_list_all + forecast_under_list_all)[:4]
+
     # All projects sorted by % desc, then project_code for 0%
     top_projects = []
-    for proj in all_projects.select_related('department').order_by('project_code'):
+    for proj in all_projects.select_related('department').order_by('code_sort_key'):
         spent = float(proj.total_spent)
         budget = float(proj.total_budget)
         pct = round(spent / budget * 100, 1) if budget > 0 else 0
@@ -376,9 +402,12 @@ def executive(request):
 
     # Recent expenses
     recent_expenses = Expense.objects.filter(
-        activity__project__in=all_projects
+        project__in=all_projects
     ).select_related('activity__project', 'created_by').order_by('-created_at')[:6]
 
+    # ระยะเวลาดำเนินกิจกรรมตามแผนก (จาก ActivityStatusHistory)
+    activity_sla = department_activity_sla(Activity.objects.filter(project__in=all_projects))
+
     # Chart data (JSON)
     chart_source = json.dumps({
         'labels': ['เงินแผ่นดิน', 'เงินสะสม', 'เงินรายได้'],
@@ -393,6 +422,8 @@ def executive(request):
         'spent': [float(d['spent']) for d in dept_stats],
         'budget': [float(d['budget']) for d in dept_stats],
     })
+    # ยอดเบิกจ่ายรายเดือน/สะสม จากตาราง SpendRollup (ไม่สแกนรายการเบิกจ่าย)
+    chart_burn = json.dumps(rollup.monthly_burn(fiscal_year, total_budget)) if fiscal_year else None
     chart_status = json.dumps({
         'labels': ['กำลังดำเนินการ', 'รอดำเนินการ', 'เสร็จสิ้น', 'ร่าง/ยกเลิก'],
         'data': [active_projects, not_started_projects, completed_projects, draft_projects],
@@ -415,6 +446,7 @@ def executive(request):
         'source_breakdown': source_breakdown,
         'dept_stats': dept_stats,
         'dept_totals': dept_totals,
+        'activity_sla': activity_sla,
         'overdue_count': overdue_count,
         'overdue_list': overdue_list,
         'overdue_list_all': overdue_list_all,
@@ -425,12 +457,19 @@ def executive(request):
         'not_started_count': not_started_count,
         'not_started_list': not_started_list,
         'not_started_list_all': not_started_list_all,
+        'forecast_over_count': forecast_over_count,
+        'forecast_under_count': forecast_under_count,
+        'forecast_count': forecast_over_count + forecast_under_count,
+        'forecast_list': forecast_list,
+        'forecast_over_list_all': forecast_over_list_all,
+        'forecast_under_list_all': forecast_under_list_all,
         'top_projects': top_projects,
         'recent_expenses': recent_expenses,
         'today': today,
         'chart_source': chart_source,
         'chart_dept': chart_dept,
         'chart_status': chart_status,
+        'chart_burn': chart_burn,
     }
     return render(request, 'dashboard/executive.html', context)
 
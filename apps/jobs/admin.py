@@ -0,0 +1,12 @@
+from django.contrib import admin
+
+from .models import BackgroundJob
+
+
+@admin.register(BackgroundJob)
+class BackgroundJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'kind', 'status', 'progress', 'total', 'created_by', 'created_at', 'finished_at']
+    list_filter = ['kind', 'status']
+    raw_id_fields = ['created_by']
+    readonly_fields = ['created_at', 'started_at', 'finished_at']
+    date_hierarchy = 'created_at'
@@ -0,0 +1,39 @@
+# Generated by Django 5.1.15 on 2026-10-19 14:27
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BackgroundJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('fiscal_year_rollover', 'ยกยอดโครงการข้ามปีงบประมาณ')], max_length=30, verbose_name='ประเภทงาน')),
+                ('status', models.CharField(choices=[('queued', 'รอดำเนินการ'), ('running', 'กำลังดำเนินการ'), ('done', 'เสร็จสิ้น'), ('failed', 'ล้มเหลว')], default='queued', max_length=10, verbose_name='สถานะ')),
+                ('params', models.JSONField(blank=True, default=dict, verbose_name='พารามิเตอร์')),
+                ('progress', models.PositiveIntegerField(default=0, verbose_name='ดำเนินการแล้ว')),
+                ('total', models.PositiveIntegerField(default=0, verbose_name='ทั้งหมด')),
+                ('message', models.CharField(blank=True, max_length=500, verbose_name='ข้อความล่าสุด')),
+                ('result', models.JSONField(blank=True, default=dict, verbose_name='ผลลัพธ์')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='สร้างเมื่อ')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name='เริ่มเมื่อ')),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name='เสร็จเมื่อ')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='background_jobs', to=settings.AUTH_USER_MODEL, verbose_name='สร้างโดย')),
+            ],
+            options={
+                'verbose_name': 'งานเบื้องหลัง',
+                'verbose_name_plural': 'งานเบื้องหลัง',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.15 on 2026-10-19 14:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('jobs', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='backgroundjob',
+            name='artifact',
+            field=models.FileField(blank=True, upload_to='jobs/artifacts/%Y/%m/', verbose_name='ไฟล์ผลลัพธ์'),
+        ),
+        migrations.AlterField(
+            model_name='backgroundjob',
+            name='kind',
+            field=models.CharField(choices=[('fiscal_year_rollover', 'ยกยอดโครงการข้ามปีงบประมาณ'), ('project_pdf_bundle', 'รายงานโครงการ PDF (ZIP)')], max_length=30, verbose_name='ประเภทงาน'),
+        ),
+    ]
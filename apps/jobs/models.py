@@ -0,0 +1,54 @@
+from django.conf import settings
+from django.db import models
+
+
+class BackgroundJob(models.Model):
+    """งานที่ใช้เวลานาน (เช่น ยกยอดโครงการข้ามปีงบ) — หน้าเว็บ poll ความคืบหน้าจากแถวนี้"""
+    STATUS_CHOICES = [
+        ('queued', 'รอดำเนินการ'),
+        ('running', 'กำลังดำเนินการ'),
+        ('done', 'เสร็จสิ้น'),
+        ('failed', 'ล้มเหลว'),
+    ]
+    KIND_CHOICES = [
+        ('fiscal_year_rollover', 'ยกยอดโครงการข้ามปีงบประมาณ'),
+        ('project_pdf_bundle', 'รายงานโครงการ PDF (ZIP)'),
+    ]
+
+    kind = models.CharField('ประเภทงาน', max_length=30, choices=KIND_CHOICES)
+    status = models.CharField('สถานะ', max_length=10, choices=STATUS_CHOICES, default='queued')
+    params = models.JSONField('พารามิเตอร์', default=dict, blank=True)
+    progress = models.PositiveIntegerField('ดำเนินการแล้ว', default=0)
+    total = models.PositiveIntegerField('ทั้งหมด', default=0)
+    message = models.CharField('ข้อความล่าสุด', max_length=500, blank=True)
+    result = models.JSONField('ผลลัพธ์', default=dict, blank=True)
+    artifact = models.FileField('ไฟล์ผลลัพธ์', upload_to='jobs/artifacts/%Y/%m/', blank=True)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='background_jobs',
+        verbose_name='สร้างโดย',
+    )
+    created_at = models.DateTimeField('สร้างเมื่อ', auto_now_add=True)
+    started_at = models.DateTimeField('เริ่มเมื่อ', null=True, blank=True)
+    finished_at = models.DateTimeField('เสร็จเมื่อ', null=True, blank=True)
+
+    class Meta:
+        verbose_name = 'งานเบื้องหลัง'
+        verbose_name_plural = 'งานเบื้องหลัง'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f'{self.get_kind_display()} #{self.pk} ({self.get_status_display()})'
+
+    @property
+    def percent(self):
+        if not self.total:
+            return 100 if self.status == 'done' else 0
+        return min(int(self.progress * 100 / self.total), 100)
+
+    @property
+    def is_finished(self):
+        return self.status in ('done', 'failed')
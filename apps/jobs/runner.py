@@ -0,0 +1,82 @@
+"""ลงทะเบียน/สั่งรัน/รายงานความคืบหน้าของ BackgroundJob
+
+    @runner.handler('fiscal_year_rollover')
+    def run_rollover(job, report): ...        # report(progress, total=None, message='')
+
+    job = runner.enqueue('fiscal_year_rollover', user, {...})
+
+settings.JOBS_BACKEND:
+  'thread' (ค่าเริ่มต้น) รันใน thread ของ process เว็บ — ใช้ได้บน Waitress/Windows ที่ไม่มี worker
+  'celery' ส่งเข้า Celery (apps.jobs.tasks.run_background_job) — ใช้ร่วมกับ
+           CELERY_TASK_ALWAYS_EAGER=True เพื่อรันแบบ synchronous ตอนพัฒนา/ทดสอบ
+"""
+import logging
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .models import BackgroundJob
+
+logger = logging.getLogger(__name__)
+
+_handlers = {}
+
+
+def handler(kind):
+    """ลงทะเบียนฟังก์ชันที่ทำงานของ kind — รับ (job, report)"""
+    def decorator(func):
+        _handlers[kind] = func
+        return func
+    return decorator
+
+
+def enqueue(kind, user, params):
+    """สร้างงานแล้วสั่งรันหลัง transaction ปัจจุบัน commit"""
+    job = BackgroundJob.objects.create(kind=kind, created_by=user, params=params)
+    transaction.on_commit(lambda: dispatch(job.pk))
+    return job
+
+
+def dispatch(job_id):
+    if getattr(settings, 'JOBS_BACKEND', 'thread') == 'celery':
+        from .tasks import run_background_job
+        run_background_job.delay(job_id)
+    else:
+        threading.Thread(target=_run_in_thread, args=(job_id,), daemon=True).start()
+
+
+def _run_in_thread(job_id):
+    try:
+        run_job(job_id)
+    finally:
+        close_old_connections()
+
+
+def run_job(job_id):
+    """รันงาน 1 รายการ — อัปเดตสถานะ/ความคืบหน้าด้วย UPDATE (อ่านได้ทันทีจาก request อื่น)"""
+    claimed = BackgroundJob.objects.filter(pk=job_id, status='queued').update(
+        status='running', started_at=timezone.now(),
+    )
+    if not claimed:
+        return
+    job = BackgroundJob.objects.get(pk=job_id)
+
+    def report(progress, total=None, message=''):
+        fields = {'progress': progress, 'message': message[:500]}
+        if total is not None:
+            fields['total'] = total
+        BackgroundJob.objects.filter(pk=job_id).update(**fields)
+
+    try:
+        result = _handlers[job.kind](job, report) or {}
+    except Exception as e:
+        logger.exception('Background job %s (%s) failed', job_id, job.kind)
+        BackgroundJob.objects.filter(pk=job_id).update(
+            status='failed', message=f'เกิดข้อผิดพลาด: {e}'[:500], finished_at=timezone.now(),
+        )
+        return
+    BackgroundJob.objects.filter(pk=job_id).update(
+        status='done', result=result, finished_at=timezone.now(),
+    )
@@ -0,0 +1,7 @@
+from celery import shared_task
+
+
+@shared_task
+def run_background_job(job_id):
+    from .runner import run_job
+    run_job(job_id)
@@ -0,0 +1,43 @@
+from django.contrib.auth.decorators import login_required
+from django.core.exceptions import PermissionDenied
+from django.http import FileResponse, Http404, JsonResponse
+from django.shortcuts import get_object_or_404, render
+
+from .models import BackgroundJob
+
+
+def _get_job(request, pk):
+    job = get_object_or_404(BackgroundJob, pk=pk)
+    role = getattr(getattr(request.user, 'profile', None), 'role', None)
+    if job.created_by_id != request.user.pk and role != 'admin':
+        raise PermissionDenied
+    return job
+
+
+@login_required
+def job_detail(request, pk):
+    return render(request, 'jobs/job_detail.html', {'job': _get_job(request, pk)})
+
+
+@login_required
+def job_status(request, pk):
+    """สถานะล่าสุดสำหรับ poll จากหน้า job_detail"""
+    job = _get_job(request, pk)
+    return JsonResponse({
+        'status': job.status,
+        'status_display': job.get_status_display(),
+        'progress': job.progress,
+        'total': job.total,
+        'percent': job.percent,
+        'message': job.message,
+        'result': job.result if job.is_finished else {},
+    })
+
+
+@login_required
+def job_artifact(request, pk):
+    """ดาวน์โหลดไฟล์ผลลัพธ์ของงาน (stream จาก storage)"""
+    job = _get_job(request, pk)
+    if job.status != 'done' or not job.artifact:
+        raise Http404
+    return FileResponse(job.artifact.open('rb'), as_attachment=True, filename=job.artifact.name.rsplit('/', 1)[-1])
@@ -260,6 +260,75 @@ class LINEService:
         )
         return is_sent
 
+    def send_expense_import_summary(self, user, count, total, status):
+        """Notify the importer once per ERP import instead of once per expense."""
+        from apps.notifications.models import LINENotificationLog
+
+        status_th = 'อนุมัติแล้ว' if status == 'approved' else 'รอการอนุมัติ'
+        text = (
+            f"📥 นำเข้ารายการเบิกจ่ายจาก ERP\n"
+            f"จำนวน: {count:,} รายการ\n"
+            f"ยอดรวม: {total:,.2f} ฿\n"
+            f"สถานะ: {status_th}"
+        )
+        is_sent = self.push_text(user.profile.line_user_id, text)
+        LINENotificationLog.objects.create(
+            user=user,
+            message=text,
+            notification_type='expense_approved',
+            is_sent=is_sent,
+            sent_at=timezone.now() if is_sent else None,
+        )
+        return is_sent
+
+    def send_budget_alert_summary(self, user, alerts):
+        """One budget alert listing several activities — alerts: [(activity, percent), ...]."""
+        from apps.notifications.models import LINENotificationLog
+
+        lines = [f"⚠️ แจ้งเตือนงบประมาณ {len(alerts)} กิจกรรม"]
+        for activity, percent in alerts[:15]:
+            lines.append(f"• {activity.project.project_code} {activity.name}: {percent:.1f}%")
+        if len(alerts) > 15:
+            lines.append(f"และอีก {len(alerts) - 15} กิจกรรม")
+        text = "\n".join(lines)
+        is_sent = self.push_text(user.profile.line_user_id, text)
+        LINENotificationLog.objects.create(
+            user=user,
+            message=text,
+            notification_type='budget_alert',
+            is_sent=is_sent,
+            sent_at=timezone.now() if is_sent else None,
+        )
+        return is_sent
+
+    def send_expense_decisions(self, user, expenses):
+        """Notify an expense creator once for a batch of approvals/rejections."""
+        from apps.notifications.models import LINENotificationLog
+
+        approved = [e for e in expenses if e.status == 'approved']
+        rejected = [e for e in expenses if e.status == 'rejected']
+        approver = expenses[0].approved_by
+        lines = [f"📋 ผลการพิจารณารายการเบิกจ่าย {len(expenses)} รายการ"]
+        if approved:
+            lines.append(f"✅ อนุมัติ {len(approved)} รายการ รวม {sum(e.amount for e in approved):,.2f} ฿")
+        if rejected:
+            lines.append(f"❌ ไม่อนุมัติ {len(rejected)} รายการ รวม {sum(e.amount for e in rejected):,.2f} ฿")
+        for expense in expenses[:10]:
+            lines.append(f"• {expense.description} ({expense.amount:,.2f} ฿)")
+        if len(expenses) > 10:
+            lines.append(f"และอีก {len(expenses) - 10} รายการ")
+        lines.append(f"โดย: {approver.get_full_name() if approver else 'ผู้ดูแลระบบ'}")
+        text = "\n".join(lines)
+        is_sent = self.push_text(user.profile.line_user_id, text)
+        LINENotificationLog.objects.create(
+            user=user,
+            message=text,
+            notification_type='expense_approved',
+            is_sent=is_sent,
+            sent_at=timezone.now() if is_sent else None,
+        )
+        return is_sent
+
     def send_activity_start_reminder(self, user, activity):
         """Remind that activity start date has passed but status is still not_started/pending."""
         from apps.notifications.models import LINENotificationLog
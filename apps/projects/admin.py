@@ -1,6 +1,16 @@
 from django.contrib import admin
 
-from .models import Activity, ActivityReport, DocumentTemplate, FiscalYear, Project, ProjectBudgetSource, ProjectDeleteRequest
+from .models import (
+    Activity,
+    ActivityReport,
+    ActivityStatusHistory,
+    DocumentTemplate,
+    FiscalYear,
+    Project,
+    ProjectBudgetSource,
+    ProjectDeleteRequest,
+    ProjectStatusHistory,
+)
 
 
 @admin.register(FiscalYear)
@@ -63,3 +73,19 @@ class ProjectDeleteRequestAdmin(admin.ModelAdmin):
     search_fields = ['project__name', 'project__project_code', 'requested_by__username']
     readonly_fields = ['requested_at', 'reviewed_at']
     raw_id_fields = ['project', 'requested_by', 'reviewed_by']
+
+
+@admin.register(ProjectStatusHistory)
+class ProjectStatusHistoryAdmin(admin.ModelAdmin):
+    list_display = ['project', 'from_status', 'to_status', 'source', 'changed_by', 'changed_at']
+    list_filter = ['to_status', 'source']
+    search_fields = ['project__project_code', 'project__name']
+    raw_id_fields = ['project', 'changed_by']
+
+
+@admin.register(ActivityStatusHistory)
+class ActivityStatusHistoryAdmin(admin.ModelAdmin):
+    list_display = ['activity', 'from_status', 'to_status', 'source', 'changed_by', 'changed_at']
+    list_filter = ['to_status', 'source']
+    search_fields = ['activity__name', 'activity__project__project_code']
+    raw_id_fields = ['activity', 'changed_by']
@@ -7,4 +7,5 @@ class ProjectsConfig(AppConfig):
     verbose_name = 'โครงการ'
 
     def ready(self):
+        import apps.projects.rollover  # noqa: F401 — ลงทะเบียน background job
         import apps.projects.signals  # noqa: F401
@@ -0,0 +1,104 @@
+"""ตัวนับสถานะกิจกรรมต่อโครงการ และการคำนวณสถานะโครงการจากตัวนับ
+
+signal เรียก apply_activity_status_change เฉพาะเมื่อสถานะกิจกรรมเปลี่ยนจริง
+(ดู Activity._loaded_status) — การบันทึกที่ไม่เปลี่ยนสถานะจึงไม่มี query เพิ่ม
+งานที่ข้าม signal (bulk_create / queryset.update) ให้เรียก recount_activity_status แทน
+"""
+from django.db.models import Count, F
+
+from .history import record_project_status
+from .models import Activity, Project
+
+COUNTER_FIELD = {
+    'pending': 'activity_pending_count',
+    'in_progress': 'activity_in_progress_count',
+    'completed': 'activity_completed_count',
+    'cancelled': 'activity_cancelled_count',
+}
+
+# ไม่ปรับสถานะอัตโนมัติ — ต้องให้ผู้ใช้ตัดสินใจเอง
+MANUAL_ONLY_STATUSES = ('draft', 'cancelled')
+
+
+def derive_project_status(pending, in_progress, completed):
+    """สถานะโครงการจากจำนวนกิจกรรมที่ไม่ถูกยกเลิก (None = ไม่มีกิจกรรม ไม่ต้องเปลี่ยน)
+
+      ทั้งหมดเสร็จสิ้น                  → completed
+      มีกำลังดำเนินการ / เสร็จบางส่วน    → active
+      ทั้งหมดรอดำเนินการ               → not_started
+    """
+    if pending + in_progress + completed == 0:
+        return None
+    if pending == 0 and in_progress == 0:
+        return 'completed'
+    if in_progress or completed:
+        return 'active'
+    return 'not_started'
+
+
+def _sync_status(project_id):
+    """อ่านตัวนับแล้วปรับสถานะโครงการถ้าจำเป็น (1 SELECT + UPDATE เมื่อเปลี่ยน)"""
+    project = Project.objects.filter(pk=project_id).only(
+        'pk', 'status', *COUNTER_FIELD.values(),
+    ).first()
+    if project is None or project.status in MANUAL_ONLY_STATUSES:
+        return
+    new_status = derive_project_status(
+        project.activity_pending_count,
+        project.activity_in_progress_count,
+        project.activity_completed_count,
+    )
+    if new_status and new_status != project.status:
+        Project.objects.filter(pk=project_id).update(status=new_status)
+        record_project_status(project, project.status, new_status, source='auto')
+
+
+def apply_activity_status_change(project_id, old_status, new_status):
+    """ย้ายกิจกรรม 1 รายการจาก old_status ไป new_status (None = เพิ่ม/ลบกิจกรรม)"""
+    changes = {}
+    if old_status in COUNTER_FIELD:
+        changes[COUNTER_FIELD[old_status]] = F(COUNTER_FIELD[old_status]) - 1
+    if new_status in COUNTER_FIELD:
+        changes[COUNTER_FIELD[new_status]] = F(COUNTER_FIELD[new_status]) + 1
+    if changes:
+        Project.objects.filter(pk=project_id).update(**changes)
+    _sync_status(project_id)
+
+
+def recount_activity_status(project_ids=None, sync_status=True):
+    """นับตัวนับใหม่จากตารางกิจกรรม (grouped query เดียว) — ใช้หลัง bulk operation"""
+    projects = Project.objects.all()
+    activities = Activity.objects.all()
+    if project_ids is not None:
+        project_ids = list(project_ids)
+        projects = projects.filter(pk__in=project_ids)
+        activities = activities.filter(project_id__in=project_ids)
+
+    counts = {}
+    for row in activities.values('project_id', 'status').annotate(n=Count('id')).order_by():
+        counts.setdefault(row['project_id'], {})[row['status']] = row['n']
+
+    to_update = []
+    status_changes = {}
+    for project in projects.only('pk', 'status', *COUNTER_FIELD.values()):
+        project_counts = counts.get(project.pk, {})
+        for status, field in COUNTER_FIELD.items():
+            setattr(project, field, project_counts.get(status, 0))
+        to_update.append(project)
+        if sync_status and project.status not in MANUAL_ONLY_STATUSES:
+            new_status = derive_project_status(
+                project.activity_pending_count,
+                project.activity_in_progress_count,
+                project.activity_completed_count,
+            )
+            if new_status and new_status != project.status:
+                status_changes[project] = new_status
+    Project.objects.bulk_update(to_update, list(COUNTER_FIELD.values()), batch_size=500)
+
+    for new_status in set(status_changes.values()):
+        Project.objects.filter(
+            pk__in=[p.pk for p, s in status_changes.items() if s == new_status],
+        ).update(status=new_status)
+    for project, new_status in status_changes.items():
+        record_project_status(project, project.status, new_status, source='auto')
+    return len(to_update)
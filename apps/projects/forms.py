@@ -3,7 +3,7 @@ from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
 from django.forms import inlineformset_factory
 
-from .models import Activity, ActivityReport, Project, ProjectBudgetSource
+from .models import Activity, ActivityReport, FiscalYear, Project, ProjectBudgetSource
 
 User = get_user_model()
 
@@ -64,6 +64,24 @@ def _get_user_queryset(user):
         ).select_related('profile')
 
 
+def validate_date_range(start_date, end_date):
+    """กฎร่วมของฟอร์มโครงการ/กิจกรรม และการนำเข้าแผน"""
+    if start_date and end_date and start_date > end_date:
+        raise ValidationError('วันที่เริ่มต้นต้องก่อนวันที่สิ้นสุด')
+
+
+def validate_source_allocation(total_budget, other_allocated, total):
+    """งบรวมของกิจกรรม (ตามหมวดเงิน) ต้องมากกว่า 0 และไม่เกินงบที่เหลือของโครงการ"""
+    if total <= 0:
+        raise ValidationError('ต้องระบุงบประมาณอย่างน้อย 1 หมวดเงิน')
+    if other_allocated + total > total_budget:
+        available = total_budget - other_allocated
+        raise ValidationError(
+            f'งบรวมเกินกว่าที่โครงการกำหนด '
+            f'(เหลือจัดสรรได้ {available:,.2f} บาท)'
+        )
+
+
 def _apply_tailwind_formset(formset):
     """Apply tailwind styles to all forms in a formset."""
     for form in formset.forms:
@@ -142,10 +160,7 @@ class ProjectForm(forms.ModelForm):
 
     def clean(self):
         cleaned_data = super().clean()
-        start_date = cleaned_data.get('start_date')
-        end_date = cleaned_data.get('end_date')
-        if start_date and end_date and start_date > end_date:
-            raise ValidationError('วันที่เริ่มต้นต้องก่อนวันที่สิ้นสุด')
+        validate_date_range(cleaned_data.get('start_date'), cleaned_data.get('end_date'))
         return cleaned_data
 
 
@@ -220,10 +235,7 @@ class ActivityForm(forms.ModelForm):
 
     def clean(self):
         cleaned_data = super().clean()
-        start_date = cleaned_data.get('start_date')
-        end_date = cleaned_data.get('end_date')
-        if start_date and end_date and start_date > end_date:
-            raise ValidationError('วันที่เริ่มต้นต้องก่อนวันที่สิ้นสุด')
+        validate_date_range(cleaned_data.get('start_date'), cleaned_data.get('end_date'))
 
         if not cleaned_data.get('no_budget') and self.project_sources:
             # Budget source mode — validate total
@@ -231,18 +243,10 @@ class ActivityForm(forms.ModelForm):
                 cleaned_data.get(f'budget_{s.source_type}') or 0
                 for s in self.project_sources
             )
-            if total <= 0:
-                raise ValidationError('ต้องระบุงบประมาณอย่างน้อย 1 หมวดเงิน')
-            if self.project:
-                other_allocated = self.project.total_allocated
-                if self.instance.pk:
-                    other_allocated -= self.instance.allocated_budget
-                if other_allocated + total > self.project.total_budget:
-                    available = self.project.total_budget - other_allocated
-                    raise ValidationError(
-                        f'งบรวมเกินกว่าที่โครงการกำหนด '
-                        f'(เหลือจัดสรรได้ {available:,.2f} บาท)'
-                    )
+            other_allocated = self.project.total_allocated
+            if self.instance.pk:
+                other_allocated -= self.instance.allocated_budget
+            validate_source_allocation(self.project.total_budget, other_allocated, total)
         return cleaned_data
 
 
@@ -281,3 +285,60 @@ class ActivityReportForm(forms.ModelForm):
         if not header.startswith(ALLOWED_REPORT_DOC_TYPES[f.content_type]):
             raise ValidationError('ไฟล์ไม่ตรงกับประเภทที่ระบุ')
         return f
+
+
+class PlanImportForm(forms.Form):
+    """อัปโหลดไฟล์แผนโครงการ (.xlsx 2 แผ่นงาน หรือ CSV โครงการ + CSV กิจกรรม)"""
+    fiscal_year = forms.ModelChoiceField(
+        queryset=FiscalYear.objects.order_by('-year'), label='ปีงบประมาณ', empty_label=None,
+    )
+    project_file = forms.FileField(label='ไฟล์แผน (.xlsx) หรือ CSV โครงการ')
+    activity_file = forms.FileField(label='CSV กิจกรรม (เฉพาะกรณีใช้ CSV)', required=False)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        active = FiscalYear.objects.filter(is_active=True).first()
+        if active:
+            self.fields['fiscal_year'].initial = active.pk
+        _apply_tailwind(self)
+        self.fields['project_file'].widget.attrs['accept'] = '.xlsx,.csv'
+        self.fields['activity_file'].widget.attrs['accept'] = '.csv'
+
+    def _check_file(self, name, extensions):
+        f = self.cleaned_data.get(name)
+        if not f:
+            return f
+        if not f.name.lower().endswith(extensions):
+            raise ValidationError(f'อนุญาตเฉพาะไฟล์ {", ".join(extensions)}')
+        if f.size > 10 * 1024 * 1024:
+            raise ValidationError('ขนาดไฟล์ต้องไม่เกิน 10 MB')
+        return f
+
+    def clean_project_file(self):
+        return self._check_file('project_file', ('.xlsx', '.csv'))
+
+    def clean_activity_file(self):
+        return self._check_file('activity_file', ('.csv',))
+
+
+class RolloverForm(forms.Form):
+    """เลือกโครงการจากปีงบเดิมเพื่อคัดลอกไปปีงบใหม่"""
+    target_fiscal_year = forms.ModelChoiceField(
+        queryset=FiscalYear.objects.order_by('-year'), label='คัดลอกไปปีงบประมาณ', empty_label=None,
+    )
+    projects = forms.ModelMultipleChoiceField(
+        queryset=Project.objects.none(), label='โครงการ', widget=forms.CheckboxSelectMultiple,
+    )
+    include_activities = forms.BooleanField(
+        label='คัดลอกกิจกรรม (ยกเว้นที่ยกเลิก)', required=False, initial=True,
+    )
+
+    def __init__(self, *args, source_projects=None, source_year=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if source_projects is not None:
+            self.fields['projects'].queryset = source_projects
+        if source_year is not None:
+            targets = FiscalYear.objects.filter(year__gt=source_year.year).order_by('year')
+            self.fields['target_fiscal_year'].queryset = targets
+            self.fields['target_fiscal_year'].initial = targets.values_list('pk', flat=True).first()
+        _apply_tailwind(self)
@@ -0,0 +1,90 @@
+"""บันทึกและสรุปประวัติสถานะโครงการ / กิจกรรม (ProjectStatusHistory, ActivityStatusHistory)
+
+ทุกจุดที่เปลี่ยนสถานะ (view, signal sync, import) เรียก record_*_status ที่นี่ที่เดียว
+เวลาในสถานะ (duration/cycle) คำนวณตอนเขียนจากแถวแรก/แถวล่าสุดของ object นั้น
+(อ่านผ่าน index (object, changed_at)) เพื่อให้รายงานไม่ต้องไล่คำนวณย้อนหลัง
+"""
+from django.db.models import Avg, Count, Max, Min
+from django.utils import timezone
+
+from .models import ActivityStatusHistory, ProjectStatusHistory
+
+
+def _seconds(later, earlier):
+    if earlier is None:
+        return None
+    return max(int((later - earlier).total_seconds()), 0)
+
+
+def _record(model, owner_field, owner, from_status, to_status, user, source, note, changed_at):
+    if from_status == to_status and source != 'create':
+        return None
+    changed_at = changed_at or timezone.now()
+    bounds = model.objects.filter(**{owner_field: owner}).aggregate(
+        first=Min('changed_at'), last=Max('changed_at'),
+    )
+    return model.objects.create(
+        **{owner_field: owner},
+        from_status=from_status or '',
+        to_status=to_status,
+        source=source,
+        changed_by=user,
+        changed_at=changed_at,
+        note=note[:500],
+        duration_seconds=_seconds(changed_at, bounds['last']),
+        cycle_seconds=_seconds(changed_at, bounds['first']),
+    )
+
+
+def record_project_status(project, from_status, to_status, user=None, source='manual', note='', changed_at=None):
+    """บันทึกการเปลี่ยนสถานะโครงการ (ไม่บันทึกถ้าสถานะไม่เปลี่ยน ยกเว้น source='create')"""
+    return _record(ProjectStatusHistory, 'project', project,
+                   from_status, to_status, user, source, note, changed_at)
+
+
+def record_activity_status(activity, from_status, to_status, user=None, source='manual', note='', changed_at=None):
+    """บันทึกการเปลี่ยนสถานะกิจกรรม (ไม่บันทึกถ้าสถานะไม่เปลี่ยน ยกเว้น source='create')"""
+    return _record(ActivityStatusHistory, 'activity', activity,
+                   from_status, to_status, user, source, note, changed_at)
+
+
+def department_activity_sla(activities):
+    """สรุปเวลาดำเนินกิจกรรมแยกตามแผนก จาก queryset ของกิจกรรม (2 query)
+
+    คืน list ของ dict: department, completed (จำนวนกิจกรรมที่เสร็จ),
+    avg_days_to_complete (สร้าง → เสร็จสิ้น), avg_days_pending, avg_days_in_progress
+    """
+    history = ActivityStatusHistory.objects.filter(activity__in=activities)
+    dept_key = 'activity__project__department__name'
+
+    stats = {}
+    completed = (
+        history.filter(to_status='completed', cycle_seconds__isnull=False)
+        .values(dept_key)
+        .annotate(count=Count('activity', distinct=True), avg=Avg('cycle_seconds'))
+    )
+    for row in completed:
+        stats[row[dept_key]] = {
+            'department': row[dept_key] or 'ไม่ระบุแผนก',
+            'completed': row['count'],
+            'avg_days_to_complete': row['avg'] / 86400,
+            'avg_days_pending': None,
+            'avg_days_in_progress': None,
+        }
+
+    in_status = (
+        history.filter(from_status__in=['pending', 'in_progress'], duration_seconds__isnull=False)
+        .values(dept_key, 'from_status')
+        .annotate(avg=Avg('duration_seconds'))
+    )
+    for row in in_status:
+        entry = stats.setdefault(row[dept_key], {
+            'department': row[dept_key] or 'ไม่ระบุแผนก',
+            'completed': 0,
+            'avg_days_to_complete': None,
+            'avg_days_pending': None,
+            'avg_days_in_progress': None,
+        })
+        entry[f'avg_days_{row["from_status"]}'] = row['avg'] / 86400
+
+    return sorted(stats.values(), key=lambda e: e['department'])
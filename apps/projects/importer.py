@@ -0,0 +1,536 @@
+"""นำเข้าแผนโครงการประจำปีจาก Excel (.xlsx) หรือ CSV
+
+Excel: 1 ไฟล์ 2 แผ่นงาน "โครงการ" และ "กิจกรรม" — CSV: ไฟล์โครงการ + ไฟล์กิจกรรม (ถ้ามี)
+แถวแรกเป็นหัวตาราง (ตาม PROJECT_COLUMNS / ACTIVITY_COLUMNS ใช้ชื่อไทยหรือชื่อฟิลด์ก็ได้)
+
+parse_plan อ่านไฟล์แบบ streaming แล้วตรวจทุกแถวด้วยกฎเดียวกับฟอร์ม (ข้อจำกัดของ model field,
+validate_date_range, validate_source_allocation, ผู้รับผิดชอบ/แผนกตามสิทธิ์) เก็บข้อผิดพลาดรายแถว
+ไว้แสดงใน preview — commit_plan บันทึกด้วย bulk_create ใน transaction เดียว และทำงานที่ปกติอยู่ใน
+signal เพียงครั้งเดียวต่อไฟล์ (total_budget ผ่าน recalc, ตัวนับสถานะ, ประวัติสถานะ, ดัชนีค้นหา,
+cache ปฏิทินโครงการ)
+"""
+import csv
+import io
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+
+import openpyxl
+from openpyxl.styles import Font
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from apps.accounts.models import Department
+
+from . import recalc, timeline
+from .forms import _get_user_queryset, validate_date_range, validate_source_allocation
+from .models import (
+    SOURCE_CHOICES, Activity, ActivityStatusHistory, Project, ProjectBudgetSource,
+    ProjectStatusHistory, make_code_sort_key,
+)
+
+PROJECT_SHEET = 'โครงการ'
+ACTIVITY_SHEET = 'กิจกรรม'
+
+PROJECT_COLUMNS = [
+    ('project_code', 'รหัสโครงการ'),
+    ('name', 'ชื่อโครงการ'),
+    ('description', 'รายละเอียด'),
+    ('department', 'แผนก'),
+    ('start_date', 'วันที่เริ่ม'),
+    ('end_date', 'วันที่สิ้นสุด'),
+    ('government', 'เงินแผ่นดิน'),
+    ('government_erp', 'รหัส ERP เงินแผ่นดิน'),
+    ('accumulated', 'เงินสะสม'),
+    ('accumulated_erp', 'รหัส ERP เงินสะสม'),
+    ('revenue', 'เงินรายได้'),
+    ('revenue_erp', 'รหัส ERP เงินรายได้'),
+    ('responsible', 'ผู้รับผิดชอบ'),
+]
+
+ACTIVITY_COLUMNS = [
+    ('project_code', 'รหัสโครงการ'),
+    ('activity_number', 'ลำดับกิจกรรม'),
+    ('name', 'ชื่อกิจกรรม'),
+    ('description', 'รายละเอียด'),
+    ('start_date', 'วันที่เริ่ม'),
+    ('end_date', 'วันที่สิ้นสุด'),
+    ('government', 'เงินแผ่นดิน'),
+    ('accumulated', 'เงินสะสม'),
+    ('revenue', 'เงินรายได้'),
+    ('no_budget', 'ไม่ใช้งบประมาณ'),
+    ('responsible', 'ผู้รับผิดชอบ'),
+]
+
+SOURCE_TYPES = [key for key, _ in SOURCE_CHOICES]
+SOURCE_LABELS = dict(SOURCE_CHOICES)
+
+REQUIRED_COLUMNS = {'project_code', 'name'}
+MAX_ROWS = 5000
+TRUE_VALUES = {'1', 'y', 'yes', 'true', 'x', '✓', 'ใช่', 'ไม่ใช้'}
+
+
+@dataclass
+class PlanImport:
+    """ผลการอ่านไฟล์ — projects/activities เป็น dict ต่อแถวที่ผ่านการแปลงค่าแล้ว"""
+    fiscal_year: object
+    projects: list = field(default_factory=list)
+    activities: list = field(default_factory=list)
+    errors: list = field(default_factory=list)
+
+    def error(self, sheet, row, message):
+        self.errors.append({'sheet': sheet, 'row': row, 'message': message})
+
+    @property
+    def is_valid(self):
+        return not self.errors and bool(self.projects)
+
+    @property
+    def total_budget(self):
+        return sum((p['total_budget'] for p in self.projects), Decimal('0'))
+
+
+# ── Reading ────────────────────────────────────────────
+
+def _header_map(columns):
+    mapping = {}
+    for key, label in columns:
+        mapping[key.casefold()] = key
+        mapping[label.casefold()] = key
+    return mapping
+
+
+def _rows(values_iter, columns, required=REQUIRED_COLUMNS):
+    """แปลงแถวดิบเป็น (เลขแถว, dict) — แถวแรกเป็นหัวตาราง ข้ามแถวว่าง"""
+    header_map = _header_map(columns)
+    keys = None
+    for row_number, values in enumerate(values_iter, start=1):
+        if keys is None:
+            keys = [header_map.get(str(v or '').strip().casefold()) for v in values]
+            missing = [label for key, label in columns if key in required and key not in keys]
+            if missing:
+                raise ValidationError(f'ไม่พบคอลัมน์ {", ".join(missing)} ในหัวตาราง')
+            continue
+        if all(v is None or str(v).strip() == '' for v in values):
+            continue
+        if row_number > MAX_ROWS + 1:
+            raise ValidationError(f'ไฟล์มีเกิน {MAX_ROWS:,} แถว')
+        yield row_number, {key: value for key, value in zip(keys, values) if key}
+
+
+def read_workbook(file):
+    """คืน (แถวโครงการ, แถวกิจกรรม) จาก .xlsx — เปิดแบบ read_only ไม่โหลดทั้งไฟล์เข้าหน่วยความจำ"""
+    try:
+        wb = openpyxl.load_workbook(file, read_only=True, data_only=True)
+    except Exception:
+        raise ValidationError('ไม่สามารถเปิดไฟล์ Excel ได้')
+    try:
+        sheets = {ws.title.strip(): ws for ws in wb.worksheets}
+        if PROJECT_SHEET not in sheets:
+            raise ValidationError(f'ไม่พบแผ่นงาน "{PROJECT_SHEET}"')
+        projects = list(_rows(sheets[PROJECT_SHEET].iter_rows(values_only=True), PROJECT_COLUMNS))
+        activities = []
+        if ACTIVITY_SHEET in sheets:
+            activities = list(_rows(sheets[ACTIVITY_SHEET].iter_rows(values_only=True), ACTIVITY_COLUMNS))
+        return projects, activities
+    finally:
+        wb.close()
+
+
+def read_csv(file, columns, required=REQUIRED_COLUMNS):
+    """อ่าน CSV (UTF-8 มีหรือไม่มี BOM — รูปแบบที่ Excel บันทึก)"""
+    text = io.TextIOWrapper(getattr(file, 'file', file), encoding='utf-8-sig', newline='')
+    try:
+        return list(_rows(csv.reader(text), columns, required))
+    except UnicodeDecodeError:
+        raise ValidationError('ไฟล์ CSV ต้องเข้ารหัส UTF-8')
+    finally:
+        text.detach()
+
+
+def read_table(file, columns, required=REQUIRED_COLUMNS):
+    """อ่านตารางเดียวจาก .xlsx (แผ่นงานแรก) หรือ .csv — ใช้กับไฟล์ที่มีแผ่นเดียว เช่น statement จาก ERP"""
+    if not file.name.lower().endswith('.xlsx'):
+        return read_csv(file, columns, required)
+    try:
+        wb = openpyxl.load_workbook(file, read_only=True, data_only=True)
+    except Exception:
+        raise ValidationError('ไม่สามารถเปิดไฟล์ Excel ได้')
+    try:
+        return list(_rows(wb.worksheets[0].iter_rows(values_only=True), columns, required))
+    finally:
+        wb.close()
+
+
+# ── Value parsing ──────────────────────────────────────
+
+def parse_text(value):
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def parse_decimal(value):
+    text = parse_text(value).replace(',', '')
+    if not text:
+        return Decimal('0')
+    try:
+        result = Decimal(text)
+    except InvalidOperation:
+        raise ValidationError(f'"{value}" ไม่ใช่ตัวเลข')
+    if result < 0:
+        raise ValidationError('จำนวนเงินต้องไม่ติดลบ')
+    return result.quantize(Decimal('0.01'))
+
+
+def parse_date(value):
+    """รับ date ของ Excel, YYYY-MM-DD หรือ DD/MM/YYYY (ปี พ.ศ. แปลงเป็น ค.ศ. อัตโนมัติ)"""
+    if isinstance(value, datetime):
+        value = value.date()
+    if isinstance(value, date):
+        parsed = value
+    else:
+        text = parse_text(value)
+        if not text:
+            return None
+        parsed = None
+        for fmt in ('%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y'):
+            try:
+                parsed = datetime.strptime(text, fmt).date()
+                break
+            except ValueError:
+                continue
+        if parsed is None:
+            raise ValidationError(f'"{text}" ไม่ใช่วันที่ (ใช้ วว/ดด/ปปปป หรือ ปปปป-ดด-วว)')
+    if parsed.year > 2400:
+        parsed = parsed.replace(year=parsed.year - 543)
+    return parsed
+
+
+def _flag(value):
+    if isinstance(value, bool):
+        return value
+    return parse_text(value).casefold() in TRUE_VALUES
+
+
+def _usernames(value):
+    return [u.strip().casefold() for u in parse_text(value).replace(';', ',').split(',') if u.strip()]
+
+
+def clean_model_field(model, name, value, errors, label=None):
+    """ตรวจค่าด้วยข้อจำกัดของ model field (ความยาว, max_digits ฯลฯ)"""
+    model_field = model._meta.get_field(name)
+    if value in ('', None) and not model_field.blank:
+        errors.append(f'ต้องระบุ{label or model_field.verbose_name}')
+        return value
+    try:
+        return model_field.clean(value, None)
+    except ValidationError as e:
+        errors.append(f'{model_field.verbose_name}: {" ".join(e.messages)}')
+        return value
+
+
+# ── Validation ─────────────────────────────────────────
+
+def parse_plan(fiscal_year, user, project_file, activity_file=None):
+    """อ่านและตรวจไฟล์แผน — ไม่เขียนฐานข้อมูล (ใช้ทั้งตอน preview และก่อน commit)"""
+    plan = PlanImport(fiscal_year=fiscal_year)
+    try:
+        if project_file.name.lower().endswith('.xlsx'):
+            project_rows, activity_rows = read_workbook(project_file)
+        else:
+            project_rows = read_csv(project_file, PROJECT_COLUMNS)
+            activity_rows = read_csv(activity_file, ACTIVITY_COLUMNS) if activity_file else []
+    except ValidationError as e:
+        plan.error('', None, ' '.join(e.messages))
+        return plan
+
+    profile = getattr(user, 'profile', None)
+    can_choose_department = profile is not None and profile.role in ('planner', 'admin')
+    departments = {}
+    for dept in Department.objects.all():
+        departments[dept.code.casefold()] = dept
+        departments[dept.name.casefold()] = dept
+    allowed_users = {
+        username.casefold(): pk
+        for pk, username in _get_user_queryset(user).values_list('pk', 'username')
+    }
+    codes_in_file = {parse_text(values.get('project_code')) for _, values in project_rows}
+    existing_codes = set(
+        Project.objects.filter(project_code__in=codes_in_file).values_list('project_code', flat=True)
+    )
+
+    def responsible_ids(value, errors):
+        ids = []
+        for username in _usernames(value):
+            if username not in allowed_users:
+                errors.append(f'ไม่พบผู้ใช้ "{username}" หรือไม่มีสิทธิ์มอบหมาย')
+            else:
+                ids.append(allowed_users[username])
+        if not ids:
+            # กฎเดียวกับ ProjectForm / ActivityForm.clean_responsible_persons
+            errors.append('ต้องเลือกผู้รับผิดชอบอย่างน้อย 1 คน')
+        return ids
+
+    projects_by_code = {}
+    for row, values in project_rows:
+        errors = []
+        code = clean_model_field(Project, 'project_code', parse_text(values.get('project_code')), errors)
+        if code in existing_codes:
+            errors.append(f'รหัสโครงการ "{code}" มีอยู่ในระบบแล้ว')
+        elif code in projects_by_code:
+            errors.append(f'รหัสโครงการ "{code}" ซ้ำกับแถว {projects_by_code[code]["row"]}')
+
+        if can_choose_department:
+            dept_value = parse_text(values.get('department')).casefold()
+            department = departments.get(dept_value) if dept_value else None
+            if dept_value and department is None:
+                errors.append(f'ไม่พบแผนก "{values.get("department")}"')
+            elif department is None:
+                errors.append('ต้องระบุแผนก')
+        else:
+            # head เลือกแผนกไม่ได้ — ใช้แผนกของตนเองเหมือนฟอร์มสร้างโครงการ
+            department = profile.department if profile else None
+            if department is None:
+                errors.append('ผู้ใช้ยังไม่ได้กำหนดแผนก')
+
+        start_date = end_date = None
+        try:
+            start_date = parse_date(values.get('start_date'))
+            end_date = parse_date(values.get('end_date'))
+            if start_date is None or end_date is None:
+                errors.append('ต้องระบุวันที่เริ่มและวันที่สิ้นสุด')
+            validate_date_range(start_date, end_date)
+        except ValidationError as e:
+            errors.extend(e.messages)
+
+        sources = []
+        for source_type in SOURCE_TYPES:
+            try:
+                amount = parse_decimal(values.get(source_type))
+            except ValidationError as e:
+                errors.extend(f'{SOURCE_LABELS[source_type]}: {m}' for m in e.messages)
+                continue
+            if amount > 0:
+                amount = clean_model_field(ProjectBudgetSource, 'amount', amount, errors)
+                erp_code = clean_model_field(
+                    ProjectBudgetSource, 'erp_code', parse_text(values.get(f'{source_type}_erp')), errors,
+                )
+                sources.append({'source_type': source_type, 'erp_code': erp_code, 'amount': amount})
+
+        project = {
+            'row': row,
+            'project_code': code,
+            'name': clean_model_field(Project, 'name', parse_text(values.get('name')), errors),
+            'description': parse_text(values.get('description')),
+            'department': department,
+            'start_date': start_date,
+            'end_date': end_date,
+            'sources': sources,
+            'total_budget': sum((s['amount'] for s in sources), Decimal('0')),
+            'responsible': responsible_ids(values.get('responsible'), errors),
+            'activity_count': 0,
+            'allocated': Decimal('0'),
+        }
+        for message in errors:
+            plan.error(PROJECT_SHEET, row, message)
+        if code and code not in projects_by_code:
+            projects_by_code[code] = project
+        plan.projects.append(project)
+
+    numbers_used = {}
+    for row, values in activity_rows:
+        errors = []
+        code = parse_text(values.get('project_code'))
+        project = projects_by_code.get(code)
+        if project is None:
+            plan.error(ACTIVITY_SHEET, row, f'ไม่พบรหัสโครงการ "{code}" ในแผ่นงาน{PROJECT_SHEET}')
+            continue
+
+        used = numbers_used.setdefault(code, set())
+        number_text = parse_text(values.get('activity_number'))
+        if number_text:
+            try:
+                number = int(Decimal(number_text))
+                if number < 1:
+                    raise ValueError
+            except (InvalidOperation, ValueError):
+                errors.append(f'ลำดับกิจกรรม "{number_text}" ไม่ถูกต้อง')
+                number = None
+        else:
+            number = max(used, default=0) + 1
+        if number is not None:
+            if number in used:
+                errors.append(f'ลำดับกิจกรรม {number} ซ้ำในโครงการ {code}')
+            used.add(number)
+
+        start_date = end_date = None
+        try:
+            start_date = parse_date(values.get('start_date')) or project['start_date']
+            end_date = parse_date(values.get('end_date')) or project['end_date']
+            validate_date_range(start_date, end_date)
+        except ValidationError as e:
+            errors.extend(e.messages)
+
+        no_budget = _flag(values.get('no_budget'))
+        budgets = {source_type: Decimal('0') for source_type in SOURCE_TYPES}
+        if not no_budget:
+            project_sources = {s['source_type'] for s in project['sources']}
+            for source_type in SOURCE_TYPES:
+                try:
+                    amount = parse_decimal(values.get(source_type))
+                except ValidationError as e:
+                    errors.extend(f'{SOURCE_LABELS[source_type]}: {m}' for m in e.messages)
+                    continue
+                if amount and source_type not in project_sources:
+                    errors.append(f'โครงการ {code} ไม่มีหมวด{SOURCE_LABELS[source_type]}')
+                budgets[source_type] = amount
+            if not project_sources:
+                errors.append(f'โครงการ {code} ไม่มีหมวดเงิน — ระบุ "ไม่ใช้งบประมาณ" สำหรับกิจกรรมนี้')
+            else:
+                total = sum(budgets.values())
+                try:
+                    validate_source_allocation(project['total_budget'], project['allocated'], total)
+                    project['allocated'] += total
+                except ValidationError as e:
+                    errors.extend(e.messages)
+
+        activity = {
+            'row': row,
+            'project_code': code,
+            'activity_number': number,
+            'name': clean_model_field(Activity, 'name', parse_text(values.get('name')), errors),
+            'description': parse_text(values.get('description')),
+            'start_date': start_date,
+            'end_date': end_date,
+            'no_budget': no_budget,
+            'budgets': budgets,
+            'allocated_budget': Decimal('0') if no_budget else sum(budgets.values()),
+            'responsible': responsible_ids(values.get('responsible'), errors),
+        }
+        for message in errors:
+            plan.error(ACTIVITY_SHEET, row, message)
+        project['activity_count'] += 1
+        plan.activities.append(activity)
+
+    if not plan.projects and not plan.errors:
+        plan.error(PROJECT_SHEET, None, 'ไม่พบข้อมูลโครงการในไฟล์')
+    return plan
+
+
+# ── Commit ─────────────────────────────────────────────
+
+def commit_plan(plan, user):
+    """บันทึกแผนที่ผ่านการตรวจแล้วใน transaction เดียว — คืน (จำนวนโครงการ, จำนวนกิจกรรม)"""
+    if not plan.is_valid:
+        raise ValidationError('ไฟล์แผนยังมีข้อผิดพลาด')
+
+    fiscal_year = plan.fiscal_year
+    with transaction.atomic():
+        Project.objects.bulk_create([
+            Project(
+                fiscal_year=fiscal_year,
+                department=p['department'],
+                project_code=p['project_code'],
+                code_sort_key=make_code_sort_key(p['project_code']),
+                name=p['name'],
+                description=p['description'],
+                total_budget=0,
+                start_date=p['start_date'],
+                end_date=p['end_date'],
+                created_by=user,
+                activity_pending_count=p['activity_count'],
+            )
+            for p in plan.projects
+        ], batch_size=500)
+        # bulk_create บน MySQL ไม่คืน pk — อ่านกลับด้วยรหัสโครงการ (unique)
+        project_ids = dict(Project.objects.filter(
+            project_code__in=[p['project_code'] for p in plan.projects],
+        ).values_list('project_code', 'pk'))
+
+        ProjectBudgetSource.objects.bulk_create([
+            ProjectBudgetSource(project_id=project_ids[p['project_code']], **source)
+            for p in plan.projects for source in p['sources']
+        ], batch_size=1000)
+
+        Activity.objects.bulk_create([
+            Activity(
+                project_id=project_ids[a['project_code']],
+                activity_number=a['activity_number'],
+                name=a['name'],
+                description=a['description'],
+                allocated_budget=a['allocated_budget'],
+                budget_government=a['budgets']['government'],
+                budget_accumulated=a['budgets']['accumulated'],
+                budget_revenue=a['budgets']['revenue'],
+                no_budget=a['no_budget'],
+                start_date=a['start_date'],
+                end_date=a['end_date'],
+            )
+            for a in plan.activities
+        ], batch_size=1000)
+        activity_ids = {
+            (project_id, number): pk
+            for pk, project_id, number in Activity.objects.filter(
+                project_id__in=project_ids.values(),
+            ).values_list('pk', 'project_id', 'activity_number')
+        }
+
+        ProjectResponsible = Project.responsible_persons.through
+        ProjectResponsible.objects.bulk_create([
+            ProjectResponsible(project_id=project_ids[p['project_code']], user_id=user_id)
+            for p in plan.projects for user_id in dict.fromkeys(p['responsible'])
+        ], batch_size=1000)
+        ActivityResponsible = Activity.responsible_persons.through
+        ActivityResponsible.objects.bulk_create([
+            ActivityResponsible(
+                activity_id=activity_ids[(project_ids[a['project_code']], a['activity_number'])],
+                user_id=user_id,
+            )
+            for a in plan.activities for user_id in dict.fromkeys(a['responsible'])
+        ], batch_size=1000)
+
+        finish_bulk_insert(project_ids.values(), activity_ids.values(), user)
+
+    return len(project_ids), len(activity_ids)
+
+
+def finish_bulk_insert(project_ids, activity_ids, user):
+    """งานที่ signal ทำให้เมื่อสร้างทีละรายการ — เรียกครั้งเดียวหลัง bulk_create (ภายใน transaction)
+
+    ใช้กับโครงการ/กิจกรรมใหม่ (สถานะเริ่มต้น draft / pending) ที่ตั้งตัวนับกิจกรรมไว้แล้ว
+    """
+    from apps.search.indexing import index_objects
+
+    project_ids, activity_ids = list(project_ids), list(activity_ids)
+    ProjectStatusHistory.objects.bulk_create([
+        ProjectStatusHistory(project_id=pk, to_status='draft', source='create', changed_by=user)
+        for pk in project_ids
+    ], batch_size=1000)
+    ActivityStatusHistory.objects.bulk_create([
+        ActivityStatusHistory(activity_id=pk, to_status='pending', source='create', changed_by=user)
+        for pk in activity_ids
+    ], batch_size=1000)
+
+    recalc.mark_dirty('project_total_budget', *project_ids)
+    index_objects('project', Project.objects.filter(pk__in=project_ids))
+    index_objects('activity', Activity.objects.filter(pk__in=activity_ids).select_related('project'))
+    timeline.bump_data_version()
+
+
+def build_template():
+    """Workbook เปล่าพร้อมหัวตารางทั้งสองแผ่นงาน (ไฟล์ต้นแบบให้ดาวน์โหลด)"""
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = PROJECT_SHEET
+    ws.append([label for _, label in PROJECT_COLUMNS])
+    ws_act = wb.create_sheet(ACTIVITY_SHEET)
+    ws_act.append([label for _, label in ACTIVITY_COLUMNS])
+    for sheet in (ws, ws_act):
+        sheet.freeze_panes = 'A2'
+        for cell in sheet[1]:
+            cell.font = Font(bold=True)
+            sheet.column_dimensions[cell.column_letter].width = max(14, len(cell.value) + 6)
+    return wb
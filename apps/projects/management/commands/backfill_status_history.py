@@ -0,0 +1,156 @@
+"""Management command: สร้างประวัติสถานะย้อนหลังจาก Audit Log (รวมเดือนที่ archive แล้ว)
+
+Audit log เก็บการเปลี่ยนสถานะเป็นข้อความ ('สถานะ: pending → completed') และอ้าง object ด้วย
+รหัสโครงการ / ลำดับกิจกรรมใน target_repr — คำสั่งนี้แปลงกลับเป็น ProjectStatusHistory /
+ActivityStatusHistory ครั้งเดียว ข้าม object ที่มีประวัติอยู่แล้ว จึงรันซ้ำได้
+"""
+import re
+from bisect import bisect_right
+from collections import defaultdict
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils.dateparse import parse_datetime
+
+from apps.accounts.models import AuditLog, AuditLogArchive
+from apps.projects.models import Activity, ActivityStatusHistory, Project, ProjectStatusHistory
+
+ACTIONS = ('PROJECT_CREATE', 'PROJECT_STATUS', 'ACTIVITY_CREATE', 'ACTIVITY_STATUS')
+
+_ACTIVITY_RE = re.compile(r'^(?P<code>.+?) / กิจกรรม(?:ที่)? (?P<num>\d+)(?::| -)')
+_PROJECT_RE = re.compile(r'^(?P<code>.+?) - ')
+_STATUS_RE = re.compile(r'สถานะ:\s*(?P<old>\w+)\s*→\s*(?P<new>\w+)')
+_NOTE_RE = re.compile(r'\|\s*หมายเหตุ:\s*(?P<note>.*)$')
+
+
+def _seconds(later, earlier):
+    return max(int((later - earlier).total_seconds()), 0)
+
+
+class Command(BaseCommand):
+    help = "Backfill project/activity status history from audit logs (safe to re-run)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Count rows that would be created without writing anything',
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+
+        # โครงการที่ใช้รหัสเดียวกันได้หลายปีงบ — เลือกโครงการล่าสุดที่สร้างก่อนเวลาของ log
+        projects_by_code = defaultdict(list)
+        for pk, code, created_at, status in Project.objects.order_by('created_at').values_list(
+            'pk', 'project_code', 'created_at', 'status',
+        ):
+            projects_by_code[code].append((created_at, pk, status))
+        activities = {
+            (project_id, number): (pk, status)
+            for pk, project_id, number, status in Activity.objects.values_list(
+                'pk', 'project_id', 'activity_number', 'status',
+            )
+        }
+        project_status = {pk: status for entries in projects_by_code.values() for _, pk, status in entries}
+        activity_status = dict(activities.values())
+        self.user_ids = set(get_user_model().objects.values_list('pk', flat=True))
+        skip_projects = set(ProjectStatusHistory.objects.values_list('project_id', flat=True).distinct())
+        skip_activities = set(ActivityStatusHistory.objects.values_list('activity_id', flat=True).distinct())
+
+        def resolve_project(code, when):
+            entries = projects_by_code.get(code.strip())
+            if not entries:
+                return None
+            idx = bisect_right([created for created, _, _ in entries], when)
+            return entries[max(idx - 1, 0)][1]
+
+        events = {'project': defaultdict(list), 'activity': defaultdict(list)}
+        scanned = 0
+        for log in self._iter_logs():
+            scanned += 1
+            action, target, detail = log['action'], log['target_repr'] or '', log['detail'] or ''
+            if action.startswith('ACTIVITY'):
+                m = _ACTIVITY_RE.match(target)
+                if not m:
+                    continue
+                project_id = resolve_project(m['code'], log['created_at'])
+                activity = activities.get((project_id, int(m['num'])))
+                if activity is None or activity[0] in skip_activities:
+                    continue
+                kind, owner = 'activity', activity[0]
+            else:
+                m = _PROJECT_RE.match(target)
+                if not m:
+                    continue
+                owner = resolve_project(m['code'], log['created_at'])
+                if owner is None or owner in skip_projects:
+                    continue
+                kind = 'project'
+
+            if action.endswith('CREATE'):
+                events[kind][owner].append({'from': '', 'to': None, 'source': 'create',
+                                            'user_id': log['user_id'], 'at': log['created_at'], 'note': ''})
+                continue
+            status = _STATUS_RE.search(detail)
+            if not status:
+                continue
+            note = _NOTE_RE.search(detail)
+            events[kind][owner].append({'from': status['old'], 'to': status['new'], 'source': 'backfill',
+                                        'user_id': log['user_id'], 'at': log['created_at'],
+                                        'note': note['note'][:500] if note else ''})
+
+        project_rows = self._build_rows(ProjectStatusHistory, 'project_id', events['project'], project_status)
+        activity_rows = self._build_rows(ActivityStatusHistory, 'activity_id', events['activity'], activity_status)
+
+        if dry_run:
+            self.stdout.write(
+                f'[DRY RUN] scanned {scanned} logs → {len(project_rows)} project rows, '
+                f'{len(activity_rows)} activity rows'
+            )
+            return
+
+        with transaction.atomic():
+            ProjectStatusHistory.objects.bulk_create(project_rows, batch_size=1000)
+            ActivityStatusHistory.objects.bulk_create(activity_rows, batch_size=1000)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Done — {len(project_rows)} project rows, {len(activity_rows)} activity rows '
+            f'(scanned {scanned} logs)'
+        ))
+
+    def _iter_logs(self):
+        """log ทั้งหมดที่เกี่ยวข้อง เรียงตามเวลา — archive (เดือนเก่า) ก่อน แล้วจึงตารางปัจจุบัน"""
+        for archive in AuditLogArchive.objects.order_by('month'):
+            for row in archive.iter_rows():
+                if row['action'] in ACTIONS:
+                    row['created_at'] = parse_datetime(row['created_at'])
+                    yield row
+        yield from AuditLog.objects.filter(action__in=ACTIONS).order_by('created_at', 'id').values(
+            'action', 'target_repr', 'detail', 'user_id', 'created_at',
+        ).iterator()
+
+    def _build_rows(self, model, owner_field, events_by_owner, current_status):
+        rows = []
+        for owner, events in events_by_owner.items():
+            first = last = None
+            for i, event in enumerate(events):
+                if event['to'] is None:
+                    # สถานะตอนสร้าง = สถานะเดิมของการเปลี่ยนครั้งถัดไป หรือสถานะปัจจุบันถ้าไม่เคยเปลี่ยน
+                    following = next((e for e in events[i + 1:] if e['source'] != 'create'), None)
+                    event['to'] = following['from'] if following else current_status.get(owner, '')
+                rows.append(model(**{
+                    owner_field: owner,
+                    'from_status': event['from'],
+                    'to_status': event['to'],
+                    'source': event['source'],
+                    'changed_by_id': event['user_id'] if event['user_id'] in self.user_ids else None,
+                    'changed_at': event['at'],
+                    'note': event['note'],
+                    'duration_seconds': _seconds(event['at'], last) if last else None,
+                    'cycle_seconds': _seconds(event['at'], first) if first else None,
+                }))
+                first = first or event['at']
+                last = event['at']
+        return rows
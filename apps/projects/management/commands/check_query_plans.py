@@ -0,0 +1,158 @@
+"""Management command: ตรวจแผนการ query (EXPLAIN) ของ query หลักว่ายังใช้ index ที่ออกแบบไว้
+
+ใช้ query แบบเดียวกับ dashboard, reports และ send_deadline_alerts แล้วหาชื่อ index ในผล EXPLAIN
+— SQLite แสดงเป็น "USING INDEX <name>" / "USING COVERING INDEX <name>", MySQL แสดงในคอลัมน์ key
+รันหลัง migrate หรือหลังข้อมูลโตขึ้นมาก (ควรรัน ANALYZE TABLE บน MySQL ก่อน) — ถ้าแผนเปลี่ยนจะจบด้วย error
+"""
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Sum
+from django.utils import timezone
+
+from apps.budget.models import Expense, SpendRollup
+from apps.projects.models import Activity, Project
+
+ACTIVE_STATUSES = ['not_started', 'pending', 'in_progress']
+
+
+# ค่าตัวกรองเป็น id คงที่ ไม่อ่านจากแถวจริง — ฐานข้อมูลว่างจะได้ "= 1" ไม่ใช่ "IS NULL"
+# แผนการ query จึงเหมือนกันทุกครั้งไม่ว่าจะมีข้อมูลหรือไม่ (ไม่จำเป็นต้องมีแถว id นี้อยู่จริง)
+USER_ID = 1
+DEPARTMENT_ID = 1
+FISCAL_YEAR_ID = 1
+
+
+def _plans():
+    """[(ชื่อ, ที่มา, queryset, index ที่คาดหวัง)] — index ใดใน tuple ก็ถือว่าผ่าน"""
+    today = timezone.localdate()
+    projects = Project.objects.filter(fiscal_year_id=FISCAL_YEAR_ID)
+    scoped = Activity.objects.filter(project__in=projects)
+
+    return [
+        (
+            'expense_by_activity_status', 'dashboard',
+            Expense.objects.filter(activity__in=scoped, status='pending'),
+            ('expense_act_status_src_idx',),
+        ),
+        (
+            'expense_no_source', 'dashboard',
+            Expense.objects.filter(activity__in=scoped, status__in=['pending', 'approved'], budget_source=''),
+            ('expense_act_status_src_idx',),
+        ),
+        (
+            'expense_unlinked_report', 'dashboard',
+            Expense.objects.filter(status='approved', activity_report__isnull=True),
+            ('expense_status_report_idx',),
+        ),
+        (
+            'expense_my_pending', 'dashboard',
+            Expense.objects.filter(created_by_id=USER_ID, status='pending'),
+            ('expense_creator_status_idx',),
+        ),
+        (
+            'expense_department_scope', 'get_expenses_for_user',
+            Expense.objects.filter(department_id=DEPARTMENT_ID, status='pending'),
+            ('expense_dept_status_idx',),
+        ),
+        (
+            'expense_list_department', 'expense_list',
+            Expense.objects.filter(department_id=DEPARTMENT_ID).order_by('-created_at', '-id')[:51],
+            ('expense_dept_created_idx',),
+        ),
+        (
+            'expense_list_all_by_date', 'expense_list',
+            Expense.objects.order_by('-expense_date', '-id')[:51],
+            ('expense_date_idx',),
+        ),
+        (
+            'expense_approved_by_project', 'reports',
+            Expense.objects.filter(project__in=projects, status='approved'),
+            ('expense_proj_status_idx',),
+        ),
+        (
+            'expense_spent_by_source', 'dashboard',
+            Expense.objects.filter(
+                project__in=projects, status='approved',
+                budget_source__in=['government', 'accumulated', 'revenue'],
+            ),
+            ('expense_proj_status_idx',),
+        ),
+        (
+            'expense_by_fiscal_year', 'reports',
+            Expense.objects.filter(fiscal_year_id=FISCAL_YEAR_ID, status='approved'),
+            ('expense_fy_status_idx',),
+        ),
+        (
+            'spend_rollup_monthly', 'executive',
+            SpendRollup.objects.filter(fiscal_year_id=FISCAL_YEAR_ID).values('month', 'source')
+            .annotate(total=Sum('approved_amount')),
+            ('rollup_fy_month_idx',),
+        ),
+        (
+            'activity_overdue', 'dashboard',
+            Activity.objects.filter(
+                project__in=projects, status__in=['pending', 'in_progress'], end_date__lt=today,
+            ),
+            ('activity_proj_status_end_idx',),
+        ),
+        (
+            'activity_not_started', 'dashboard',
+            Activity.objects.filter(status='pending', start_date__lte=today),
+            ('activity_status_start_idx',),
+        ),
+        (
+            'activity_deadline', 'send_deadline_alerts',
+            Activity.objects.filter(status__in=ACTIVE_STATUSES, end_date__isnull=False),
+            ('activity_status_end_idx',),
+        ),
+        (
+            'activity_ending_soon', 'send_deadline_alerts',
+            Activity.objects.filter(
+                status__in=ACTIVE_STATUSES,
+                end_date__in=[today + timedelta(days=7), today + timedelta(days=3)],
+            ),
+            ('activity_status_end_idx', 'activity_proj_status_end_idx'),
+        ),
+    ]
+
+
+class Command(BaseCommand):
+    help = "Verify that hot Expense/Activity querysets use the intended composite indexes (EXPLAIN)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verbose-plans',
+            action='store_true',
+            help='Print the full EXPLAIN output of every query',
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor not in ('sqlite', 'mysql'):
+            raise CommandError(f'รองรับเฉพาะ SQLite และ MySQL (ฐานข้อมูลนี้: {connection.vendor})')
+
+        failed = []
+        plans = _plans()
+        for name, origin, queryset, expected in plans:
+            # ordering ของ Meta ไม่ใช่ส่วนของ query ที่ตรวจ — คงไว้เฉพาะที่ระบุเอง (keyset pagination)
+            if not queryset.query.order_by:
+                queryset = queryset.order_by()
+            plan = queryset.explain()
+            used = [index for index in expected if index in plan]
+            if used:
+                self.stdout.write(f'OK    {origin:<22} {name:<30} → {used[0]}')
+            else:
+                failed.append(name)
+                self.stdout.write(self.style.ERROR(
+                    f'FAIL  {origin:<22} {name:<30} ไม่ใช้ {" / ".join(expected)}'
+                ))
+            if options['verbose_plans'] or not used:
+                for line in plan.splitlines():
+                    self.stdout.write(f'      {line}')
+
+        if failed:
+            raise CommandError(f'แผนการ query ไม่ตรงกับ index ที่กำหนด: {", ".join(failed)}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Done — {len(plans)} queries use their intended indexes ({connection.vendor})'
+        ))
@@ -0,0 +1,65 @@
+"""Management command: ยกยอดโครงการจากปีงบประมาณหนึ่งไปอีกปี (ทางเลือกของหน้า ยกยอดข้ามปีงบ)
+
+ตัวอย่าง:
+    python manage.py rollover_fiscal_year --source 2568 --target 2569 --user planner01
+    python manage.py rollover_fiscal_year --source 2568 --target 2569 --user planner01 --project 1 --project 2.5
+"""
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.projects.models import FiscalYear, Project
+from apps.projects.rollover import copy_projects, remap_code
+
+
+class Command(BaseCommand):
+    help = "Copy projects (with budget sources, activities and people) into another fiscal year"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--source', type=int, required=True, help='Source fiscal year (พ.ศ.)')
+        parser.add_argument('--target', type=int, required=True, help='Target fiscal year (พ.ศ.)')
+        parser.add_argument('--user', required=True, help='Username recorded as creator of the copies')
+        parser.add_argument(
+            '--project', action='append', default=[],
+            help='Project code to copy (repeatable, default: all projects of the source year)',
+        )
+        parser.add_argument('--no-activities', action='store_true', help='Copy projects without activities')
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Show the code mapping without writing anything',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            source = FiscalYear.objects.get(year=options['source'])
+            target = FiscalYear.objects.get(year=options['target'])
+        except FiscalYear.DoesNotExist:
+            raise CommandError('ไม่พบปีงบประมาณต้นทางหรือปลายทาง')
+        if source == target:
+            raise CommandError('ปีงบต้นทางและปลายทางต้องไม่ใช่ปีเดียวกัน')
+        user = get_user_model().objects.filter(username=options['user']).first()
+        if user is None:
+            raise CommandError(f'ไม่พบผู้ใช้ "{options["user"]}"')
+
+        projects = Project.objects.filter(fiscal_year=source).order_by('code_sort_key')
+        if options['project']:
+            projects = projects.filter(project_code__in=options['project'])
+
+        if options['dry_run']:
+            for code in projects.values_list('project_code', flat=True):
+                self.stdout.write(f'  {code} → {remap_code(code, source.year, target.year)}')
+            self.stdout.write(f'[DRY RUN] {projects.count()} projects would be copied to {target.year}')
+            return
+
+        def report(progress, total=None, message=''):
+            self.stdout.write(f'  {message}')
+
+        result = copy_projects(
+            projects.values_list('pk', flat=True), target, user,
+            include_activities=not options['no_activities'], report=report,
+        )
+        for code in result['skipped']:
+            self.stdout.write(self.style.WARNING(f'  skipped {code} (target code exists)'))
+        self.stdout.write(self.style.SUCCESS(
+            f'Done — {result["projects"]} projects, {result["activities"]} activities copied to {target.year}'
+        ))
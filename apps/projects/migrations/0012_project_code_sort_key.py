@@ -0,0 +1,44 @@
+# Generated by Django 5.1.15 on 2026-10-19 14:02
+
+import re
+
+from django.db import migrations, models
+
+_CODE_NUMBER_RE = re.compile(r'^\s*(\d*)(?:\.(\d+))?')
+
+
+def _make_code_sort_key(project_code):
+    # สำเนาของ apps.projects.models.make_code_sort_key ณ เวลาที่สร้าง migration
+    code = project_code or ''
+    match = _CODE_NUMBER_RE.match(code)
+    integer = min(int(match.group(1) or 0), 10 ** 12 - 1)
+    fraction = (match.group(2) or '')[:8]
+    return f'{integer:012d}.{fraction:0<8}|{code}'
+
+
+def fill_code_sort_key(apps, schema_editor):
+    Project = apps.get_model('projects', 'Project')
+    projects = list(Project.objects.only('pk', 'project_code'))
+    for project in projects:
+        project.code_sort_key = _make_code_sort_key(project.project_code)
+    Project.objects.bulk_update(projects, ['code_sort_key'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0011_documenttemplate'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='code_sort_key',
+            field=models.CharField(db_index=True, default='', editable=False, help_text='สร้างอัตโนมัติจากรหัสโครงการ — ใช้เรียงลำดับแบบตัวเลข', max_length=80, verbose_name='ลำดับรหัสโครงการ'),
+        ),
+        migrations.RunPython(fill_code_sort_key, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['fiscal_year', 'code_sort_key'], name='project_fy_code_sort_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.15 on 2026-10-19 14:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0008_auditlog_indexes_archive'),
+        ('projects', '0012_project_code_sort_key'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['department', 'code_sort_key'], name='project_dept_code_sort_idx'),
+        ),
+    ]
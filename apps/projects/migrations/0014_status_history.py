@@ -0,0 +1,61 @@
+# Generated by Django 5.1.15 on 2026-10-19 14:11
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0013_project_dept_code_sort_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ActivityStatusHistory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('from_status', models.CharField(blank=True, max_length=20, verbose_name='สถานะเดิม')),
+                ('to_status', models.CharField(max_length=20, verbose_name='สถานะใหม่')),
+                ('source', models.CharField(choices=[('create', 'สร้างใหม่'), ('manual', 'เปลี่ยนโดยผู้ใช้'), ('auto', 'ปรับอัตโนมัติ'), ('backfill', 'นำเข้าจาก Audit Log')], default='manual', max_length=10, verbose_name='ที่มา')),
+                ('changed_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='เปลี่ยนเมื่อ')),
+                ('note', models.CharField(blank=True, max_length=500, verbose_name='หมายเหตุ')),
+                ('duration_seconds', models.PositiveIntegerField(blank=True, null=True, verbose_name='เวลาในสถานะเดิม (วินาที)')),
+                ('cycle_seconds', models.PositiveIntegerField(blank=True, null=True, verbose_name='เวลานับจากสร้าง (วินาที)')),
+                ('activity', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='status_history', to='projects.activity', verbose_name='กิจกรรม')),
+                ('changed_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='เปลี่ยนโดย')),
+            ],
+            options={
+                'verbose_name': 'ประวัติสถานะกิจกรรม',
+                'verbose_name_plural': 'ประวัติสถานะกิจกรรม',
+                'ordering': ['changed_at', 'id'],
+                'abstract': False,
+                'indexes': [models.Index(fields=['activity', 'changed_at'], name='act_status_hist_idx'), models.Index(fields=['to_status', 'changed_at'], name='act_status_hist_to_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ProjectStatusHistory',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('from_status', models.CharField(blank=True, max_length=20, verbose_name='สถานะเดิม')),
+                ('to_status', models.CharField(max_length=20, verbose_name='สถานะใหม่')),
+                ('source', models.CharField(choices=[('create', 'สร้างใหม่'), ('manual', 'เปลี่ยนโดยผู้ใช้'), ('auto', 'ปรับอัตโนมัติ'), ('backfill', 'นำเข้าจาก Audit Log')], default='manual', max_length=10, verbose_name='ที่มา')),
+                ('changed_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='เปลี่ยนเมื่อ')),
+                ('note', models.CharField(blank=True, max_length=500, verbose_name='หมายเหตุ')),
+                ('duration_seconds', models.PositiveIntegerField(blank=True, null=True, verbose_name='เวลาในสถานะเดิม (วินาที)')),
+                ('cycle_seconds', models.PositiveIntegerField(blank=True, null=True, verbose_name='เวลานับจากสร้าง (วินาที)')),
+                ('changed_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='เปลี่ยนโดย')),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='status_history', to='projects.project', verbose_name='โครงการ')),
+            ],
+            options={
+                'verbose_name': 'ประวัติสถานะโครงการ',
+                'verbose_name_plural': 'ประวัติสถานะโครงการ',
+                'ordering': ['changed_at', 'id'],
+                'abstract': False,
+                'indexes': [models.Index(fields=['project', 'changed_at'], name='proj_status_hist_idx'), models.Index(fields=['to_status', 'changed_at'], name='proj_status_hist_to_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.1.15 on 2026-10-19 14:15
+
+from django.db import migrations, models
+from django.db.models import Count
+
+COUNTER_FIELD = {
+    'pending': 'activity_pending_count',
+    'in_progress': 'activity_in_progress_count',
+    'completed': 'activity_completed_count',
+    'cancelled': 'activity_cancelled_count',
+}
+
+
+def fill_activity_counters(apps, schema_editor):
+    Project = apps.get_model('projects', 'Project')
+    Activity = apps.get_model('projects', 'Activity')
+    counts = {}
+    for row in Activity.objects.values('project_id', 'status').annotate(n=Count('id')).order_by():
+        counts.setdefault(row['project_id'], {})[row['status']] = row['n']
+    projects = list(Project.objects.filter(pk__in=counts).only('pk'))
+    for project in projects:
+        for status, field in COUNTER_FIELD.items():
+            setattr(project, field, counts[project.pk].get(status, 0))
+    Project.objects.bulk_update(projects, list(COUNTER_FIELD.values()), batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0014_status_history'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='activity_cancelled_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='กิจกรรมยกเลิก'),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='activity_completed_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='กิจกรรมเสร็จสิ้น'),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='activity_in_progress_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='กิจกรรมกำลังดำเนินการ'),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='activity_pending_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='กิจกรรมรอดำเนินการ'),
+        ),
+        migrations.RunPython(fill_activity_counters, migrations.RunPython.noop),
+    ]
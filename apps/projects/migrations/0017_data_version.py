@@ -0,0 +1,24 @@
+# Generated by Django 5.1.15 on 2026-10-19 15:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0016_activity_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DataVersion',
+            fields=[
+                ('key', models.CharField(max_length=50, primary_key=True, serialize=False, verbose_name='คีย์')),
+                ('version', models.PositiveBigIntegerField(default=0, verbose_name='เวอร์ชัน')),
+            ],
+            options={
+                'verbose_name': 'เวอร์ชันข้อมูล',
+                'verbose_name_plural': 'เวอร์ชันข้อมูล',
+            },
+        ),
+    ]
@@ -1,6 +1,10 @@
+import re
+
 from django.conf import settings
 from django.db import models
-from django.db.models import Sum
+from django.db.models import DecimalField, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 
 
 class ProjectDeleteRequest(models.Model):
@@ -66,6 +70,29 @@ SOURCE_CHOICES = [
 ]
 
 
+_CODE_NUMBER_RE = re.compile(r'^\s*(\d*)(?:\.(\d+))?')
+
+
+def clear_budget_cache(*instances):
+    """ล้างยอดงบ/ยอดใช้จ่ายที่จำไว้บน Project/Activity instance (เรียกเมื่อรายการเบิกจ่ายเปลี่ยน)"""
+    for instance in instances:
+        instance.__dict__.pop('_budget_breakdown', None)
+        instance.__dict__.pop('_total_spent', None)
+
+
+def make_code_sort_key(project_code):
+    """แปลงรหัสโครงการเป็นคีย์ที่เรียงแบบ string ได้ลำดับเดียวกับการเรียงแบบตัวเลข
+
+    '2' → '000000000002.00000000|2', '10' อยู่หลัง '2', '1.1' อยู่ระหว่าง '1' กับ '2'
+    รหัสที่ไม่ขึ้นต้นด้วยตัวเลขนับเป็น 0 (เหมือน CAST เดิม) แล้วเรียงตามรหัสเต็ม
+    """
+    code = project_code or ''
+    match = _CODE_NUMBER_RE.match(code)
+    integer = min(int(match.group(1) or 0), 10 ** 12 - 1)
+    fraction = (match.group(2) or '')[:8]
+    return f'{integer:012d}.{fraction:0<8}|{code}'
+
+
 class Project(models.Model):
     STATUS_CHOICES = [
         ('draft', 'ร่าง'),
@@ -88,6 +115,10 @@ class Project(models.Model):
         verbose_name='แผนก',
     )
     project_code = models.CharField('รหัสโครงการ', max_length=50, unique=True)
+    code_sort_key = models.CharField(
+        'ลำดับรหัสโครงการ', max_length=80, editable=False, db_index=True, default='',
+        help_text='สร้างอัตโนมัติจากรหัสโครงการ — ใช้เรียงลำดับแบบตัวเลข',
+    )
     name = models.CharField('ชื่อโครงการ', max_length=300)
     description = models.TextField('รายละเอียด', blank=True)
     total_budget = models.DecimalField('งบประมาณรวม', max_digits=12, decimal_places=2)
@@ -115,58 +146,123 @@ class Project(models.Model):
     )
     created_at = models.DateTimeField('สร้างเมื่อ', auto_now_add=True)
     updated_at = models.DateTimeField('แก้ไขเมื่อ', auto_now=True)
+    # ตัวนับสถานะกิจกรรม — ปรับด้วย F() เมื่อสถานะกิจกรรมเปลี่ยนจริงเท่านั้น (ดู counters.py)
+    activity_pending_count = models.PositiveIntegerField('กิจกรรมรอดำเนินการ', default=0, editable=False)
+    activity_in_progress_count = models.PositiveIntegerField('กิจกรรมกำลังดำเนินการ', default=0, editable=False)
+    activity_completed_count = models.PositiveIntegerField('กิจกรรมเสร็จสิ้น', default=0, editable=False)
+    activity_cancelled_count = models.PositiveIntegerField('กิจกรรมยกเลิก', default=0, editable=False)
+
+    COUNTER_FIELDS = (
+        'activity_pending_count', 'activity_in_progress_count',
+        'activity_completed_count', 'activity_cancelled_count',
+    )
 
     class Meta:
         verbose_name = 'โครงการ'
         verbose_name_plural = 'โครงการ'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['fiscal_year', 'code_sort_key'], name='project_fy_code_sort_idx'),
+            models.Index(fields=['department', 'code_sort_key'], name='project_dept_code_sort_idx'),
+        ]
 
     def __str__(self):
         return f'{self.project_code} - {self.name}'
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # แผนก/ปีงบตอนโหลด — signal ใช้ตรวจว่าขอบเขตของโครงการเปลี่ยนจริงหรือไม่ (None = ไม่ทราบ)
+        instance._loaded_department_id = instance.__dict__.get('department_id')
+        instance._loaded_fiscal_year_id = instance.__dict__.get('fiscal_year_id')
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        super().refresh_from_db(using=using, fields=fields, **kwargs)
+        if fields is None or 'department' in fields:
+            self._loaded_department_id = self.__dict__.get('department_id')
+        if fields is None or 'fiscal_year' in fields:
+            self._loaded_fiscal_year_id = self.__dict__.get('fiscal_year_id')
+
+    def save(self, *args, **kwargs):
+        self.code_sort_key = make_code_sort_key(self.project_code)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'project_code' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'code_sort_key'}
+        elif update_fields is None and not self._state.adding and not kwargs.get('force_insert'):
+            # ไม่เขียนทับตัวนับที่อาจถูกปรับด้วย F() ระหว่างที่ object นี้อยู่ในหน่วยความจำ
+            kwargs['update_fields'] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.name not in self.COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
     @property
     def budget_by_source(self):
         """Returns dict: {'government': amount, 'accumulated': amount, 'revenue': amount}"""
         return {s.source_type: s.amount for s in self.budget_sources.all()}
 
-    def budget_source_summary(self, exclude_activity_pk=None):
-        """Returns list of dicts with per-source budget info for activity form display."""
-        result = []
-        for source in self.budget_sources.all():
-            field = f'budget_{source.source_type}'
-            qs = self.activities.all()
-            if exclude_activity_pk:
-                qs = qs.exclude(pk=exclude_activity_pk)
-            allocated = qs.aggregate(total=Sum(field))['total'] or 0
-            result.append({
-                'source_type': source.source_type,
+    def budget_breakdown(self, exclude_activity_pk=None, exclude_expense_pk=None):
+        """สรุปงบรายแหล่งเงิน: งบ / จัดสรรให้กิจกรรม / ใช้ไป (อนุมัติ, รออนุมัติ) / คงเหลือ
+        รวมถึงยอดที่ยังไม่ระบุแหล่งเงิน — ยอดทั้งหมดมาจาก query เดียว และจำผลไว้บน instance
+
+        Returns dict: {'sources': [...], 'untagged_spent', 'untagged_pending', 'total_spent', 'total_pending'}
+        """
+        key = (exclude_activity_pk, exclude_expense_pk)
+        cache = self.__dict__.setdefault('_budget_breakdown', {})
+        if key in cache:
+            return cache[key]
+
+        from apps.budget.models import Expense
+        activities = Activity.objects.filter(project=OuterRef('pk'))
+        if exclude_activity_pk:
+            activities = activities.exclude(pk=exclude_activity_pk)
+        expenses = Expense.objects.filter(project=OuterRef('pk'))
+        if exclude_expense_pk:
+            expenses = expenses.exclude(pk=exclude_expense_pk)
+
+        def total(queryset, field, condition=None):
+            sub = queryset.order_by().values('project')
+            sub = sub.annotate(total=Sum(field, filter=condition)).values('total')
+            return Coalesce(Subquery(sub), Value(0), output_field=DecimalField(max_digits=14, decimal_places=2))
+
+        approved, pending = Q(status='approved'), Q(status='pending')
+        annotations = {
+            'total_spent': total(expenses, 'amount', approved),
+            'total_pending': total(expenses, 'amount', pending),
+        }
+        sources = list(self.budget_sources.all())
+        for source in sources:
+            st = source.source_type
+            annotations[f'{st}_allocated'] = total(activities, f'budget_{st}')
+            annotations[f'{st}_spent'] = total(expenses, 'amount', approved & Q(budget_source=st))
+            annotations[f'{st}_pending'] = total(expenses, 'amount', pending & Q(budget_source=st))
+        row = Project.objects.filter(pk=self.pk).values(**annotations).get()
+
+        result = {
+            'sources': [],
+            'total_spent': row['total_spent'],
+            'total_pending': row['total_pending'],
+            # ยอดที่ไม่ระบุแหล่งเงิน (หรือระบุแหล่งที่โครงการไม่มี)
+            'untagged_spent': row['total_spent'] - sum(row[f'{s.source_type}_spent'] for s in sources),
+            'untagged_pending': row['total_pending'] - sum(row[f'{s.source_type}_pending'] for s in sources),
+        }
+        for source in sources:
+            st = source.source_type
+            result['sources'].append({
+                'source_type': st,
                 'label': source.get_source_type_display(),
                 'erp_code': source.erp_code,
-                'total': source.amount,
-                'allocated': allocated,
-                'remaining': source.amount - allocated,
+                'amount': source.amount,
+                'allocated': row[f'{st}_allocated'],
+                'unallocated': source.amount - row[f'{st}_allocated'],
+                'spent': row[f'{st}_spent'],
+                'pending': row[f'{st}_pending'],
+                'remaining': source.amount - row[f'{st}_spent'],
             })
+        cache[key] = result
         return result
 
-    def spent_by_source(self, source_type, exclude_expense_pk=None):
-        """ยอดใช้จ่าย approved แยกตามแหล่งเงิน (ทุก activity ในโครงการ)"""
-        from apps.budget.models import Expense
-        qs = Expense.objects.filter(
-            activity__project=self,
-            status='approved',
-            budget_source=source_type,
-        )
-        if exclude_expense_pk:
-            qs = qs.exclude(pk=exclude_expense_pk)
-        return qs.aggregate(total=Sum('amount'))['total'] or 0
-
-    def remaining_by_source(self, source_type, exclude_expense_pk=None):
-        """งบคงเหลือแยกตามแหล่งเงิน"""
-        source = self.budget_sources.filter(source_type=source_type).first()
-        if not source:
-            return 0
-        return source.amount - self.spent_by_source(source_type, exclude_expense_pk)
-
     @property
     def total_allocated(self):
         return self.activities.aggregate(
@@ -175,11 +271,16 @@ class Project(models.Model):
 
     @property
     def total_spent(self):
-        from apps.budget.models import Expense
-        return Expense.objects.filter(
-            activity__project=self,
-            status='approved',
-        ).aggregate(total=Sum('amount'))['total'] or 0
+        breakdown = self.__dict__.get('_budget_breakdown', {}).get((None, None))
+        if breakdown is not None:
+            return breakdown['total_spent']
+        if '_total_spent' not in self.__dict__:
+            from apps.budget.models import Expense
+            self._total_spent = Expense.objects.filter(
+                project=self,
+                status='approved',
+            ).aggregate(total=Sum('amount'))['total'] or 0
+        return self._total_spent
 
     @property
     def remaining_budget(self):
@@ -270,10 +371,31 @@ class Activity(models.Model):
         verbose_name_plural = 'กิจกรรม'
         unique_together = ['project', 'activity_number']
         ordering = ['project', 'activity_number']
+        indexes = [
+            models.Index(fields=['project', 'status', 'end_date'], name='activity_proj_status_end_idx'),
+            models.Index(fields=['status', 'start_date'], name='activity_status_start_idx'),
+            # แจ้งเตือนใกล้ครบกำหนด: status IN (...) AND end_date IS NOT NULL
+            models.Index(fields=['status', 'end_date'], name='activity_status_end_idx'),
+        ]
 
     def __str__(self):
         return f'{self.project.project_code}-{self.activity_number}: {self.name}'
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # สถานะตอนโหลด — signal ใช้ตรวจว่าสถานะเปลี่ยนจริงหรือไม่ (None = ไม่ทราบ เช่น defer ไว้)
+        instance._loaded_status = instance.__dict__.get('status')
+        instance._loaded_project_id = instance.__dict__.get('project_id')
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        super().refresh_from_db(using=using, fields=fields, **kwargs)
+        if fields is None or 'status' in fields:
+            self._loaded_status = self.__dict__.get('status')
+        if fields is None or 'project' in fields:
+            self._loaded_project_id = self.__dict__.get('project_id')
+
     def save(self, *args, **kwargs):
         if self.no_budget:
             self.allocated_budget = 0
@@ -288,9 +410,11 @@ class Activity(models.Model):
 
     @property
     def total_spent(self):
-        return self.expenses.filter(
-            status='approved'
-        ).aggregate(total=Sum('amount'))['total'] or 0
+        if '_total_spent' not in self.__dict__:
+            self._total_spent = self.expenses.filter(
+                status='approved'
+            ).aggregate(total=Sum('amount'))['total'] or 0
+        return self._total_spent
 
     @property
     def remaining_budget(self):
@@ -381,3 +505,93 @@ class DocumentTemplate(models.Model):
         import os
         _, ext = os.path.splitext(self.file.name)
         return ext.lower().lstrip('.') if self.file else ''
+
+
+class StatusHistory(models.Model):
+    """ประวัติการเปลี่ยนสถานะ (ฐานร่วมของโครงการ / กิจกรรม)
+
+    duration_seconds = เวลาที่อยู่ในสถานะเดิมก่อนเปลี่ยน, cycle_seconds = เวลานับจากแถวแรก (สร้าง)
+    คำนวณไว้ตอนบันทึก เพื่อให้รายงาน SLA อ่านได้จากตารางนี้ตรง ๆ
+    """
+    SOURCE_CHOICES = [
+        ('create', 'สร้างใหม่'),
+        ('manual', 'เปลี่ยนโดยผู้ใช้'),
+        ('auto', 'ปรับอัตโนมัติ'),
+        ('backfill', 'นำเข้าจาก Audit Log'),
+    ]
+
+    from_status = models.CharField('สถานะเดิม', max_length=20, blank=True)
+    to_status = models.CharField('สถานะใหม่', max_length=20)
+    source = models.CharField('ที่มา', max_length=10, choices=SOURCE_CHOICES, default='manual')
+    changed_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True, blank=True,
+        related_name='+',
+        verbose_name='เปลี่ยนโดย',
+    )
+    changed_at = models.DateTimeField('เปลี่ยนเมื่อ', default=timezone.now)
+    note = models.CharField('หมายเหตุ', max_length=500, blank=True)
+    duration_seconds = models.PositiveIntegerField('เวลาในสถานะเดิม (วินาที)', null=True, blank=True)
+    cycle_seconds = models.PositiveIntegerField('เวลานับจากสร้าง (วินาที)', null=True, blank=True)
+
+    class Meta:
+        abstract = True
+        ordering = ['changed_at', 'id']
+
+    @property
+    def duration_days(self):
+        return self.duration_seconds / 86400 if self.duration_seconds is not None else None
+
+
+class ProjectStatusHistory(StatusHistory):
+    project = models.ForeignKey(
+        Project,
+        on_delete=models.CASCADE,
+        related_name='status_history',
+        verbose_name='โครงการ',
+    )
+
+    class Meta(StatusHistory.Meta):
+        verbose_name = 'ประวัติสถานะโครงการ'
+        verbose_name_plural = 'ประวัติสถานะโครงการ'
+        indexes = [
+            models.Index(fields=['project', 'changed_at'], name='proj_status_hist_idx'),
+            models.Index(fields=['to_status', 'changed_at'], name='proj_status_hist_to_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.project_id}: {self.from_status or "-"} → {self.to_status}'
+
+
+class ActivityStatusHistory(StatusHistory):
+    activity = models.ForeignKey(
+        Activity,
+        on_delete=models.CASCADE,
+        related_name='status_history',
+        verbose_name='กิจกรรม',
+    )
+
+    class Meta(StatusHistory.Meta):
+        verbose_name = 'ประวัติสถานะกิจกรรม'
+        verbose_name_plural = 'ประวัติสถานะกิจกรรม'
+        indexes = [
+            models.Index(fields=['activity', 'changed_at'], name='act_status_hist_idx'),
+            models.Index(fields=['to_status', 'changed_at'], name='act_status_hist_to_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.activity_id}: {self.from_status or "-"} → {self.to_status}'
+
+
+class DataVersion(models.Model):
+    """ตัวนับเวอร์ชันข้อมูลที่ใช้ประกอบ cache key (ดู versions.py) — เก็บในฐานข้อมูลจึงเห็นตรงกันทุก process"""
+    key = models.CharField('คีย์', max_length=50, primary_key=True)
+    version = models.PositiveBigIntegerField('เวอร์ชัน', default=0)
+
+    class Meta:
+        verbose_name = 'เวอร์ชันข้อมูล'
+        verbose_name_plural = 'เวอร์ชันข้อมูล'
+
+    def __str__(self):
+        return f'{self.key}: {self.version}'
@@ -0,0 +1,56 @@
+"""คำนวณค่าสรุป (denormalized) ครั้งเดียวต่อ transaction
+
+ใช้กับค่าที่คำนวณใหม่ทั้งก้อนได้เสมอ (idempotent) เช่น Project.total_budget:
+
+    @recalc.handler('project_total_budget')
+    def recalc_total_budget(project_ids): ...
+
+    recalc.mark_dirty('project_total_budget', project.pk)
+
+mark_dirty เก็บ id ไว้ในชุดของ thread/connection ปัจจุบัน แล้วลงทะเบียน on_commit
+เมื่อ commit จะเรียก handler ครั้งเดียวด้วย id ทั้งหมดที่สะสมไว้ นอก transaction
+(autocommit) handler ทำงานทันทีตามพฤติกรรมของ on_commit
+
+ทุกครั้งที่ mark จะลงทะเบียน callback ใหม่ (callback ที่มาทีหลังเจอชุดว่างและไม่ทำอะไร)
+เพื่อให้ยังทำงานถูกต้องเมื่อ savepoint ที่ลงทะเบียน callback ก่อนหน้าถูก rollback
+"""
+import threading
+from functools import partial
+
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+_handlers = {}
+_local = threading.local()
+
+
+def handler(name):
+    """ลงทะเบียนฟังก์ชันคำนวณของชุด name — รับ set ของ id"""
+    def decorator(func):
+        _handlers[name] = func
+        return func
+    return decorator
+
+
+def _pending(using):
+    if not hasattr(_local, 'pending'):
+        _local.pending = {}
+    return _local.pending.setdefault(using, {})
+
+
+def mark_dirty(name, *ids, using=DEFAULT_DB_ALIAS):
+    """เพิ่ม id ลงชุด name แล้วคำนวณเมื่อ transaction ปัจจุบัน commit"""
+    if name not in _handlers:
+        raise KeyError(f'ไม่มี handler สำหรับ "{name}"')
+    ids = {i for i in ids if i is not None}
+    if not ids:
+        return
+    _pending(using).setdefault(name, set()).update(ids)
+    transaction.on_commit(partial(flush, using=using), using=using)
+
+
+def flush(using=DEFAULT_DB_ALIAS):
+    """เรียก handler ของทุกชุดที่ค้างอยู่ (ปกติถูกเรียกจาก on_commit)"""
+    pending = _pending(using)
+    while pending:
+        name, ids = pending.popitem()
+        _handlers[name](ids)
@@ -0,0 +1,184 @@
+"""ยกยอดโครงการไปปีงบประมาณใหม่ — คัดลอกโครงการ หมวดเงิน กิจกรรม และผู้รับผิดชอบ/ผู้รับแจ้งเตือน
+
+คัดลอกเป็นชุด (CHUNK_SIZE โครงการต่อ transaction) ด้วย bulk_create ทั้งตัว object และแถวของตาราง
+M2M (through) แทน .add() ทีละรายการ — แต่ละชุด commit แยกกันเพื่อให้รายงานความคืบหน้าได้
+และรันซ้ำได้ (โครงการที่มีรหัสใหม่อยู่แล้วจะถูกข้าม)
+
+รหัสใหม่: แทนปีงบเดิมในรหัสด้วยปีใหม่ (เช่น 'LIB-2568-01' → 'LIB-2569-01')
+ถ้ารหัสไม่มีปีอยู่ ต่อท้ายด้วย '/<ปีใหม่>' ('3.1' → '3.1/2569' ยังเรียงตามเลขเดิม)
+"""
+from datetime import date
+
+from django.db import transaction
+from django.urls import reverse
+
+from apps.jobs import runner
+
+from .importer import finish_bulk_insert
+from .models import Activity, FiscalYear, Project, ProjectBudgetSource, make_code_sort_key
+
+CHUNK_SIZE = 50
+
+M2M_FIELDS = ('responsible_persons', 'notify_persons')
+
+
+def remap_code(code, source_year, target_year):
+    source_year, target_year = str(source_year), str(target_year)
+    if source_year in code:
+        return code.replace(source_year, target_year)
+    return f'{code}/{target_year}'
+
+
+def shift_date(value, years):
+    """เลื่อนวันที่ตามจำนวนปี (29 ก.พ. → 28 ก.พ. ในปีที่ไม่ใช่ปีอธิกสุรทิน)"""
+    try:
+        return value.replace(year=value.year + years)
+    except ValueError:
+        return date(value.year + years, value.month, 28)
+
+
+def _m2m_ids(model, owner_field, owner_ids):
+    """{(field, owner_id): [user_id, ...]} ของทุกฟิลด์ M2M จาก through table โดยตรง"""
+    result = {}
+    for field_name in M2M_FIELDS:
+        through = getattr(model, field_name).through
+        for owner_id, user_id in through.objects.filter(
+            **{f'{owner_field}__in': owner_ids},
+        ).values_list(owner_field, 'user_id'):
+            result.setdefault((field_name, owner_id), []).append(user_id)
+    return result
+
+
+def _bulk_m2m(model, owner_field, links, id_map):
+    """สร้างแถว through ของ object ใหม่ — links จาก _m2m_ids, id_map: id เดิม → id ใหม่"""
+    for field_name in M2M_FIELDS:
+        through = getattr(model, field_name).through
+        through.objects.bulk_create([
+            through(**{owner_field: id_map[owner_id], 'user_id': user_id})
+            for (name, owner_id), user_ids in links.items() if name == field_name and owner_id in id_map
+            for user_id in user_ids
+        ], batch_size=1000)
+
+
+def _copy_chunk(projects, target, user, include_activities):
+    """คัดลอกโครงการ 1 ชุด (เรียกภายใน transaction) — คืน (จำนวนโครงการ, จำนวนกิจกรรม, รหัสที่ข้าม)"""
+    new_codes = {p.pk: remap_code(p.project_code, p.fiscal_year.year, target.year) for p in projects}
+    taken = set(Project.objects.filter(project_code__in=new_codes.values()).values_list('project_code', flat=True))
+    skipped = [p.project_code for p in projects if new_codes[p.pk] in taken]
+    projects = [p for p in projects if new_codes[p.pk] not in taken]
+    if not projects:
+        return 0, 0, skipped
+
+    source_ids = [p.pk for p in projects]
+    activities = list(Activity.objects.filter(project_id__in=source_ids).exclude(status='cancelled')) \
+        if include_activities else []
+    activity_count = {}
+    for activity in activities:
+        activity_count[activity.project_id] = activity_count.get(activity.project_id, 0) + 1
+
+    Project.objects.bulk_create([
+        Project(
+            fiscal_year=target,
+            department_id=p.department_id,
+            project_code=new_codes[p.pk],
+            code_sort_key=make_code_sort_key(new_codes[p.pk]),
+            name=p.name,
+            description=p.description,
+            total_budget=0,
+            start_date=shift_date(p.start_date, target.year - p.fiscal_year.year),
+            end_date=shift_date(p.end_date, target.year - p.fiscal_year.year),
+            created_by=user,
+            activity_pending_count=activity_count.get(p.pk, 0),
+        )
+        for p in projects
+    ])
+    # bulk_create บน MySQL ไม่คืน pk — อ่านกลับด้วยรหัสโครงการ (unique)
+    by_code = dict(Project.objects.filter(project_code__in=[new_codes[i] for i in source_ids])
+                   .values_list('project_code', 'pk'))
+    project_map = {old_id: by_code[new_codes[old_id]] for old_id in source_ids}
+    years = {p.pk: target.year - p.fiscal_year.year for p in projects}
+
+    ProjectBudgetSource.objects.bulk_create([
+        ProjectBudgetSource(
+            project_id=project_map[s.project_id], source_type=s.source_type,
+            erp_code=s.erp_code, amount=s.amount,
+        )
+        for s in ProjectBudgetSource.objects.filter(project_id__in=source_ids)
+    ], batch_size=1000)
+    _bulk_m2m(Project, 'project_id', _m2m_ids(Project, 'project_id', source_ids), project_map)
+
+    activity_map = {}
+    if activities:
+        Activity.objects.bulk_create([
+            Activity(
+                project_id=project_map[a.project_id],
+                activity_number=a.activity_number,
+                name=a.name,
+                description=a.description,
+                allocated_budget=a.allocated_budget,
+                budget_government=a.budget_government,
+                budget_accumulated=a.budget_accumulated,
+                budget_revenue=a.budget_revenue,
+                no_budget=a.no_budget,
+                start_date=shift_date(a.start_date, years[a.project_id]),
+                end_date=shift_date(a.end_date, years[a.project_id]),
+            )
+            for a in activities
+        ], batch_size=1000)
+        new_activities = {
+            (project_id, number): pk
+            for pk, project_id, number in Activity.objects.filter(
+                project_id__in=project_map.values(),
+            ).values_list('pk', 'project_id', 'activity_number')
+        }
+        activity_map = {
+            a.pk: new_activities[(project_map[a.project_id], a.activity_number)] for a in activities
+        }
+        _bulk_m2m(Activity, 'activity_id', _m2m_ids(Activity, 'activity_id', list(activity_map)), activity_map)
+
+    finish_bulk_insert(project_map.values(), activity_map.values(), user)
+    return len(project_map), len(activity_map), skipped
+
+
+def copy_projects(project_ids, target, user, include_activities=True, report=None):
+    """คัดลอกโครงการตาม project_ids ไปปีงบ target — คืน dict สรุปผล"""
+    project_ids = list(project_ids)
+    total = len(project_ids)
+    created = activity_total = 0
+    skipped = []
+    if report:
+        report(0, total, 'เริ่มคัดลอก')
+    for start in range(0, total, CHUNK_SIZE):
+        chunk = list(
+            Project.objects.filter(pk__in=project_ids[start:start + CHUNK_SIZE])
+            .exclude(fiscal_year=target).select_related('fiscal_year').order_by('code_sort_key')
+        )
+        with transaction.atomic():
+            n_projects, n_activities, chunk_skipped = _copy_chunk(chunk, target, user, include_activities)
+        created += n_projects
+        activity_total += n_activities
+        skipped += chunk_skipped
+        done = min(start + CHUNK_SIZE, total)
+        if report:
+            report(done, total, f'คัดลอกแล้ว {done:,}/{total:,} โครงการ')
+    return {
+        'target_fiscal_year': target.year,
+        'projects': created,
+        'activities': activity_total,
+        'skipped': skipped,
+        'summary': (
+            f'ยกยอดไปปีงบประมาณ {target.year}: {created:,} โครงการ, {activity_total:,} กิจกรรม'
+            + (f' (ข้าม {len(skipped):,} โครงการที่มีรหัสใหม่อยู่แล้ว)' if skipped else '')
+        ),
+    }
+
+
+@runner.handler('fiscal_year_rollover')
+def run_rollover(job, report):
+    target = FiscalYear.objects.get(pk=job.params['target_fiscal_year'])
+    result = copy_projects(
+        job.params['project_ids'], target, job.created_by,
+        include_activities=job.params.get('include_activities', True), report=report,
+    )
+    result['url'] = f"{reverse('projects:project_list')}?fiscal_year={target.pk}"
+    return result
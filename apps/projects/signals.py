@@ -1,46 +1,78 @@
-from django.db.models import Sum
+from decimal import Decimal
+
+from django.db.models import DecimalField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
 from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
+from . import recalc
+
+
+@recalc.handler('project_total_budget')
+def recalc_project_total_budget(project_ids):
+    """Set total_budget = sum of budget sources for each project, in one UPDATE."""
+    from .models import Project, ProjectBudgetSource
+    source_total = (
+        ProjectBudgetSource.objects.filter(project=OuterRef('pk'))
+        .values('project').annotate(total=Sum('amount')).values('total')
+    )
+    Project.objects.filter(pk__in=project_ids).update(
+        total_budget=Coalesce(
+            Subquery(source_total), Value(Decimal('0')),
+            output_field=DecimalField(max_digits=12, decimal_places=2),
+        ),
+    )
+
 
 @receiver([post_save, post_delete], sender='projects.ProjectBudgetSource')
 def update_project_total_budget(sender, instance, **kwargs):
-    """Recalculate project.total_budget whenever a budget source is saved or deleted."""
-    from .models import Project
-    total = instance.project.budget_sources.aggregate(total=Sum('amount'))['total'] or 0
-    Project.objects.filter(pk=instance.project_id).update(total_budget=total)
+    """Recalculate project.total_budget once per transaction after budget sources change."""
+    recalc.mark_dirty('project_total_budget', instance.project_id)
 
 
 @receiver(post_save, sender='projects.Activity')
-def sync_project_status_from_activity(sender, instance, **kwargs):
-    """Auto-update project status whenever an activity status changes.
-
-    Rules (skip if project is draft/cancelled — manual-only):
-      all completed               → project = completed
-      any in_progress             → project = active
-      some completed + rest pending → project = active (work underway)
-      all pending                 → project = not_started
+def sync_project_status_from_activity(sender, instance, created, update_fields=None, **kwargs):
+    """Keep the project's activity status counters (and derived project status) in sync.
+
+    Only runs when the activity status actually changed — compared with the value
+    loaded from the database (Activity._loaded_status). Saves that do not touch
+    status (edits, budget transfers) cost no extra queries.
+    Derivation rules live in counters.derive_project_status; draft/cancelled
+    projects are never changed automatically.
     """
-    from .models import Project
-    project = instance.project
+    from .counters import apply_activity_status_change, recount_activity_status
 
-    # Never auto-override these — require explicit human decision
-    if project.status in ('draft', 'cancelled'):
+    if created:
+        apply_activity_status_change(instance.project_id, None, instance.status)
+    elif update_fields is not None and 'status' not in update_fields:
         return
+    else:
+        old_status = getattr(instance, '_loaded_status', None)
+        if old_status == instance.status:
+            return
+        if old_status is None:
+            # ไม่ทราบสถานะเดิม (status ถูก defer / object ไม่ได้โหลดจาก DB) — นับใหม่ทั้งโครงการ
+            recount_activity_status([instance.project_id])
+        else:
+            apply_activity_status_change(instance.project_id, old_status, instance.status)
+    instance._loaded_status = instance.status
 
-    activities = project.activities.exclude(status='cancelled')
-    if not activities.exists():
-        return
 
-    statuses = list(activities.values_list('status', flat=True))
+@receiver(post_delete, sender='projects.Activity')
+def sync_project_status_on_activity_delete(sender, instance, origin=None, **kwargs):
+    """Decrement the counter of a deleted activity (skipped when the whole project is being deleted)."""
+    from .counters import apply_activity_status_change
+    from .models import Project
+
+    if isinstance(origin, Project) or getattr(origin, 'model', None) is Project:
+        return
+    status = getattr(instance, '_loaded_status', None) or instance.status
+    apply_activity_status_change(instance.project_id, status, None)
 
-    if all(s == 'completed' for s in statuses):
-        new_status = 'completed'
-    elif any(s in ('in_progress', 'completed') for s in statuses):
-        new_status = 'active'
-    else:
-        # all pending
-        new_status = 'not_started'
 
-    if project.status != new_status:
-        Project.objects.filter(pk=project.pk).update(status=new_status)
+@receiver([post_save, post_delete], sender='projects.Project')
+@receiver([post_save, post_delete], sender='projects.Activity')
+def invalidate_timeline_cache(sender, **kwargs):
+    """เปลี่ยนเวอร์ชันข้อมูลปฏิทินเมื่อ commit — cache ของทุกปีงบ/ขอบเขตในทุก process หมดอายุ"""
+    from .timeline import bump_data_version
+    bump_data_version()
@@ -0,0 +1,211 @@
+"""คำนวณข้อมูลปฏิทินโครงการ (Gantt) ของปีงบประมาณ
+
+โหลดโครงการ + กิจกรรมด้วย 2 query แล้วแปลงช่วงวันที่ของแต่ละแถวเป็น bitmask
+12 บิต (บิต 0 = ต.ค. … บิต 11 = ก.ย.) ด้วยเลขคณิตของดัชนีเดือน แทนการเทียบ
+ทีละเดือน ผลลัพธ์เก็บใน cache ตาม (ปีงบ, ขอบเขตสิทธิ์, เวอร์ชันข้อมูล, วันนี้)
+เวอร์ชันข้อมูล (ตาราง DataVersion ดู versions.py) ถูกเพิ่มเมื่อ commit การบันทึก/ลบโครงการหรือกิจกรรม (ดู signals)
+
+หน้าปฏิทินดึงแถวจาก JSON endpoint (compact_rows) แล้ววาดเฉพาะแถวที่มองเห็น
+"""
+import calendar as cal
+import hashlib
+import json
+from datetime import date
+
+from django.core.cache import cache
+from django.db.models import Prefetch
+
+from . import versions
+from .models import Activity, Project
+
+THAI_MONTHS = {
+    1: 'ม.ค.', 2: 'ก.พ.', 3: 'มี.ค.', 4: 'เม.ย.',
+    5: 'พ.ค.', 6: 'มิ.ย.', 7: 'ก.ค.', 8: 'ส.ค.',
+    9: 'ก.ย.', 10: 'ต.ค.', 11: 'พ.ย.', 12: 'ธ.ค.'
+}
+
+FULL_MASK = (1 << 12) - 1
+CACHE_TIMEOUT = 60 * 10
+VERSION_KEY = 'timeline'
+
+# (เดือนปัจจุบัน, เดือนอื่น) → (bg, fg)
+CELL_STYLES = {
+    'draft':       (('bg-slate-500', 'text-white'),   ('bg-slate-200', 'text-slate-700')),
+    'not_started': (('bg-amber-400', 'text-white'),   ('bg-amber-100', 'text-amber-800')),
+    'pending':     (('bg-amber-400', 'text-white'),   ('bg-amber-100', 'text-amber-800')),
+    'in_progress': (('bg-blue-600',  'text-white'),   ('bg-blue-200',  'text-blue-800')),
+    'active':      (('bg-blue-600',  'text-white'),   ('bg-blue-200',  'text-blue-800')),
+    'completed':   (('bg-emerald-500', 'text-white'), ('bg-emerald-200', 'text-emerald-800')),
+    'cancelled':   (('bg-slate-300', 'text-slate-500'), ('bg-slate-100', 'text-slate-400')),
+}
+OVERDUE_STYLE = (('bg-red-500', 'text-white'), ('bg-red-200', 'text-red-800'))
+DEFAULT_STYLE = (('bg-gray-400', 'text-white'), ('bg-gray-200', 'text-gray-700'))
+
+# รหัสสถานะแบบตัวเลขสำหรับ JSON (ลำดับต้องคงที่ — client ใช้ index นี้)
+STATUS_CODES = list(CELL_STYLES)
+STATUS_INDEX = {status: i for i, status in enumerate(STATUS_CODES)}
+STATUS_LABELS = {
+    **dict(Project.STATUS_CHOICES),
+    **dict(Activity.STATUS_CHOICES),
+}
+
+# คอลัมน์ของแต่ละแถวใน JSON (kind: 0 = โครงการ, 1 = กิจกรรม; label = รหัสโครงการ / ลำดับกิจกรรม)
+ROW_COLUMNS = ['kind', 'id', 'project_id', 'label', 'name', 'status', 'start', 'end', 'overdue', 'mask']
+
+
+def data_version():
+    return versions.get(VERSION_KEY)
+
+
+def bump_data_version():
+    versions.bump_on_commit(VERSION_KEY)
+
+
+def fiscal_start(fiscal_year):
+    """วันที่ 1 ต.ค. ของปีงบประมาณ (ปี พ.ศ. → ค.ศ.)"""
+    return date(fiscal_year.year - 543 - 1, 10, 1)
+
+
+def fiscal_months(fiscal_year, today):
+    start = fiscal_start(fiscal_year)
+    months = []
+    for i in range(12):
+        m = (9 + i) % 12 + 1
+        y = start.year if m >= 10 else start.year + 1
+        months.append({
+            'label': THAI_MONTHS[m],
+            'month': m,
+            'year': y,
+            'start': date(y, m, 1),
+            'end': date(y, m, cal.monthrange(y, m)[1]),
+            'is_current': (today.year == y and today.month == m),
+        })
+    return months
+
+
+def month_mask(start, end, fy_start):
+    """bitmask ของเดือนในปีงบที่ช่วง [start, end] คาบเกี่ยว"""
+    if not start or not end or end < start:
+        return 0
+    base = fy_start.year * 12 + fy_start.month
+    lo = start.year * 12 + start.month - base
+    hi = end.year * 12 + end.month - base
+    if hi < 0 or lo > 11:
+        return 0
+    lo, hi = max(lo, 0), min(hi, 11)
+    return (FULL_MASK >> (11 - (hi - lo))) << lo
+
+
+def _is_overdue(end_date, status, today):
+    return bool(end_date and end_date < today and status not in ('completed', 'cancelled'))
+
+
+def build_rows(projects_qs, fiscal_year, today):
+    """แถวของปฏิทิน (dict ล้วน — เก็บลง cache และแปลงเป็น JSON ได้)"""
+    fy_start = fiscal_start(fiscal_year)
+    projects = projects_qs.filter(fiscal_year=fiscal_year).only(
+        'pk', 'project_code', 'code_sort_key', 'name', 'status', 'start_date', 'end_date',
+    ).prefetch_related(
+        Prefetch(
+            'activities',
+            queryset=Activity.objects.only(
+                'pk', 'project_id', 'activity_number', 'name', 'status', 'start_date', 'end_date',
+            ).order_by('activity_number'),
+        ),
+    ).order_by('code_sort_key')
+
+    rows = []
+    for project in projects:
+        rows.append({
+            'type': 'project',
+            'id': project.pk,
+            'project_id': project.pk,
+            'code': project.project_code,
+            'number': None,
+            'name': project.name,
+            'status': project.status,
+            'status_display': project.get_status_display(),
+            'start': project.start_date,
+            'end': project.end_date,
+            'overdue': _is_overdue(project.end_date, project.status, today),
+            'mask': month_mask(project.start_date, project.end_date, fy_start),
+        })
+        for activity in project.activities.all():
+            rows.append({
+                'type': 'activity',
+                'id': activity.pk,
+                'project_id': project.pk,
+                'code': project.project_code,
+                'number': activity.activity_number,
+                'name': activity.name,
+                'status': activity.status,
+                'status_display': activity.get_status_display(),
+                'start': activity.start_date,
+                'end': activity.end_date,
+                'overdue': _is_overdue(activity.end_date, activity.status, today),
+                'mask': month_mask(activity.start_date, activity.end_date, fy_start),
+            })
+    return rows
+
+
+def rows_cache_key(fiscal_year, scope, today):
+    return f'timeline:rows:{fiscal_year.pk}:{scope}:{data_version()}:{today.isoformat()}'
+
+
+def get_timeline_rows(projects_qs, fiscal_year, scope, today):
+    """แถวของปฏิทินจาก cache — scope คือคีย์ขอบเขตสิทธิ์ของ projects_qs"""
+    key = rows_cache_key(fiscal_year, scope, today)
+    rows = cache.get(key)
+    if rows is None:
+        rows = build_rows(projects_qs, fiscal_year, today)
+        cache.set(key, rows, CACHE_TIMEOUT)
+    return rows
+
+
+def get_timeline_payload(projects_qs, fiscal_year, scope, today):
+    """(JSON bytes, ETag) ของ JSON endpoint จาก cache
+
+    ETag คือ md5 ของ payload เอง — ไม่ขึ้นกับเวอร์ชันหรือคีย์ cache จึงไม่มีทางได้ 304 กับข้อมูลที่เปลี่ยนไปแล้ว
+    """
+    key = f'{rows_cache_key(fiscal_year, scope, today)}:json'
+    payload = cache.get(key)
+    if payload is None:
+        rows = get_timeline_rows(projects_qs, fiscal_year, scope, today)
+        body = json.dumps({
+            'fiscal_year': fiscal_year.pk,
+            'columns': ROW_COLUMNS,
+            'rows': compact_rows(rows),
+        }, ensure_ascii=False, separators=(',', ':')).encode()
+        payload = (body, hashlib.md5(body).hexdigest())
+        cache.set(key, payload, CACHE_TIMEOUT)
+    return payload
+
+
+def compact_rows(rows):
+    """แปลงแถวเป็น array ตาม ROW_COLUMNS สำหรับ JSON endpoint"""
+    return [
+        [
+            0 if row['type'] == 'project' else 1,
+            row['id'],
+            row['project_id'],
+            row['code'] if row['type'] == 'project' else row['number'],
+            row['name'],
+            STATUS_INDEX.get(row['status'], -1),
+            row['start'].isoformat() if row['start'] else None,
+            row['end'].isoformat() if row['end'] else None,
+            1 if row['overdue'] else 0,
+            row['mask'],
+        ]
+        for row in rows
+    ]
+
+
+def client_styles():
+    """ตารางสีของแต่ละรหัสสถานะ (ส่งให้ client ครั้งเดียวผ่าน json_script)"""
+    return {
+        'statuses': STATUS_CODES,
+        'labels': [STATUS_LABELS.get(status, status) for status in STATUS_CODES],
+        'bg': [[CELL_STYLES[status][0][0], CELL_STYLES[status][1][0]] for status in STATUS_CODES],
+        'overdue_bg': [OVERDUE_STYLE[0][0], OVERDUE_STYLE[1][0]],
+        'default_bg': [DEFAULT_STYLE[0][0], DEFAULT_STYLE[1][0]],
+    }
@@ -7,7 +7,12 @@ app_name = 'projects'
 urlpatterns = [
     path('', views.project_list, name='project_list'),
     path('timeline/', views.project_timeline, name='project_timeline'),
+    path('timeline/data/', views.project_timeline_data, name='project_timeline_data'),
+    path('timeline/export/', views.project_timeline_export, name='project_timeline_export'),
     path('create/', views.project_create, name='project_create'),
+    path('import/', views.plan_import, name='plan_import'),
+    path('import/template/', views.plan_import_template, name='plan_import_template'),
+    path('rollover/', views.fiscal_year_rollover, name='fiscal_year_rollover'),
     path('<int:pk>/', views.project_detail, name='project_detail'),
     path('<int:pk>/edit/', views.project_edit, name='project_edit'),
     path('<int:pk>/status/', views.project_status_change, name='project_status_change'),
@@ -1,4 +1,6 @@
-from django.db.models import Q
+from decimal import Decimal
+
+from django.db.models import Prefetch, Q, Sum, prefetch_related_objects
 
 from .models import Project
 
@@ -17,6 +19,18 @@ def get_viewable_projects(user):
     return Project.objects.none()
 
 
+def get_viewable_scope(user):
+    """คีย์ขอบเขตของ get_viewable_projects — ผู้ใช้ที่คีย์เดียวกันเห็นชุดโครงการเดียวกัน (ใช้เป็น cache key)"""
+    if not hasattr(user, 'profile'):
+        return 'none'
+    role = user.profile.role
+    if role in ('admin', 'executive'):
+        return 'all'
+    if role in ('planner', 'head', 'staff'):
+        return f'dept:{user.profile.department_id}'
+    return 'none'
+
+
 def get_actionable_projects(user):
     """Projects the user can MODIFY. Staff limited to projects they are responsible/notify for."""
     if not hasattr(user, 'profile'):
@@ -35,3 +49,52 @@ def get_actionable_projects(user):
 def get_projects_for_user(user):
     """Alias kept for backward compatibility — returns actionable projects."""
     return get_actionable_projects(user)
+
+
+def attach_spend_summary(projects):
+    """โหลดกิจกรรม/แหล่งเงิน/ผู้รับผิดชอบ และยอดใช้จ่ายของโครงการในหน้าเดียวกันแบบ batch
+
+    ยอด approved ของทุกกิจกรรมมาจาก query GROUP BY เดียว แล้วตั้งค่าเป็น attribute
+    spent_amount / remaining_amount / usage_percent บนทั้ง project และ activity
+    แทนการเรียก property total_spent (query ละแถว) ใน template
+    """
+    from apps.budget.models import Expense
+    from .models import Activity
+
+    projects = list(projects)
+    if not projects:
+        return projects
+
+    prefetch_related_objects(
+        projects,
+        'budget_sources',
+        'responsible_persons',
+        Prefetch(
+            'activities',
+            queryset=Activity.objects.order_by('activity_number').prefetch_related('responsible_persons'),
+        ),
+    )
+
+    spent = dict(
+        Expense.objects.filter(
+            project__in=[p.pk for p in projects],
+            status='approved',
+        ).values('activity_id').annotate(total=Sum('amount')).values_list('activity_id', 'total')
+    )
+
+    for project in projects:
+        project_spent = Decimal('0')
+        for activity in project.activities.all():
+            activity.spent_amount = spent.get(activity.pk) or Decimal('0')
+            activity.remaining_amount = activity.allocated_budget - activity.spent_amount
+            activity.usage_percent = (
+                float(activity.spent_amount / activity.allocated_budget * 100)
+                if activity.allocated_budget > 0 else 0
+            )
+            project_spent += activity.spent_amount
+        project.spent_amount = project_spent
+        project.remaining_amount = project.total_budget - project_spent
+        project.usage_percent = (
+            float(project_spent / project.total_budget * 100) if project.total_budget > 0 else 0
+        )
+    return projects
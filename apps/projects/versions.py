@@ -0,0 +1,36 @@
+"""เวอร์ชันข้อมูลสำหรับประกอบ cache key (timeline, spend rollup, ...)
+
+cache เริ่มต้น (LocMemCache) แยกตาม process และว่างเมื่อ process เริ่มใหม่ ตัวนับที่เก็บใน cache
+จึงไม่ตรงกันระหว่างเว็บ, Celery worker, job แบบ thread และ management command — ตัวนับจึงเก็บในตาราง
+DataVersion แทน ส่วน cache ใช้เก็บเฉพาะผลลัพธ์ที่มีเวอร์ชันอยู่ในคีย์
+
+    key = f'timeline:rows:{fy.pk}:{versions.get("timeline")}'
+    versions.bump_on_commit('timeline')   # หลังเขียนข้อมูล
+"""
+from django.db.models import F
+
+from . import recalc
+from .models import DataVersion
+
+
+def get(key):
+    """เวอร์ชันปัจจุบันของ key (0 ถ้ายังไม่เคยเปลี่ยน)"""
+    return DataVersion.objects.filter(key=key).values_list('version', flat=True).first() or 0
+
+
+def bump(key):
+    if not DataVersion.objects.filter(key=key).update(version=F('version') + 1):
+        DataVersion.objects.bulk_create([DataVersion(key=key, version=1)], ignore_conflicts=True)
+
+
+@recalc.handler('data_version')
+def _bump_keys(keys):
+    for key in sorted(keys):
+        bump(key)
+
+
+def bump_on_commit(key):
+    """เพิ่มเวอร์ชันครั้งเดียวเมื่อ transaction ปัจจุบัน commit — ไม่ล็อกแถวตัวนับไว้ตลอด transaction
+    และ process อื่นจะไม่ cache ข้อมูลเก่าด้วยเวอร์ชันใหม่ก่อนที่ข้อมูลจะ commit
+    """
+    recalc.mark_dirty('data_version', key)
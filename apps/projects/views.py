@@ -1,23 +1,50 @@
-import calendar as cal
-from datetime import date
+import io
+import uuid
 
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.core.exceptions import PermissionDenied
+from django.core.files.storage import default_storage
 from django.db import models, transaction
-from django.db.models import FloatField, Q
-from django.db.models.functions import Cast
+from django.http import Http404, HttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.urls import reverse
 from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
 
 from apps.accounts.audit import get_client_ip, log_action
 from apps.accounts.decorators import role_required
+from apps.accounts.pagination import approximate_count, keyset_paginate
+from apps.jobs import runner
+from apps.reports import streaming
 from apps.budget.forms import BudgetTransferForm
 from apps.budget.models import BudgetTransfer, Expense
-
-from .forms import ActivityForm, ActivityReportForm, ProjectBudgetSourceFormSet, ProjectForm
+from apps.search.models import SearchDocument
+from apps.search.query import filter_objects
+
+from . import importer, rollover, timeline
+from .forms import (
+    ActivityForm,
+    ActivityReportForm,
+    PlanImportForm,
+    ProjectBudgetSourceFormSet,
+    ProjectForm,
+    RolloverForm,
+)
+from .history import record_activity_status, record_project_status
 from .models import Activity, ActivityReport, DocumentTemplate, FiscalYear, Project, ProjectDeleteRequest
-from .utils import get_actionable_projects, get_projects_for_user, get_viewable_projects
+from .utils import (
+    attach_spend_summary,
+    get_actionable_projects,
+    get_projects_for_user,
+    get_viewable_projects,
+    get_viewable_scope,
+)
+
+
+PROJECT_LIST_ORDERING = ('code_sort_key', 'id')
 
 
 @login_required
@@ -34,18 +61,36 @@ def project_list(request):
     if status:
         projects = projects.filter(status=status)
     if search:
-        projects = projects.filter(
-            Q(name__icontains=search) | Q(project_code__icontains=search)
-        )
+        projects = filter_objects(projects, SearchDocument.KIND_PROJECT, search, ('project_code', 'name'))
+
+    page_size_choices = settings.PROJECT_LIST_PAGE_SIZES
+    try:
+        per_page = int(request.GET.get('per_page', ''))
+    except ValueError:
+        per_page = 0
+    if per_page not in page_size_choices:
+        per_page = page_size_choices[0]
+
+    page_obj = keyset_paginate(
+        projects.select_related('fiscal_year', 'department'),
+        PROJECT_LIST_ORDERING, request.GET.get('cursor', ''), per_page,
+    )
+    attach_spend_summary(page_obj.object_list)
+    total_count, total_is_exact = approximate_count(projects)
 
-    projects = projects.prefetch_related('budget_sources').annotate(
-        code_num=Cast('project_code', FloatField())
-    ).order_by('code_num', 'project_code')
+    querystring = request.GET.copy()
+    querystring.pop('cursor', None)
 
     fiscal_years = FiscalYear.objects.all()
 
     context = {
-        'projects': projects,
+        'projects': page_obj.object_list,
+        'page_obj': page_obj,
+        'total_count': total_count,
+        'total_is_exact': total_is_exact,
+        'filter_querystring': querystring.urlencode(),
+        'per_page': per_page,
+        'page_size_choices': page_size_choices,
         'fiscal_years': fiscal_years,
         'status_choices': Project.STATUS_CHOICES,
         'current_fiscal_year': fiscal_year,
@@ -64,33 +109,20 @@ def project_detail(request, pk):
 
     activities = project.activities.prefetch_related('responsible_persons', 'notify_persons').all()
     recent_expenses = Expense.objects.filter(
-        activity__project=project
+        project=project
     ).select_related('activity', 'created_by').order_by('-created_at')[:10]
 
     activities = list(activities)
 
-    # สรุปแหล่งเงิน: จัดสรร / ใช้ไป / เหลือ
-    source_summary = []
-    total_tagged = 0
-    for source in project.budget_sources.all():
-        spent = project.spent_by_source(source.source_type)
-        total_tagged += spent
-        source_summary.append({
-            'label': source.get_source_type_display(),
-            'source_type': source.source_type,
-            'amount': source.amount,
-            'spent': spent,
-            'remaining': source.amount - spent,
-        })
-    # ยอดที่ยังไม่ระบุแหล่งเงิน
-    untagged_spent = project.total_spent - total_tagged
+    # สรุปแหล่งเงิน: จัดสรร / ใช้ไป / เหลือ (query เดียว — total_spent ด้านล่างใช้ผลเดียวกัน)
+    budget = project.budget_breakdown()
 
     context = {
         'project': project,
         'activities': activities,
         'recent_expenses': recent_expenses,
-        'untagged_spent': untagged_spent,
-        'source_summary': source_summary,
+        'untagged_spent': budget['untagged_spent'],
+        'source_summary': budget['sources'],
         'can_action': can_action,
     }
     return render(request, 'projects/project_detail.html', context)
@@ -104,15 +136,18 @@ def project_create(request):
         form = ProjectForm(request.POST, request.FILES, user=request.user)
         budget_formset = ProjectBudgetSourceFormSet(request.POST)
         if form.is_valid() and budget_formset.is_valid():
-            project = form.save(commit=False)
-            project.created_by = request.user
-            project.total_budget = 0  # will be updated by signal after budget sources saved
-            if 'department' not in form.fields and profile and profile.department:
-                project.department = profile.department
-            project.save()
-            form.save_m2m()
-            budget_formset.instance = project
-            budget_formset.save()
+            # total_budget ถูกคำนวณครั้งเดียวตอน commit (signals.update_project_total_budget)
+            with transaction.atomic():
+                project = form.save(commit=False)
+                project.created_by = request.user
+                project.total_budget = 0
+                if 'department' not in form.fields and profile and profile.department:
+                    project.department = profile.department
+                project.save()
+                form.save_m2m()
+                budget_formset.instance = project
+                budget_formset.save()
+                record_project_status(project, '', project.status, request.user, source='create')
             log_action(
                 actor=request.user, action='PROJECT_CREATE',
                 target_repr=f'{project.project_code} - {project.name}',
@@ -134,6 +169,160 @@ def project_create(request):
     })
 
 
+PLAN_IMPORT_SESSION_KEY = 'plan_import'
+
+
+def _discard_plan_upload(request):
+    """ลบไฟล์แผนที่พักไว้รอยืนยัน (ถ้ามี)"""
+    pending = request.session.pop(PLAN_IMPORT_SESSION_KEY, None)
+    for name in (pending or {}).get('files', []):
+        if default_storage.exists(name):
+            default_storage.delete(name)
+
+
+@role_required(['planner', 'head', 'admin'])
+def plan_import(request):
+    """นำเข้าแผนโครงการ: อัปโหลด → ตรวจ/แสดงตัวอย่าง → ยืนยันบันทึก"""
+    action = request.POST.get('action')
+    pending = request.session.get(PLAN_IMPORT_SESSION_KEY)
+    plan = None
+    form = PlanImportForm()
+
+    if request.method == 'POST' and action == 'cancel':
+        _discard_plan_upload(request)
+        return redirect('projects:plan_import')
+
+    if request.method == 'POST' and action == 'confirm':
+        if not pending:
+            messages.error(request, 'ไม่พบไฟล์ที่รอนำเข้า กรุณาอัปโหลดใหม่')
+            return redirect('projects:plan_import')
+        fiscal_year = get_object_or_404(FiscalYear, pk=pending['fiscal_year'])
+        files = [default_storage.open(name) for name in pending['files']]
+        try:
+            # ตรวจซ้ำก่อนบันทึก — ข้อมูลในระบบอาจเปลี่ยนไประหว่างที่แสดงตัวอย่าง
+            plan = importer.parse_plan(fiscal_year, request.user, *files)
+        finally:
+            for f in files:
+                f.close()
+        if plan.is_valid:
+            project_count, activity_count = importer.commit_plan(plan, request.user)
+            _discard_plan_upload(request)
+            log_action(
+                actor=request.user, action='PROJECT_IMPORT',
+                target_repr=f'ปีงบประมาณ {fiscal_year.year} - {pending["filename"]}',
+                detail=(
+                    f'{project_count} โครงการ, {activity_count} กิจกรรม, '
+                    f'งบรวม {plan.total_budget:,.2f} บาท'
+                ),
+                ip_address=get_client_ip(request),
+            )
+            messages.success(
+                request,
+                f'นำเข้าแผนสำเร็จ {project_count} โครงการ {activity_count} กิจกรรม',
+            )
+            return redirect(f"{reverse('projects:project_list')}?fiscal_year={fiscal_year.pk}")
+        _discard_plan_upload(request)
+
+    elif request.method == 'POST':
+        form = PlanImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            _discard_plan_upload(request)
+            uploads = [f for f in (form.cleaned_data['project_file'], form.cleaned_data['activity_file']) if f]
+            plan = importer.parse_plan(form.cleaned_data['fiscal_year'], request.user, *uploads)
+            if plan.is_valid:
+                # พักไฟล์ไว้จนกว่าจะยืนยัน (ไม่เก็บข้อมูลทั้งแผนใน session)
+                token = uuid.uuid4().hex
+                names = []
+                for f in uploads:
+                    f.seek(0)
+                    names.append(default_storage.save(f'imports/plan/{token}/{f.name}', f))
+                request.session[PLAN_IMPORT_SESSION_KEY] = {
+                    'fiscal_year': plan.fiscal_year.pk,
+                    'files': names,
+                    'filename': uploads[0].name,
+                }
+
+    return render(request, 'projects/plan_import.html', {
+        'form': form,
+        'plan': plan,
+        'errors': plan.errors[:500] if plan else [],
+        'project_columns': importer.PROJECT_COLUMNS,
+        'activity_columns': importer.ACTIVITY_COLUMNS,
+    })
+
+
+@role_required(['planner', 'head', 'admin'])
+def plan_import_template(request):
+    buf = io.BytesIO()
+    importer.build_template().save(buf)
+    response = HttpResponse(
+        buf.getvalue(),
+        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    )
+    response['Content-Disposition'] = 'attachment; filename="plan_import_template.xlsx"'
+    return response
+
+
+@role_required(['planner', 'admin'])
+def fiscal_year_rollover(request):
+    """เลือกโครงการของปีงบเดิมแล้วสั่งคัดลอกไปปีงบใหม่เป็นงานเบื้องหลัง"""
+    fiscal_years = FiscalYear.objects.order_by('-year')
+    source = request.GET.get('source', '')
+    source_year = (fiscal_years.filter(pk=source).first() if source.isdigit() else None) or \
+        fiscal_years.filter(is_active=True).first() or fiscal_years.first()
+    source_projects = get_projects_for_user(request.user).filter(fiscal_year=source_year).order_by(
+        *PROJECT_LIST_ORDERING,
+    ) if source_year else Project.objects.none()
+
+    if request.method == 'POST':
+        form = RolloverForm(request.POST, source_projects=source_projects, source_year=source_year)
+        if form.is_valid():
+            target = form.cleaned_data['target_fiscal_year']
+            project_ids = [p.pk for p in form.cleaned_data['projects']]
+            job = runner.enqueue('fiscal_year_rollover', request.user, {
+                'source_fiscal_year': source_year.pk,
+                'target_fiscal_year': target.pk,
+                'project_ids': project_ids,
+                'include_activities': form.cleaned_data['include_activities'],
+            })
+            log_action(
+                actor=request.user, action='PROJECT_ROLLOVER',
+                target_repr=f'ปีงบประมาณ {source_year.year} → {target.year}',
+                detail=f'{len(project_ids)} โครงการ (งาน #{job.pk})',
+                ip_address=get_client_ip(request),
+            )
+            return redirect('jobs:job_detail', pk=job.pk)
+    else:
+        initial = {'target_fiscal_year': request.GET['target']} if request.GET.get('target', '').isdigit() else None
+        form = RolloverForm(initial=initial, source_projects=source_projects, source_year=source_year)
+
+    # รหัสใหม่ของแต่ละโครงการ (ตามปีงบปลายทางที่เลือกไว้) และโครงการที่รหัสใหม่มีอยู่แล้ว
+    target_value = str(form['target_fiscal_year'].value() or '')
+    target = form.fields['target_fiscal_year'].queryset.filter(
+        pk=target_value,
+    ).first() if target_value.isdigit() else None
+    rows = []
+    if source_year and target:
+        projects = list(source_projects.only('pk', 'project_code', 'name', 'total_budget'))
+        new_codes = {p.pk: rollover.remap_code(p.project_code, source_year.year, target.year) for p in projects}
+        taken = set(Project.objects.filter(
+            project_code__in=new_codes.values(),
+        ).values_list('project_code', flat=True))
+        rows = [
+            {'project': p, 'new_code': new_codes[p.pk], 'exists': new_codes[p.pk] in taken}
+            for p in projects
+        ]
+
+    return render(request, 'projects/rollover.html', {
+        'form': form,
+        'rows': rows,
+        'fiscal_years': fiscal_years,
+        'source_year': source_year,
+        'target_year': target,
+        'selected': {str(v) for v in (form['projects'].value() or [])},
+    })
+
+
 @role_required(['planner', 'head', 'admin'])
 def project_edit(request, pk):
     project = get_object_or_404(Project, pk=pk)
@@ -142,11 +331,14 @@ def project_edit(request, pk):
         raise PermissionDenied
 
     if request.method == 'POST':
+        old_status = project.status
         form = ProjectForm(request.POST, request.FILES, instance=project, user=request.user)
         budget_formset = ProjectBudgetSourceFormSet(request.POST, instance=project)
         if form.is_valid() and budget_formset.is_valid():
-            form.save()
-            budget_formset.save()
+            with transaction.atomic():
+                form.save()
+                budget_formset.save()
+                record_project_status(project, old_status, project.status, request.user)
             log_action(
                 actor=request.user, action='PROJECT_UPDATE',
                 target_repr=f'{project.project_code} - {project.name}',
@@ -188,6 +380,7 @@ def project_status_change(request, pk):
     old_status = project.status
     project.status = new_status
     project.save()
+    record_project_status(project, old_status, new_status, request.user)
     log_action(
         actor=request.user, action='PROJECT_STATUS',
         target_repr=f'{project.project_code} - {project.name}',
@@ -263,52 +456,34 @@ def activity_detail(request, project_pk, pk):
     # alert เมื่อมี expense ที่ไม่มีรายงานรองรับ ไม่ว่าจะมีรายงานอยู่แล้วหรือไม่
     unlinked_alert = unlinked_count > 0
 
-    # --- Status Timeline ---
-    from apps.accounts.models import AuditLog
-    from django.db.models import Q as _Q
-    activity_logs = AuditLog.objects.filter(
-        action__in=['ACTIVITY_STATUS', 'ACTIVITY_CREATE'],
-    ).filter(
-        _Q(target_repr__contains=f'กิจกรรม {activity.activity_number}:') |
-        _Q(target_repr__contains=f'กิจกรรมที่ {activity.activity_number} -')
-    ).filter(
-        target_repr__startswith=str(project.project_code)
-    ).select_related('user').order_by('created_at')
-
-    STATUS_LABELS = {
-        'pending': 'รอดำเนินการ',
-        'in_progress': 'กำลังดำเนินการ',
-        'completed': 'เสร็จสิ้น',
-        'cancelled': 'ยกเลิก',
-    }
+    # --- Status Timeline (จาก ActivityStatusHistory) ---
+    STATUS_LABELS = dict(Activity.STATUS_CHOICES)
     STATUS_ORDER = ['pending', 'in_progress', 'completed']
 
-    # map status → most recent log that transitioned TO that status
+    # map status → แถวล่าสุดที่เปลี่ยนมาเป็นสถานะนั้น
     status_events = {}
     create_event = None
-    for log in activity_logs:
-        if log.action == 'ACTIVITY_CREATE':
-            create_event = log
-        elif log.action == 'ACTIVITY_STATUS':
-            try:
-                new_s = log.detail.split('→')[-1].strip()
-                status_events[new_s] = log
-            except Exception:
-                pass
+    for entry in activity.status_history.select_related('changed_by'):
+        if entry.source == 'create':
+            create_event = entry
+        else:
+            status_events[entry.to_status] = entry
 
     current_idx = STATUS_ORDER.index(activity.status) if activity.status in STATUS_ORDER else 0
-    timeline = []
+    status_timeline = []
     if create_event:
-        timeline.append({'type': 'create', 'label': 'สร้างกิจกรรม', 'done': True, 'active': False,
-                         'user': create_event.user, 'date': create_event.created_at})
+        status_timeline.append({'type': 'create', 'label': 'สร้างกิจกรรม', 'done': True, 'active': False,
+                                'user': create_event.changed_by, 'date': create_event.changed_at})
     for i, s in enumerate(STATUS_ORDER):
-        log = status_events.get(s)
+        entry = status_events.get(s)
+        if entry is None and s == 'pending' and create_event:
+            entry = create_event
         is_current = (s == activity.status)
         is_done = (i < current_idx) or (is_current and s == 'completed')
-        timeline.append({'type': 'status', 'status': s, 'label': STATUS_LABELS[s],
-                         'done': is_done, 'active': is_current,
-                         'user': log.user if log else None,
-                         'date': log.created_at if log else None})
+        status_timeline.append({'type': 'status', 'status': s, 'label': STATUS_LABELS[s],
+                                'done': is_done, 'active': is_current,
+                                'user': entry.changed_by if entry else None,
+                                'date': entry.changed_at if entry else None})
 
     role = getattr(getattr(request.user, 'profile', None), 'role', 'staff')
     can_change_status = (
@@ -332,7 +507,7 @@ def activity_detail(request, project_pk, pk):
         'unlinked_alert': unlinked_alert,
         'has_reports': has_reports,
         # timeline
-        'timeline': timeline,
+        'timeline': status_timeline,
         'can_change_status': can_change_status,
         'can_action': can_action,
     }
@@ -358,6 +533,7 @@ def activity_create(request, project_pk):
             activity.activity_number = max_num + 1
             activity.save()
             form.save_m2m()
+            record_activity_status(activity, '', activity.status, request.user, source='create')
             log_action(
                 actor=request.user, action='ACTIVITY_CREATE',
                 target_repr=f'{project.project_code} / กิจกรรม {activity.activity_number}: {activity.name}',
@@ -371,7 +547,7 @@ def activity_create(request, project_pk):
     return render(request, 'projects/activity_form.html', {
         'form': form,
         'project': project,
-        'project_sources': project.budget_source_summary(),
+        'project_sources': project.budget_breakdown()['sources'],
         'title': 'เพิ่มกิจกรรมใหม่',
     })
 
@@ -386,9 +562,11 @@ def activity_edit(request, project_pk, pk):
     activity = get_object_or_404(Activity, pk=pk, project=project)
 
     if request.method == 'POST':
+        old_status = activity.status
         form = ActivityForm(request.POST, instance=activity, project=project, user=request.user)
         if form.is_valid():
             form.save()
+            record_activity_status(activity, old_status, activity.status, request.user)
             log_action(
                 actor=request.user, action='ACTIVITY_UPDATE',
                 target_repr=f'{project.project_code} / กิจกรรม {activity.activity_number}: {activity.name}',
@@ -403,7 +581,7 @@ def activity_edit(request, project_pk, pk):
         'form': form,
         'project': project,
         'activity': activity,
-        'project_sources': project.budget_source_summary(exclude_activity_pk=activity.pk),
+        'project_sources': project.budget_breakdown(exclude_activity_pk=activity.pk)['sources'],
         'title': f'แก้ไขกิจกรรม: {activity.name}',
     })
 
@@ -781,6 +959,7 @@ def activity_status_change(request, project_pk, pk):
     activity.status = new_status
     activity.save()
     completion_note = request.POST.get('completion_note', '').strip()
+    record_activity_status(activity, old_status, new_status, request.user, note=completion_note)
     detail = f'สถานะ: {old_status} → {new_status}'
     if completion_note:
         detail += f' | หมายเหตุ: {completion_note}'
@@ -821,121 +1000,89 @@ def budget_transfer_history(request, project_pk):
     })
 
 
-@login_required
-def project_timeline(request):
-    THAI_MONTHS = {
-        1: 'ม.ค.', 2: 'ก.พ.', 3: 'มี.ค.', 4: 'เม.ย.',
-        5: 'พ.ค.', 6: 'มิ.ย.', 7: 'ก.ค.', 8: 'ส.ค.',
-        9: 'ก.ย.', 10: 'ต.ค.', 11: 'พ.ย.', 12: 'ธ.ค.'
-    }
-
-    today = timezone.now().date()
+def _timeline_fiscal_year(request):
     fiscal_years = FiscalYear.objects.all().order_by('-year')
     fiscal_year_id = request.GET.get('fiscal_year')
-
     if fiscal_year_id:
         fiscal_year = fiscal_years.filter(pk=fiscal_year_id).first()
     else:
         fiscal_year = fiscal_years.filter(is_active=True).first() or fiscal_years.first()
+    return fiscal_years, fiscal_year
+
+
+@login_required
+def project_timeline(request):
+    """หน้าปฏิทิน — แถวถูกโหลดจาก project_timeline_data และวาดเฉพาะส่วนที่มองเห็น"""
+    today = timezone.now().date()
+    fiscal_years, fiscal_year = _timeline_fiscal_year(request)
 
     if not fiscal_year:
         return render(request, 'projects/timeline.html', {
             'fiscal_years': fiscal_years,
             'fiscal_year': None,
             'months': [],
-            'rows': [],
-        })
-
-    # Build 12-month columns for fiscal year (Oct → Sep)
-    fy_gregorian = fiscal_year.year - 543
-    fy_start_gregorian = fy_gregorian - 1
-
-    months = []
-    for i in range(12):
-        m = (9 + i) % 12 + 1
-        y = fy_start_gregorian if m >= 10 else fy_gregorian
-        m_start = date(y, m, 1)
-        m_end = date(y, m, cal.monthrange(y, m)[1])
-        months.append({
-            'label': THAI_MONTHS[m],
-            'month': m,
-            'year': y,
-            'start': m_start,
-            'end': m_end,
-            'is_current': (today.year == y and today.month == m),
-        })
-
-    def get_cell_style(status, overdue, is_current):
-        if overdue:
-            return ('bg-red-500', 'text-white') if is_current else ('bg-red-200', 'text-red-800')
-        mapping = {
-            'draft':       (('bg-slate-500', 'text-white'),   ('bg-slate-200', 'text-slate-700')),
-            'not_started': (('bg-amber-400', 'text-white'),   ('bg-amber-100', 'text-amber-800')),
-            'pending':     (('bg-amber-400', 'text-white'),   ('bg-amber-100', 'text-amber-800')),
-            'in_progress': (('bg-blue-600',  'text-white'),   ('bg-blue-200',  'text-blue-800')),
-            'active':      (('bg-blue-600',  'text-white'),   ('bg-blue-200',  'text-blue-800')),
-            'completed':   (('bg-emerald-500', 'text-white'), ('bg-emerald-200', 'text-emerald-800')),
-            'cancelled':   (('bg-slate-300', 'text-slate-500'), ('bg-slate-100', 'text-slate-400')),
-        }
-        pair = mapping.get(status, (('bg-gray-400', 'text-white'), ('bg-gray-200', 'text-gray-700')))
-        bg, fg = pair[0] if is_current else pair[1]
-        return bg, fg
-
-    def build_cells(start, end, status, overdue):
-        cells = []
-        for m in months:
-            overlaps = bool(start and end and start <= m['end'] and end >= m['start'])
-            if overlaps:
-                bg, fg = get_cell_style(status, overdue, m['is_current'])
-            else:
-                bg, fg = '', ''
-            cells.append({'overlaps': overlaps, 'bg': bg, 'fg': fg, 'is_current': m['is_current']})
-        return cells
-
-    projects = get_viewable_projects(request.user).filter(
-        fiscal_year=fiscal_year
-    ).prefetch_related(
-        'activities', 'responsible_persons',
-    ).annotate(
-        code_num=Cast('project_code', FloatField())
-    ).order_by('code_num', 'project_code')
-
-    rows = []
-    for project in projects:
-        proj_overdue = bool(
-            project.end_date and
-            project.end_date < today and
-            project.status not in ('completed', 'cancelled')
-        )
-        rows.append({
-            'type': 'project',
-            'obj': project,
-            'cells': build_cells(project.start_date, project.end_date, project.status, proj_overdue),
-            'overdue': proj_overdue,
         })
-        for activity in project.activities.all().order_by('activity_number'):
-            act_overdue = bool(
-                activity.end_date and
-                activity.end_date < today and
-                activity.status not in ('completed', 'cancelled')
-            )
-            rows.append({
-                'type': 'activity',
-                'obj': activity,
-                'project': project,
-                'cells': build_cells(activity.start_date, activity.end_date, activity.status, act_overdue),
-                'overdue': act_overdue,
-            })
 
     return render(request, 'projects/timeline.html', {
-        'months': months,
-        'rows': rows,
+        'months': timeline.fiscal_months(fiscal_year, today),
         'fiscal_year': fiscal_year,
         'fiscal_years': fiscal_years,
+        'timeline_styles': timeline.client_styles(),
         'today': today,
     })
 
 
+@login_required
+def project_timeline_data(request):
+    """ข้อมูลปฏิทินแบบ JSON (แถวเป็น array ตาม timeline.ROW_COLUMNS) รองรับ ETag / 304"""
+    today = timezone.now().date()
+    _, fiscal_year = _timeline_fiscal_year(request)
+    if not fiscal_year:
+        raise Http404
+
+    body, etag = timeline.get_timeline_payload(
+        get_viewable_projects(request.user), fiscal_year, get_viewable_scope(request.user), today,
+    )
+    etag = quote_etag(etag)
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(body, content_type='application/json')
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+@login_required
+def project_timeline_export(request):
+    """ปฏิทินโครงการเป็น CSV/TSV (?format=csv|tsv) — ใช้แถวชุดเดียวกับ JSON endpoint (cache)"""
+    today = timezone.now().date()
+    _, fiscal_year = _timeline_fiscal_year(request)
+    if not fiscal_year:
+        raise Http404
+
+    rows = timeline.get_timeline_rows(
+        get_viewable_projects(request.user), fiscal_year, get_viewable_scope(request.user), today,
+    )
+    months = timeline.fiscal_months(fiscal_year, today)
+    header = [
+        'ประเภท', 'รหัสโครงการ', 'ลำดับกิจกรรม', 'ชื่อ', 'สถานะ', 'วันเริ่ม', 'วันสิ้นสุด', 'เลยกำหนด',
+        *(f"{m['label']} {m['year'] + 543}" for m in months),
+    ]
+
+    def export_rows():
+        for row in rows:
+            yield [
+                'โครงการ' if row['type'] == 'project' else 'กิจกรรม',
+                row['code'], row['number'] or '', row['name'], row['status_display'],
+                row['start'].isoformat() if row['start'] else '',
+                row['end'].isoformat() if row['end'] else '',
+                1 if row['overdue'] else 0,
+                *((row['mask'] >> i) & 1 for i in range(12)),
+            ]
+
+    return streaming.export_response(request, f'timeline_{fiscal_year.year}', header, export_rows())
+
+
 # ─── Document Templates (แบบฟอร์ม) ─────────────────────────────────────────
 
 @login_required
@@ -1,7 +1,16 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class ReportsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.reports'
     verbose_name = 'รายงาน'
+
+    def ready(self):
+        import apps.reports.bundle  # noqa: F401 — ลงทะเบียน background job
+
+        # โหลดฟอนต์/สไตล์ PDF ตอน worker เริ่มทำงาน — request แรกไม่ต้องรอ
+        if getattr(settings, 'REPORTS_PDF_PRELOAD', False):
+            from .pdf_utils import warm_cache
+            warm_cache()
@@ -0,0 +1,87 @@
+"""รายงานโครงการ PDF หลายโครงการรวมเป็น ZIP (งานเบื้องหลัง 'project_pdf_bundle')
+
+render แต่ละโครงการใน process pool (worker ละ 1 core, โหลดฟอนต์ไว้ตอนเริ่ม — bundle_worker.init)
+ส่งงานเข้า pool ครั้งละไม่เกิน 2 × จำนวน worker และเขียนแต่ละไฟล์ลง ZIP ชั่วคราวบนดิสก์ทันทีที่เสร็จ
+หน่วยความจำจึงไม่โตตามจำนวนโครงการ — ZIP ที่เสร็จแล้วเก็บเป็น BackgroundJob.artifact (ดาวน์โหลดแบบ stream)
+ขอบเขตโครงการตรวจซ้ำตอนรันด้วย get_viewable_projects ของผู้สั่งงาน
+Celery prefork worker เป็น daemon process สร้าง process ลูกไม่ได้ — กรณีนั้น render ทีละโครงการใน process เดียว
+"""
+import multiprocessing
+import os
+import tempfile
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import islice
+
+from django.conf import settings
+from django.core.files import File
+from django.urls import reverse
+
+from apps.jobs import runner
+from apps.jobs.models import BackgroundJob
+from apps.projects.utils import get_viewable_projects
+
+from . import bundle_worker
+
+
+def worker_count(project_count):
+    """จำนวน process — ค่าเริ่มต้นเท่าจำนวน core (settings.REPORTS_BUNDLE_WORKERS) แต่ไม่เกินจำนวนโครงการ"""
+    configured = getattr(settings, 'REPORTS_BUNDLE_WORKERS', 0) or os.cpu_count() or 1
+    return max(1, min(configured, project_count))
+
+
+def render_pdfs(project_ids, workers):
+    """yield (ชื่อไฟล์, PDF bytes) ตามลำดับที่ render เสร็จ"""
+    if workers <= 1 or multiprocessing.current_process().daemon:
+        for project_id in project_ids:
+            yield bundle_worker.render(project_id)
+        return
+
+    remaining = iter(project_ids)
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=bundle_worker.init,
+        initargs=(os.environ.get('DJANGO_SETTINGS_MODULE'),),
+    ) as pool:
+        in_flight = {pool.submit(bundle_worker.render, pk) for pk in islice(remaining, workers * 2)}
+        while in_flight:
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+                next_id = next(remaining, None)
+                if next_id is not None:
+                    in_flight.add(pool.submit(bundle_worker.render, next_id))
+
+
+@runner.handler('project_pdf_bundle')
+def run_bundle(job, report):
+    project_ids = list(
+        get_viewable_projects(job.created_by).filter(pk__in=job.params.get('project_ids', []))
+        .order_by('code_sort_key').values_list('pk', flat=True)
+    )
+    total = len(project_ids)
+    workers = worker_count(total)
+    report(0, total, f'กำลังสร้าง PDF {total} โครงการ ({workers} process)')
+
+    names = set()
+    with tempfile.TemporaryFile() as tmp:
+        # PDF บีบอัดภายในไฟล์อยู่แล้ว — เก็บแบบ ZIP_STORED ไม่ต้องบีบซ้ำ
+        with zipfile.ZipFile(tmp, 'w', zipfile.ZIP_STORED) as archive:
+            for done, (filename, pdf) in enumerate(render_pdfs(project_ids, workers), 1):
+                stem, n = filename[:-4], 2
+                while filename in names:
+                    filename, n = f'{stem}_{n}.pdf', n + 1
+                names.add(filename)
+                archive.writestr(filename, pdf)
+                report(done, message=f'{filename} ({done}/{total})')
+        tmp.seek(0)
+        job.artifact.save(f'project_reports_{job.pk}.zip', File(tmp), save=False)
+    BackgroundJob.objects.filter(pk=job.pk).update(artifact=job.artifact.name)
+
+    skipped = len(job.params.get('project_ids', [])) - total
+    return {
+        'summary': f'สร้างรายงาน PDF {total} โครงการ'
+                   + (f' (ข้าม {skipped} โครงการที่ไม่มีสิทธิ์เข้าถึง)' if skipped else ''),
+        'url': reverse('jobs:job_artifact', args=[job.pk]),
+    }
@@ -0,0 +1,27 @@
+"""ฟังก์ชันที่รันใน process ลูกของ apps/reports/bundle.py
+
+process ลูกเริ่มแบบ spawn (ใช้ได้ทั้ง Linux และ Windows และไม่ติด lock/connection ของ thread อื่นใน process เว็บ)
+จึง import module นี้ก่อน Django พร้อม — ห้าม import model ที่ระดับ module
+"""
+import os
+
+
+def init(settings_module):
+    """initializer ของ worker: ตั้งค่า Django แล้วโหลดฟอนต์/สไตล์ PDF ไว้ก่อนงานแรก"""
+    if settings_module:
+        os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    import django
+    django.setup()
+
+    from .pdf_utils import warm_cache
+    warm_cache()
+
+
+def render(project_id):
+    """(ชื่อไฟล์, PDF bytes) ของโครงการ 1 โครงการ"""
+    from apps.projects.models import Project
+
+    from .views import project_pdf_filename, render_project_pdf
+
+    project = Project.objects.select_related('department', 'fiscal_year').get(pk=project_id)
+    return project_pdf_filename(project), render_project_pdf(project)
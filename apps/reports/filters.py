@@ -0,0 +1,198 @@
+"""ตัวกรองรายงาน (ปีงบ / แผนก / สถานะ / โครงการ / ช่วงวันที่) ที่ใช้ร่วมกันทุกรูปแบบผลลัพธ์
+
+    report = ReportFilter.from_request(request)
+    report.project_rows()   # โครงการ + ยอดใช้ไป (cache ร่วมกันระหว่าง HTML / พิมพ์ / Excel / PDF)
+    report.expenses()       # queryset รายการเบิกจ่ายที่อนุมัติแล้ว
+
+ค่าที่ไม่ถูกต้อง (id ไม่ใช่ตัวเลข, ไม่พบ, วันที่ผิดรูปแบบ) ถือว่าไม่ได้ระบุ — ไม่ระบุปีงบ = ปีงบที่ active
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import date
+from decimal import Decimal
+from functools import cached_property
+from urllib.parse import urlencode
+
+from django.core.cache import cache
+from django.db.models import Sum
+from django.utils.dateparse import parse_date
+
+from apps.accounts.models import Department
+from apps.budget import rollup
+from apps.budget.models import Expense
+from apps.projects import timeline
+from apps.projects.models import FiscalYear, Project
+from apps.projects.utils import get_viewable_projects, get_viewable_scope
+
+CACHE_TIMEOUT = 60 * 10
+STATUS_LABELS = dict(Project.STATUS_CHOICES)
+
+
+def _int(value):
+    value = (value or '').strip()
+    return int(value) if value.isdigit() else None
+
+
+def _date(value):
+    try:
+        return parse_date((value or '').strip())
+    except ValueError:
+        return None
+
+
+@dataclass
+class ReportFilter:
+    user: object
+    fiscal_year: FiscalYear | None = None
+    department: Department | None = None
+    status: str = ''
+    project: Project | None = None
+    date_from: date | None = None
+    date_to: date | None = None
+    fiscal_years: list = field(default_factory=list, repr=False)
+
+    @classmethod
+    def from_request(cls, request, data=None):
+        """อ่านตัวกรองจาก request.GET (หรือ data เช่น request.POST) — query ปีงบเพียงครั้งเดียว"""
+        data = request.GET if data is None else data
+        fiscal_years = list(FiscalYear.objects.order_by('-year'))
+        fy_id = _int(data.get('fiscal_year'))
+        fiscal_year = (
+            next((fy for fy in fiscal_years if fy.pk == fy_id), None)
+            or next((fy for fy in fiscal_years if fy.is_active), None)
+        )
+        dept_id = _int(data.get('department'))
+        project_id = _int(data.get('project'))
+        status = (data.get('status') or '').strip()
+        return cls(
+            user=request.user,
+            fiscal_year=fiscal_year,
+            department=Department.objects.filter(pk=dept_id).first() if dept_id else None,
+            status=status if status in STATUS_LABELS else '',
+            project=(
+                get_viewable_projects(request.user).filter(pk=project_id).first() if project_id else None
+            ),
+            date_from=_date(data.get('date_from')),
+            date_to=_date(data.get('date_to')),
+            fiscal_years=fiscal_years,
+        )
+
+    # ── ค่าที่ใช้แสดงผล ──────────────────────────────────────────────────────
+
+    @property
+    def params(self):
+        """ค่าตัวกรองแบบ canonical (string) ตามชื่อพารามิเตอร์ใน URL"""
+        return {
+            'fiscal_year': str(self.fiscal_year.pk) if self.fiscal_year else '',
+            'department': str(self.department.pk) if self.department else '',
+            'status': self.status,
+            'project': str(self.project.pk) if self.project else '',
+            'date_from': self.date_from.isoformat() if self.date_from else '',
+            'date_to': self.date_to.isoformat() if self.date_to else '',
+        }
+
+    @property
+    def querystring(self):
+        """query string สำหรับลิงก์ไปยังรูปแบบอื่นของรายงานเดียวกัน (เฉพาะค่าที่ระบุ)"""
+        return urlencode({k: v for k, v in self.params.items() if v})
+
+    @property
+    def cache_key(self):
+        """คีย์ของชุดข้อมูล — ตัวกรองเดียวกันและขอบเขตสิทธิ์เดียวกันได้คีย์เดียวกัน"""
+        values = ':'.join(self.params.values())
+        return f'reports:{get_viewable_scope(self.user)}:{values}'
+
+    @property
+    def fy_label(self):
+        return f'ปีงบประมาณ {self.fiscal_year.year}' if self.fiscal_year else ''
+
+    @property
+    def dept_label(self):
+        return self.department.name if self.department else ''
+
+    @property
+    def status_label(self):
+        return STATUS_LABELS.get(self.status, '')
+
+    def context(self):
+        """ค่าตัวกรองปัจจุบันสำหรับ template (ฟอร์มตัวกรองและลิงก์ export)"""
+        params = self.params
+        return {
+            'report_filter': self,
+            'fiscal_year': self.fiscal_year,
+            'current_fy': params['fiscal_year'],
+            'current_dept': params['department'],
+            'current_status': params['status'],
+            'current_project': params['project'],
+            'current_date_from': params['date_from'],
+            'current_date_to': params['date_to'],
+        }
+
+    # ── ข้อมูล ──────────────────────────────────────────────────────────────
+
+    def projects(self):
+        """โครงการที่มองเห็นได้ตามปีงบ / แผนก / สถานะ (ตัวกรองโครงการใช้กับรายการเบิกจ่ายเท่านั้น)"""
+        projects = get_viewable_projects(self.user)
+        if self.fiscal_year:
+            projects = projects.filter(fiscal_year=self.fiscal_year)
+        if self.department:
+            projects = projects.filter(department=self.department)
+        if self.status:
+            projects = projects.filter(status=self.status)
+        return projects.order_by('code_sort_key')
+
+    def project_rows(self):
+        """โครงการพร้อมแหล่งเงิน แผนก และยอดใช้ไป (approved) — 3 query แล้วเก็บใน cache
+
+        ผลถูกใช้ซ้ำระหว่างหน้า HTML กับไฟล์ export ของตัวกรองเดียวกัน และหมดอายุเมื่อโครงการ/กิจกรรม
+        หรือยอดเบิกจ่ายเปลี่ยน (เวอร์ชันข้อมูลของ timeline และ spend rollup)
+        """
+        return self._project_rows
+
+    @cached_property
+    def _project_rows(self):
+        key = f'{self.cache_key}:projects:{timeline.data_version()}:{rollup.data_version()}'
+        rows = cache.get(key)
+        if rows is None:
+            rows = list(self.projects().select_related('department').prefetch_related('budget_sources'))
+            spent = dict(
+                Expense.objects.filter(project__in=[p.pk for p in rows], status='approved')
+                .values('project_id').annotate(total=Sum('amount')).values_list('project_id', 'total')
+            )
+            for project in rows:
+                # ค่าที่ property Project.total_spent ใช้ — ไม่ต้อง query ทีละโครงการ
+                project._total_spent = spent.get(project.pk) or Decimal('0')
+            cache.set(key, rows, CACHE_TIMEOUT)
+        return rows
+
+    def summary(self):
+        """ยอดรวมของ project_rows(): total_budget / total_spent / total_remaining / total_pct"""
+        rows = self.project_rows()
+        total_budget = sum(float(p.total_budget or 0) for p in rows)
+        total_spent = sum(float(p.total_spent or 0) for p in rows)
+        return {
+            'total_budget': total_budget,
+            'total_spent': total_spent,
+            'total_remaining': total_budget - total_spent,
+            'total_pct': (total_spent / total_budget * 100) if total_budget > 0 else 0,
+        }
+
+    def expenses(self):
+        """รายการเบิกจ่ายที่อนุมัติแล้วของโครงการใน projects() ตามโครงการและช่วงวันที่"""
+        expenses = Expense.objects.filter(status='approved', project__in=self.projects().values('pk'))
+        # Expense เก็บปีงบ/แผนกซ้ำไว้ — กรองตรงเพื่อให้ใช้ index ของตารางเบิกจ่ายได้
+        if self.fiscal_year:
+            expenses = expenses.filter(fiscal_year=self.fiscal_year)
+        if self.department:
+            expenses = expenses.filter(department=self.department)
+        if self.project:
+            expenses = expenses.filter(project=self.project)
+        if self.date_from:
+            expenses = expenses.filter(expense_date__gte=self.date_from)
+        if self.date_to:
+            expenses = expenses.filter(expense_date__lte=self.date_to)
+        return expenses.select_related(
+            'activity', 'activity__project', 'activity__project__department',
+            'created_by', 'approved_by',
+        ).order_by('activity__project__code_sort_key', 'activity__activity_number', 'expense_date')
@@ -0,0 +1,114 @@
+"""Management command: วัดเวลาสร้างรายงาน PDF และขนาดไฟล์
+
+cold  = ลงทะเบียนฟอนต์ + สร้างสไตล์ใหม่ + render ครั้งแรก (สิ่งที่ request แรกต้องจ่ายถ้าไม่ได้ warm ตอนเริ่ม process)
+warm  = render ซ้ำด้วยฟอนต์/สไตล์ที่ cache ไว้ (ค่ามัธยฐานของ --repeat ครั้ง)
+ค่าเริ่มต้นใช้เอกสารสังเคราะห์แบบรายงานภาพรวมงบ (--rows แถว ภาษาไทย) — --user ใช้ budget_report_pdf จริงตามสิทธิ์ของผู้ใช้
+"""
+import io
+import os
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+from reportlab.lib.pagesizes import A4, landscape
+from reportlab.lib.units import cm
+from reportlab.platypus import Paragraph, Spacer, Table
+
+from apps.reports import pdf_utils
+from apps.reports.views import budget_report_pdf
+
+
+def _synthetic_pdf(rows):
+    styles = pdf_utils.make_styles()
+    buf = io.BytesIO()
+    doc = pdf_utils.build_document(buf, 'benchmark', page_size=landscape(A4))
+    width = landscape(A4)[0] - 3 * cm
+    story = [
+        pdf_utils.header_block(styles, 'รายงานภาพรวมงบประมาณ', 'ปีงบประมาณ 2569  |  ทดสอบความเร็ว', page_width=width),
+        Spacer(1, 8),
+        pdf_utils.summary_card_row(styles, [
+            ('งบประมาณรวม', pdf_utils.fmt_currency(12_345_678), 'บาท'),
+            ('ใช้ไปแล้ว', pdf_utils.fmt_currency(6_543_210), 'บาท'),
+            ('คงเหลือ', pdf_utils.fmt_currency(5_802_468), 'บาท'),
+        ], width),
+        Spacer(1, 8),
+        Paragraph('รายการโครงการ', styles['section']),
+    ]
+    data = [[Paragraph(h, styles['th']) for h in ('รหัส', 'ชื่อโครงการ', 'งบประมาณ', 'ใช้ไป', '%')]]
+    for i in range(rows):
+        pct = i % 100
+        color = pdf_utils.pct_color(pct)
+        data.append([
+            Paragraph(f'P{i:04d}', styles['td_c']),
+            Paragraph(f'โครงการพัฒนาระบบสารสนเทศและบริการห้องสมุด ลำดับที่ {i}', styles['td']),
+            Paragraph(pdf_utils.fmt_currency(100_000 + i), styles['td_r']),
+            Paragraph(pdf_utils.fmt_currency(1_000 * pct), pdf_utils.tinted(styles, 'cell_r', color)),
+            Paragraph(f'{pct:.1f}%', pdf_utils.tinted(styles, 'cell_bold_r', color)),
+        ])
+    widths = [2 * cm, width - 10 * cm, 3 * cm, 3 * cm, 2 * cm]
+    table = Table(data, colWidths=widths, repeatRows=1)
+    table.setStyle(pdf_utils.table_header_style(len(widths)))
+    story.append(table)
+    doc.build(story)
+    return buf.getvalue()
+
+
+class Command(BaseCommand):
+    help = "Benchmark PDF report rendering: cold (fonts + styles) vs warm render time and output size"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=300, help='Rows in the synthetic report (default 300)')
+        parser.add_argument('--repeat', type=int, default=10, help='Warm renders to time (default 10)')
+        parser.add_argument('--user', help='Render the real budget report PDF as this username instead')
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1:
+            raise CommandError('--repeat ต้องมากกว่า 0')
+        render = self._renderer(options)
+
+        pdf_utils.clear_cache()
+        started = time.perf_counter()
+        pdf_utils.warm_cache()
+        warm_up = time.perf_counter() - started
+        first_pdf = render()
+        cold = time.perf_counter() - started
+
+        timings = []
+        for _ in range(options['repeat']):
+            started = time.perf_counter()
+            pdf = render()
+            timings.append(time.perf_counter() - started)
+
+        font_bytes = sum(
+            os.path.getsize(os.path.join(pdf_utils.FONTS_DIR, name))
+            for name in os.listdir(pdf_utils.FONTS_DIR) if name.lower().endswith('.ttf')
+        ) if os.path.isdir(pdf_utils.FONTS_DIR) else 0
+
+        self.stdout.write(f'cold (fonts + styles {warm_up * 1000:.1f} ms + first render): {cold * 1000:.1f} ms')
+        self.stdout.write(
+            f'warm render: median {statistics.median(timings) * 1000:.1f} ms, '
+            f'min {min(timings) * 1000:.1f} ms ({len(timings)} runs)'
+        )
+        self.stdout.write(
+            f'PDF size: {len(pdf) / 1024:.1f} KB (first {len(first_pdf) / 1024:.1f} KB) — '
+            f'TTF files {font_bytes / 1024:.0f} KB, embedded as glyph subsets'
+        )
+        self.stdout.write(self.style.SUCCESS('Done'))
+
+    def _renderer(self, options):
+        if not options['user']:
+            rows = options['rows']
+            return lambda: _synthetic_pdf(rows)
+
+        user = get_user_model().objects.filter(username=options['user']).first()
+        if user is None:
+            raise CommandError(f'ไม่พบผู้ใช้ "{options["user"]}"')
+        factory = RequestFactory()
+
+        def render():
+            request = factory.get('/reports/budget/pdf/')
+            request.user = user
+            return budget_report_pdf(request).content
+        return render
@@ -1,7 +1,13 @@
 """
 ReportLab PDF utilities — Thai font registration + common helpers.
+
+Fonts and ParagraphStyles are process-level: registered/built once (warm_cache() runs from
+ReportsConfig.ready) and shared by every request — treat the styles as read-only.
+ReportLab embeds TrueType fonts as subsets containing only the glyphs used in the document,
+so THSarabunNew adds a few KB per PDF rather than the ~1 MB of the TTF files.
 """
 import os
+import threading
 from io import BytesIO
 
 from django.conf import settings
@@ -26,12 +32,19 @@ from reportlab.platypus import (
 FONTS_DIR = os.path.join(settings.BASE_DIR, 'static', 'fonts')
 
 _FONTS_REGISTERED = False
+_FONTS_LOCK = threading.Lock()
 
 
 def _register_fonts():
-    global _FONTS_REGISTERED
     if _FONTS_REGISTERED:
         return
+    with _FONTS_LOCK:
+        if not _FONTS_REGISTERED:
+            _load_fonts()
+
+
+def _load_fonts():
+    global _FONTS_REGISTERED
     try:
         pdfmetrics.registerFont(TTFont('THSarabunNew', os.path.join(FONTS_DIR, 'THSarabunNew.ttf')))
         pdfmetrics.registerFont(TTFont('THSarabunNew-Bold', os.path.join(FONTS_DIR, 'THSarabunNew_Bold.ttf')))
@@ -67,9 +80,43 @@ C_GRAY       = colors.HexColor('#6b7280')
 
 # ── Style Factory ────────────────────────────────────────────────────────────
 
+_STYLES = None
+_TINTED = {}
+
+
 def make_styles():
-    """Return a dict of ParagraphStyles for the report."""
-    _register_fonts()
+    """Return the shared dict of ParagraphStyles for the report (built once per process)."""
+    global _STYLES
+    if _STYLES is None:
+        _register_fonts()
+        _STYLES = _build_styles()
+    return _STYLES
+
+
+def tinted(styles, key, color):
+    """styles[key] with another text colour — cached, for per-row colours (e.g. pct_color)"""
+    cache_key = (key, color.hexval())
+    style = _TINTED.get(cache_key)
+    if style is None:
+        style = _TINTED[cache_key] = ParagraphStyle(f'{key}_{color.hexval()}', parent=styles[key], textColor=color)
+    return style
+
+
+def warm_cache():
+    """Register fonts and build styles now, so the first PDF request does not pay for it."""
+    make_styles()
+
+
+def clear_cache():
+    """Forget fonts/styles (benchmark_pdf measures the cold cost with this)."""
+    global _FONTS_REGISTERED, _STYLES
+    with _FONTS_LOCK:
+        _FONTS_REGISTERED = False
+        _STYLES = None
+        _TINTED.clear()
+
+
+def _build_styles():
     base = 'THSarabunNew'
 
     return {
@@ -107,6 +154,14 @@ def make_styles():
         'td_bold': ParagraphStyle('td_bold', fontName=f'{base}-Bold', fontSize=9, leading=11),
         'footer': ParagraphStyle('footer', fontName=base, fontSize=8,
                                  leading=10, textColor=C_GRAY),
+        # coloured numbers in tables — use tinted(styles, 'cell_r', colour)
+        'cell_r': ParagraphStyle('cell_r', fontName=base, fontSize=9, alignment=TA_RIGHT),
+        'cell_bold_r': ParagraphStyle('cell_bold_r', fontName=f'{base}-Bold', fontSize=9,
+                                      alignment=TA_RIGHT),
+        'section': ParagraphStyle('section', fontName=f'{base}-Bold', fontSize=12,
+                                  leading=16, textColor=C_HEADER_BG),
+        'card_value': ParagraphStyle('card_value', fontName=f'{base}-Bold', fontSize=13,
+                                     leading=16, textColor=C_HEADER_BG),
     }
 
 
@@ -190,9 +245,7 @@ def summary_card_row(styles, cards, page_width=None):
     for label, value, unit in cards:
         cell = [
             Paragraph(label, styles['small']),
-            Paragraph(value, ParagraphStyle('cv', fontName='THSarabunNew-Bold',
-                                            fontSize=13, leading=16,
-                                            textColor=C_HEADER_BG)),
+            Paragraph(value, styles['card_value']),
             Paragraph(unit, styles['small']),
         ]
         cells.append(cell)
@@ -0,0 +1,59 @@
+"""Export รายงานเป็น CSV / TSV แบบ streaming
+
+แถวมาจาก values_list().iterator() แล้วเขียนออกเป็นก้อนละ CHUNK_ROWS แถวผ่าน StreamingHttpResponse
+หน่วยความจำจึงคงที่ไม่ว่าจะมีกี่แถว และหัวตารางถูกส่งออกไปก่อนที่ query แรกจะเริ่ม
+CSV ขึ้นต้นด้วย BOM เพื่อให้ Excel ภาษาไทยเปิดเป็น UTF-8 ได้ถูกต้อง
+(MySQL/mysqlclient ไม่มี server-side cursor — driver เก็บผลเป็น tuple ทั้งชุด แต่ไม่สร้าง model instance)
+
+    return streaming.export_response(request, 'expense_report', HEADER, rows)
+"""
+import csv
+from itertools import islice
+
+from django.http import Http404, StreamingHttpResponse
+
+CHUNK_ROWS = 500
+ITERATOR_CHUNK_SIZE = 2000
+
+# format → (ตัวคั่น, content type, ขึ้นต้นด้วย BOM)
+FORMATS = {
+    'csv': (',', 'text/csv; charset=utf-8', True),
+    'tsv': ('\t', 'text/tab-separated-values; charset=utf-8', False),
+}
+
+
+class _Echo:
+    """file-like ที่คืนค่าที่เขียน — ให้ csv.writer สร้างข้อความโดยไม่ต้องมี buffer"""
+
+    def write(self, value):
+        return value
+
+
+def get_format(request):
+    """?format=csv (ค่าเริ่มต้น) หรือ tsv — ค่าอื่นเป็น 404"""
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in FORMATS:
+        raise Http404
+    return fmt
+
+
+def iter_chunks(header, rows, fmt):
+    """yield ข้อความทีละก้อน: BOM + หัวตารางก่อน แล้วแถวข้อมูลครั้งละ CHUNK_ROWS แถว"""
+    delimiter, _, bom = FORMATS[fmt]
+    writer = csv.writer(_Echo(), delimiter=delimiter, lineterminator='\r\n')
+    yield ('\ufeff' if bom else '') + writer.writerow(header)
+    rows = iter(rows)
+    while True:
+        chunk = ''.join(writer.writerow(row) for row in islice(rows, CHUNK_ROWS))
+        if not chunk:
+            return
+        yield chunk
+
+
+def export_response(request, filename, header, rows):
+    """StreamingHttpResponse ของ rows ตาม ?format= — rows ควรเป็น generator (ยังไม่ query จนกว่าจะเริ่มส่ง)"""
+    fmt = get_format(request)
+    response = StreamingHttpResponse(iter_chunks(header, rows, fmt), content_type=FORMATS[fmt][1])
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{fmt}"'
+    response['X-Accel-Buffering'] = 'no'
+    return response
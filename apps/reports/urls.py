@@ -9,8 +9,11 @@ urlpatterns = [
     path('budget/print/', views.budget_report_print, name='budget_report_print'),
     path('budget/excel/', views.budget_report_excel, name='budget_report_excel'),
     path('budget/pdf/', views.budget_report_pdf, name='budget_report_pdf'),
+    path('budget/pdf-bundle/', views.project_pdf_bundle, name='project_pdf_bundle'),
+    path('budget/export/', views.budget_report_export, name='budget_report_export'),
     path('expenses/', views.expense_report, name='expense_report'),
     path('expenses/excel/', views.expense_report_excel, name='expense_report_excel'),
+    path('expenses/export/', views.expense_report_export, name='expense_report_export'),
     path('project/<int:pk>/', views.project_report, name='project_report'),
     path('project/<int:pk>/pdf/', views.project_report_pdf, name='project_report_pdf'),
 ]
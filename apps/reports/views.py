@@ -3,7 +3,6 @@ import io
 import openpyxl
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import A4, landscape
-from reportlab.lib.styles import ParagraphStyle
 from reportlab.lib.units import cm
 from reportlab.platypus import (
     HRFlowable,
@@ -16,13 +15,15 @@ from openpyxl.styles import Alignment, Border, Font, PatternFill, Side
 from openpyxl.utils import get_column_letter
 
 from django.contrib.auth.decorators import login_required
-from django.db.models import FloatField, Q, Sum
-from django.db.models.functions import Cast
+from django.db.models import DecimalField, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
 from django.http import HttpResponse
-from django.shortcuts import get_object_or_404, render
+from django.shortcuts import get_object_or_404, redirect, render
+from django.views.decorators.http import require_POST
 from django.utils import timezone
 
 from apps.accounts.models import Department
+from apps.jobs import runner
 from .pdf_utils import (
     build_document,
     fmt_currency,
@@ -32,12 +33,15 @@ from .pdf_utils import (
     summary_card_row,
     table_header_style,
     thaidate as pdf_thaidate,
+    tinted,
     C_ALT_ROW, C_AMBER, C_BLUE, C_BORDER, C_EMERALD, C_HEADER_BG,
     C_RED, C_SUBHEAD_BG, C_SUBHEAD_FG, C_TOTAL_BG,
 )
 from apps.budget.models import Expense
-from apps.projects.models import Activity, FiscalYear, Project
+from apps.projects.models import SOURCE_CHOICES, Activity, Project, ProjectBudgetSource
 from apps.projects.utils import get_viewable_projects
+from . import streaming
+from .filters import ReportFilter
 
 
 # ─── Helpers ────────────────────────────────────────────────────────────────
@@ -82,136 +86,38 @@ def _thaidate(d):
 
 @login_required
 def budget_report(request):
-    fiscal_years = FiscalYear.objects.all().order_by('-year')
-    departments = Department.objects.all().order_by('name')
-
-    fy_id = request.GET.get('fiscal_year')
-    dept_id = request.GET.get('department')
-    status = request.GET.get('status')
-
-    projects = get_viewable_projects(request.user)
-
-    if fy_id:
-        projects = projects.filter(fiscal_year_id=fy_id)
-    else:
-        active_fy = fiscal_years.filter(is_active=True).first()
-        if active_fy:
-            fy_id = str(active_fy.pk)
-            projects = projects.filter(fiscal_year=active_fy)
-
-    if dept_id:
-        projects = projects.filter(department_id=dept_id)
-    if status:
-        projects = projects.filter(status=status)
-
-    projects = projects.prefetch_related(
-        'budget_sources', 'activities', 'department'
-    ).annotate(
-        code_num=Cast('project_code', FloatField())
-    ).order_by('code_num', 'project_code')
-
-    # Summary totals
-    total_budget = sum(_currency(p.total_budget) for p in projects)
-    total_spent = sum(_currency(p.total_spent) for p in projects)
-    total_remaining = total_budget - total_spent
-    total_pct = (total_spent / total_budget * 100) if total_budget > 0 else 0
-
-    fiscal_year = fiscal_years.filter(pk=fy_id).first() if fy_id else None
+    report = ReportFilter.from_request(request)
 
     return render(request, 'reports/budget_report.html', {
-        'projects': projects,
-        'fiscal_years': fiscal_years,
-        'departments': departments,
+        **report.context(),
+        **report.summary(),
+        'projects': report.project_rows(),
+        'fiscal_years': report.fiscal_years,
+        'departments': Department.objects.all().order_by('name'),
         'status_choices': Project.STATUS_CHOICES,
-        'current_fy': fy_id or '',
-        'current_dept': dept_id or '',
-        'current_status': status or '',
-        'fiscal_year': fiscal_year,
-        'total_budget': total_budget,
-        'total_spent': total_spent,
-        'total_remaining': total_remaining,
-        'total_pct': total_pct,
         'today': timezone.now().date(),
     })
 
 
 @login_required
 def budget_report_print(request):
-    fiscal_years = FiscalYear.objects.all().order_by('-year')
-    departments = Department.objects.all().order_by('name')
-
-    fy_id = request.GET.get('fiscal_year')
-    dept_id = request.GET.get('department')
-    status = request.GET.get('status')
-
-    projects = get_viewable_projects(request.user)
-
-    if fy_id:
-        projects = projects.filter(fiscal_year_id=fy_id)
-    else:
-        active_fy = fiscal_years.filter(is_active=True).first()
-        if active_fy:
-            fy_id = str(active_fy.pk)
-            projects = projects.filter(fiscal_year=active_fy)
-
-    if dept_id:
-        projects = projects.filter(department_id=dept_id)
-    if status:
-        projects = projects.filter(status=status)
-
-    projects = projects.prefetch_related(
-        'budget_sources', 'activities', 'department'
-    ).annotate(
-        code_num=Cast('project_code', FloatField())
-    ).order_by('code_num', 'project_code')
-
-    total_budget = sum(_currency(p.total_budget) for p in projects)
-    total_spent = sum(_currency(p.total_spent) for p in projects)
-    total_remaining = total_budget - total_spent
-    total_pct = (total_spent / total_budget * 100) if total_budget > 0 else 0
-
-    fiscal_year = fiscal_years.filter(pk=fy_id).first() if fy_id else None
-    dept_label = departments.filter(pk=dept_id).first().name if dept_id else ''
-    status_label = dict(Project.STATUS_CHOICES).get(status, '') if status else ''
+    report = ReportFilter.from_request(request)
 
     return render(request, 'reports/budget_report_print.html', {
-        'projects': projects,
-        'fiscal_year': fiscal_year,
-        'dept_label': dept_label,
-        'status_label': status_label,
-        'total_budget': total_budget,
-        'total_spent': total_spent,
-        'total_remaining': total_remaining,
-        'total_pct': total_pct,
+        **report.summary(),
+        'projects': report.project_rows(),
+        'fiscal_year': report.fiscal_year,
+        'dept_label': report.dept_label,
+        'status_label': report.status_label,
         'today': timezone.now().date(),
     })
 
 
 @login_required
 def budget_report_excel(request):
-    fiscal_years = FiscalYear.objects.all().order_by('-year')
-    fy_id = request.GET.get('fiscal_year')
-    dept_id = request.GET.get('department')
-    status = request.GET.get('status')
-
-    projects = get_viewable_projects(request.user)
-    if fy_id:
-        projects = projects.filter(fiscal_year_id=fy_id)
-    else:
-        active_fy = fiscal_years.filter(is_active=True).first()
-        if active_fy:
-            projects = projects.filter(fiscal_year=active_fy)
-    if dept_id:
-        projects = projects.filter(department_id=dept_id)
-    if status:
-        projects = projects.filter(status=status)
-
-    projects = projects.prefetch_related('budget_sources', 'activities', 'department').annotate(
-        code_num=Cast('project_code', FloatField())
-    ).order_by('code_num', 'project_code')
-
-    fiscal_year = fiscal_years.filter(pk=fy_id).first() if fy_id else fiscal_years.filter(is_active=True).first()
-    fy_label = f"ปีงบประมาณ {fiscal_year.year}" if fiscal_year else "ทุกปีงบประมาณ"
+    report = ReportFilter.from_request(request)
+    projects = report.project_rows()
+    fy_label = report.fy_label or "ทุกปีงบประมาณ"
 
     wb = openpyxl.Workbook()
     ws = wb.active
@@ -321,98 +227,25 @@ def budget_report_excel(request):
 
 @login_required
 def expense_report(request):
-    fiscal_years = FiscalYear.objects.all().order_by('-year')
-    departments = Department.objects.all().order_by('name')
-
-    fy_id = request.GET.get('fiscal_year')
-    dept_id = request.GET.get('department')
-    project_id = request.GET.get('project')
-    date_from = request.GET.get('date_from')
-    date_to = request.GET.get('date_to')
-
-    projects_qs = get_viewable_projects(request.user)
-
-    if fy_id:
-        projects_qs = projects_qs.filter(fiscal_year_id=fy_id)
-    else:
-        active_fy = fiscal_years.filter(is_active=True).first()
-        if active_fy:
-            fy_id = str(active_fy.pk)
-            projects_qs = projects_qs.filter(fiscal_year=active_fy)
-
-    if dept_id:
-        projects_qs = projects_qs.filter(department_id=dept_id)
-
-    expenses = Expense.objects.filter(
-        activity__project__in=projects_qs,
-        status='approved',
-    ).select_related(
-        'activity', 'activity__project', 'activity__project__department',
-        'created_by', 'approved_by',
-    ).order_by('activity__project__project_code', 'activity__activity_number', 'expense_date')
-
-    if project_id:
-        expenses = expenses.filter(activity__project_id=project_id)
-    if date_from:
-        expenses = expenses.filter(expense_date__gte=date_from)
-    if date_to:
-        expenses = expenses.filter(expense_date__lte=date_to)
-
-    total_amount = expenses.aggregate(total=Sum('amount'))['total'] or 0
-
-    # Projects for filter dropdown
-    available_projects = projects_qs.order_by('project_code')
-    fiscal_year = fiscal_years.filter(pk=fy_id).first() if fy_id else None
+    report = ReportFilter.from_request(request)
+    expenses = report.expenses()
 
     return render(request, 'reports/expense_report.html', {
+        **report.context(),
         'expenses': expenses,
-        'fiscal_years': fiscal_years,
-        'departments': departments,
-        'available_projects': available_projects,
-        'current_fy': fy_id or '',
-        'current_dept': dept_id or '',
-        'current_project': project_id or '',
-        'current_date_from': date_from or '',
-        'current_date_to': date_to or '',
-        'fiscal_year': fiscal_year,
-        'total_amount': total_amount,
+        'fiscal_years': report.fiscal_years,
+        'departments': Department.objects.all().order_by('name'),
+        # Projects for filter dropdown
+        'available_projects': report.projects().only('pk', 'project_code', 'name'),
+        'total_amount': expenses.aggregate(total=Sum('amount'))['total'] or 0,
     })
 
 
 @login_required
 def expense_report_excel(request):
-    fiscal_years = FiscalYear.objects.all().order_by('-year')
-    fy_id = request.GET.get('fiscal_year')
-    dept_id = request.GET.get('department')
-    project_id = request.GET.get('project')
-    date_from = request.GET.get('date_from')
-    date_to = request.GET.get('date_to')
-
-    projects_qs = get_viewable_projects(request.user)
-    if fy_id:
-        projects_qs = projects_qs.filter(fiscal_year_id=fy_id)
-    else:
-        active_fy = fiscal_years.filter(is_active=True).first()
-        if active_fy:
-            projects_qs = projects_qs.filter(fiscal_year=active_fy)
-    if dept_id:
-        projects_qs = projects_qs.filter(department_id=dept_id)
-
-    expenses = Expense.objects.filter(
-        activity__project__in=projects_qs, status='approved',
-    ).select_related(
-        'activity', 'activity__project', 'activity__project__department', 'created_by',
-    ).order_by('activity__project__project_code', 'activity__activity_number', 'expense_date')
-
-    if project_id:
-        expenses = expenses.filter(activity__project_id=project_id)
-    if date_from:
-        expenses = expenses.filter(expense_date__gte=date_from)
-    if date_to:
-        expenses = expenses.filter(expense_date__lte=date_to)
-
-    fiscal_year = fiscal_years.filter(pk=fy_id).first() if fy_id else fiscal_years.filter(is_active=True).first()
-    fy_label = f"ปีงบประมาณ {fiscal_year.year}" if fiscal_year else ""
+    report = ReportFilter.from_request(request)
+    expenses = report.expenses()
+    fy_label = report.fy_label
 
     wb = openpyxl.Workbook()
     ws = wb.active
@@ -514,7 +347,7 @@ def project_report(request, pk):
     ).order_by('activity_number')
 
     expenses = Expense.objects.filter(
-        activity__project=project, status='approved',
+        project=project, status='approved',
     ).select_related('activity', 'created_by').order_by(
         'activity__activity_number', 'expense_date'
     )
@@ -534,47 +367,24 @@ def project_report(request, pk):
 
 @login_required
 def budget_report_pdf(request):
-    fiscal_years = FiscalYear.objects.all().order_by('-year')
-    fy_id = request.GET.get('fiscal_year')
-    dept_id = request.GET.get('department')
-    status = request.GET.get('status')
+    report = ReportFilter.from_request(request)
+    fiscal_year = report.fiscal_year
 
-    projects = get_viewable_projects(request.user)
-    if fy_id:
-        projects = projects.filter(fiscal_year_id=fy_id)
-    else:
-        active_fy = fiscal_years.filter(is_active=True).first()
-        if active_fy:
-            fy_id = str(active_fy.pk)
-            projects = projects.filter(fiscal_year=active_fy)
-    if dept_id:
-        projects = projects.filter(department_id=dept_id)
-    if status:
-        projects = projects.filter(status=status)
-
-    projects = projects.prefetch_related(
-        'budget_sources', 'activities', 'department'
-    ).annotate(
-        code_num=Cast('project_code', FloatField())
-    ).order_by('code_num', 'project_code')
-
-    fiscal_year = fiscal_years.filter(pk=fy_id).first() if fy_id else None
-    dept_obj = Department.objects.filter(pk=dept_id).first() if dept_id else None
-
-    project_list = list(projects)
-    total_budget = sum(_currency(p.total_budget) for p in project_list)
-    total_spent = sum(_currency(p.total_spent) for p in project_list)
-    total_remaining = total_budget - total_spent
-    total_pct = (total_spent / total_budget * 100) if total_budget > 0 else 0
+    project_list = report.project_rows()
+    totals = report.summary()
+    total_budget = totals['total_budget']
+    total_spent = totals['total_spent']
+    total_remaining = totals['total_remaining']
+    total_pct = totals['total_pct']
 
     # Build subtitle from filters
     parts = []
     if fiscal_year:
-        parts.append(f"ปีงบประมาณ {fiscal_year.year}")
-    if dept_obj:
-        parts.append(dept_obj.name)
-    if status:
-        parts.append(f"สถานะ: {dict(Project.STATUS_CHOICES).get(status, status)}")
+        parts.append(report.fy_label)
+    if report.department:
+        parts.append(report.dept_label)
+    if report.status:
+        parts.append(f"สถานะ: {report.status_label}")
     parts.append(f"ออกรายงาน: {pdf_thaidate(timezone.now().date())}")
     subtitle = "  |  ".join(parts)
 
@@ -621,7 +431,6 @@ def budget_report_pdf(request):
     ]
     data = [headers]
 
-    project_list = list(projects)
     for i, p in enumerate(project_list):
         bs = p.budget_by_source
         gov  = _currency(bs.get('government', 0))
@@ -645,12 +454,9 @@ def budget_report_pdf(request):
             Paragraph(fmt_currency(acc) if acc else '—', styles['td_r']),
             Paragraph(fmt_currency(rev) if rev else '—', styles['td_r']),
             Paragraph(fmt_currency(total), styles['td_bold_r']),
-            Paragraph(fmt_currency(spent), ParagraphStyle('sp', fontName='THSarabunNew',
-                      fontSize=9, alignment=2, textColor=pc)),
-            Paragraph(fmt_currency(remaining), ParagraphStyle('rem', fontName='THSarabunNew',
-                      fontSize=9, alignment=2, textColor=C_EMERALD)),
-            Paragraph(f"{pct:.1f}%", ParagraphStyle('pct', fontName='THSarabunNew-Bold',
-                      fontSize=9, alignment=2, textColor=pc)),
+            Paragraph(fmt_currency(spent), tinted(styles, 'cell_r', pc)),
+            Paragraph(fmt_currency(remaining), tinted(styles, 'cell_r', C_EMERALD)),
+            Paragraph(f"{pct:.1f}%", tinted(styles, 'cell_bold_r', pc)),
         ]
         data.append(row)
 
@@ -706,17 +512,14 @@ def budget_report_pdf(request):
 
 # ─── 5. Project Detail PDF ───────────────────────────────────────────────────
 
-@login_required
-def project_report_pdf(request, pk):
-    projects_qs = get_viewable_projects(request.user)
-    project = get_object_or_404(projects_qs, pk=pk)
-
+def render_project_pdf(project):
+    """PDF รายงานโครงการ (bytes) — ใช้ทั้งดาวน์โหลดทีละโครงการและชุด ZIP (apps/reports/bundle.py)"""
     activities = project.activities.prefetch_related(
         'responsible_persons'
     ).order_by('activity_number')
 
     expenses = Expense.objects.filter(
-        activity__project=project, status='approved',
+        project=project, status='approved',
     ).select_related('activity', 'created_by', 'approved_by').order_by(
         'activity__activity_number', 'expense_date'
     )
@@ -768,9 +571,7 @@ def project_report_pdf(request, pk):
 
     # ── Activities Table ────────────────────────────────────────────────────
 
-    story.append(Paragraph("กิจกรรมโครงการ", ParagraphStyle(
-        'sec', fontName='THSarabunNew-Bold', fontSize=12, leading=16,
-        textColor=C_HEADER_BG)))
+    story.append(Paragraph("กิจกรรมโครงการ", styles['section']))
     story.append(Spacer(1, 4))
 
     act_widths = [0.8*cm, 5.0*cm, 1.8*cm, 2.0*cm, 2.0*cm, 2.2*cm, 2.2*cm, 2.2*cm, 2.0*cm]
@@ -800,12 +601,9 @@ def project_report_pdf(request, pk):
             Paragraph(pdf_thaidate(act.start_date), styles['td_c']),
             Paragraph(pdf_thaidate(act.end_date), styles['td_c']),
             Paragraph(fmt_currency(a_budget), styles['td_r']),
-            Paragraph(fmt_currency(a_spent), ParagraphStyle('as', fontName='THSarabunNew',
-                      fontSize=9, alignment=2, textColor=pc)),
-            Paragraph(fmt_currency(a_remaining), ParagraphStyle('ar', fontName='THSarabunNew',
-                      fontSize=9, alignment=2, textColor=C_EMERALD)),
-            Paragraph(f"{a_pct:.1f}%", ParagraphStyle('ap', fontName='THSarabunNew-Bold',
-                      fontSize=9, alignment=2, textColor=pc)),
+            Paragraph(fmt_currency(a_spent), tinted(styles, 'cell_r', pc)),
+            Paragraph(fmt_currency(a_remaining), tinted(styles, 'cell_r', C_EMERALD)),
+            Paragraph(f"{a_pct:.1f}%", tinted(styles, 'cell_bold_r', pc)),
         ])
 
     act_n = len(act_data)
@@ -821,9 +619,7 @@ def project_report_pdf(request, pk):
 
     # ── Expenses Table ──────────────────────────────────────────────────────
 
-    story.append(Paragraph("รายการเบิกจ่าย (อนุมัติแล้ว)", ParagraphStyle(
-        'sec2', fontName='THSarabunNew-Bold', fontSize=12, leading=16,
-        textColor=C_HEADER_BG)))
+    story.append(Paragraph("รายการเบิกจ่าย (อนุมัติแล้ว)", styles['section']))
     story.append(Spacer(1, 4))
 
     exp_widths = [2.8*cm, 4.8*cm, 3.2*cm, 2.2*cm, 2.2*cm, 2.4*cm, 2.6*cm]
@@ -885,9 +681,112 @@ def project_report_pdf(request, pk):
     ))
 
     doc.build(story)
-    buf.seek(0)
+    return buf.getvalue()
 
-    safe_code = (project.project_code or str(pk)).replace('/', '_')
-    response = HttpResponse(buf.read(), content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="project_{safe_code}.pdf"'
+
+def project_pdf_filename(project):
+    safe_code = (project.project_code or str(project.pk)).replace('/', '_')
+    return f'project_{safe_code}.pdf'
+
+
+@login_required
+def project_report_pdf(request, pk):
+    projects_qs = get_viewable_projects(request.user)
+    project = get_object_or_404(projects_qs, pk=pk)
+    response = HttpResponse(render_project_pdf(project), content_type='application/pdf')
+    response['Content-Disposition'] = f'attachment; filename="{project_pdf_filename(project)}"'
     return response
+
+
+# ─── 6. Project PDF Bundle (ZIP, background job) ─────────────────────────────
+
+@login_required
+@require_POST
+def project_pdf_bundle(request):
+    """สั่งสร้าง PDF รายโครงการของทุกโครงการตามตัวกรองของรายงานภาพรวม รวมเป็น ZIP (งานเบื้องหลัง)"""
+    report = ReportFilter.from_request(request, request.POST)
+    params = report.params
+
+    job = runner.enqueue('project_pdf_bundle', request.user, {
+        'project_ids': list(report.projects().values_list('pk', flat=True)),
+        'filters': {k: params[k] for k in ('fiscal_year', 'department', 'status')},
+    })
+    return redirect('jobs:job_detail', pk=job.pk)
+
+
+# ─── 7. CSV / TSV Export (streaming) ─────────────────────────────────────────
+
+BUDGET_EXPORT_HEADER = [
+    'รหัส', 'ชื่อโครงการ', 'แผนก', 'สถานะ',
+    'เงินแผ่นดิน', 'เงินสะสม', 'เงินรายได้',
+    'งบรวม', 'ใช้ไป', 'คงเหลือ', '% ใช้',
+]
+EXPENSE_EXPORT_HEADER = [
+    'รหัสโครงการ', 'ชื่อโครงการ', 'ลำดับกิจกรรม', 'กิจกรรม', 'รายการ',
+    'เลขที่ใบเสร็จ', 'วันที่', 'แหล่งเงิน', 'จำนวนเงิน', 'อนุมัติโดย',
+]
+
+
+def _budget_export_rows(projects):
+    """แถวของรายงานภาพรวมงบ — ยอดแหล่งเงินและยอดใช้ไปเป็น subquery ในแถวเดียวกัน"""
+    def source_amount(source_type):
+        return Subquery(
+            ProjectBudgetSource.objects.filter(project=OuterRef('pk'), source_type=source_type)
+            .values('amount')[:1]
+        )
+
+    spent = Subquery(
+        Expense.objects.filter(project=OuterRef('pk'), status='approved').order_by()
+        .values('project').annotate(total=Sum('amount')).values('total')
+    )
+    rows = projects.annotate(
+        gov=source_amount('government'),
+        acc=source_amount('accumulated'),
+        rev=source_amount('revenue'),
+        spent=Coalesce(spent, Value(0), output_field=DecimalField(max_digits=14, decimal_places=2)),
+    ).values_list(
+        'project_code', 'name', 'department__name', 'status', 'gov', 'acc', 'rev', 'total_budget', 'spent',
+    ).iterator(chunk_size=streaming.ITERATOR_CHUNK_SIZE)
+
+    status_labels = dict(Project.STATUS_CHOICES)
+    for code, name, dept, status, gov, acc, rev, total, spent in rows:
+        pct = (spent / total * 100) if total else 0
+        yield [
+            code, name, dept or '', status_labels.get(status, status),
+            gov or 0, acc or 0, rev or 0, total, spent, total - spent, f'{pct:.1f}',
+        ]
+
+
+def _expense_export_rows(expenses):
+    rows = expenses.values_list(
+        'project__project_code', 'project__name', 'activity__activity_number', 'activity__name',
+        'description', 'receipt_number', 'expense_date', 'budget_source', 'amount',
+        'approved_by__first_name', 'approved_by__last_name',
+    ).iterator(chunk_size=streaming.ITERATOR_CHUNK_SIZE)
+
+    source_labels = dict(SOURCE_CHOICES)
+    for code, name, number, activity, desc, receipt, day, source, amount, first, last in rows:
+        yield [
+            code, name, number, activity, desc, receipt or '', day.isoformat(),
+            source_labels.get(source, source or ''), amount, f'{first or ""} {last or ""}'.strip(),
+        ]
+
+
+@login_required
+def budget_report_export(request):
+    """รายงานภาพรวมงบเป็น CSV/TSV (?format=csv|tsv) ตามตัวกรองเดียวกับหน้ารายงาน"""
+    report = ReportFilter.from_request(request)
+    suffix = f'_{report.fiscal_year.year}' if report.fiscal_year else ''
+    return streaming.export_response(
+        request, f'budget_report{suffix}', BUDGET_EXPORT_HEADER, _budget_export_rows(report.projects()),
+    )
+
+
+@login_required
+def expense_report_export(request):
+    """รายการเบิกจ่ายที่อนุมัติแล้วเป็น CSV/TSV (?format=csv|tsv)"""
+    report = ReportFilter.from_request(request)
+    suffix = f'_{report.fiscal_year.year}' if report.fiscal_year else ''
+    return streaming.export_response(
+        request, f'expense_report{suffix}', EXPENSE_EXPORT_HEADER, _expense_export_rows(report.expenses()),
+    )
@@ -0,0 +1,126 @@
+"""สร้าง/ลบเอกสารในดัชนีค้นหา — เรียกจาก signals และคำสั่ง rebuild_search_index"""
+from .models import SearchDocument, SearchToken
+from .tokenizer import exact_token, tokenize
+
+WEIGHT_EXACT = 8   # รหัสโครงการ / เลขที่ใบเสร็จ ตรงทั้งหมด
+WEIGHT_TITLE = 3   # ชื่อโครงการ / กิจกรรม / รายการ
+WEIGHT_BODY = 1    # รายละเอียด / หมายเหตุ
+
+
+def _weighted_tokens(parts):
+    """parts: [(ข้อความ, น้ำหนัก), ...] → {token: น้ำหนักสูงสุด}"""
+    weights = {}
+    for text, weight in parts:
+        for token in tokenize(text):
+            if weights.get(token, 0) < weight:
+                weights[token] = weight
+    return weights
+
+
+def _with_exact(weights, *values):
+    for value in values:
+        token = exact_token(value)
+        if token:
+            weights[token] = max(weights.get(token, 0), WEIGHT_EXACT)
+    return weights
+
+
+def project_entry(project):
+    fields = {
+        'project_id': project.pk,
+        'department_id': project.department_id,
+        'fiscal_year_id': project.fiscal_year_id,
+        'title': f'{project.project_code} {project.name}'[:500],
+    }
+    weights = _weighted_tokens([
+        (project.project_code, WEIGHT_TITLE),
+        (project.name, WEIGHT_TITLE),
+        (project.description, WEIGHT_BODY),
+    ])
+    return fields, _with_exact(weights, project.project_code)
+
+
+def activity_entry(activity):
+    project = activity.project
+    fields = {
+        'project_id': project.pk,
+        'department_id': project.department_id,
+        'fiscal_year_id': project.fiscal_year_id,
+        'title': activity.name[:500],
+    }
+    weights = _weighted_tokens([
+        (activity.name, WEIGHT_TITLE),
+        (activity.description, WEIGHT_BODY),
+    ])
+    return fields, weights
+
+
+def expense_entry(expense):
+    project = expense.activity.project
+    fields = {
+        'project_id': project.pk,
+        'department_id': project.department_id,
+        'fiscal_year_id': project.fiscal_year_id,
+        'title': expense.description[:500],
+    }
+    weights = _weighted_tokens([
+        (expense.description, WEIGHT_TITLE),
+        (expense.receipt_number, WEIGHT_TITLE),
+        (expense.remark, WEIGHT_BODY),
+    ])
+    return fields, _with_exact(weights, expense.receipt_number)
+
+
+ENTRY_BUILDERS = {
+    SearchDocument.KIND_PROJECT: project_entry,
+    SearchDocument.KIND_ACTIVITY: activity_entry,
+    SearchDocument.KIND_EXPENSE: expense_entry,
+}
+
+
+def index_object(kind, obj):
+    """สร้างหรือแทนที่เอกสารของ object เดียว"""
+    fields, weights = ENTRY_BUILDERS[kind](obj)
+    document, created = SearchDocument.objects.update_or_create(
+        kind=kind, object_id=obj.pk, defaults=fields,
+    )
+    if not created:
+        SearchToken.objects.filter(document=document).delete()
+    SearchToken.objects.bulk_create([
+        SearchToken(token=token, document=document, weight=weight)
+        for token, weight in weights.items()
+    ])
+
+
+def remove_object(kind, object_id):
+    SearchToken.objects.filter(document__kind=kind, document__object_id=object_id).delete()
+    SearchDocument.objects.filter(kind=kind, object_id=object_id).delete()
+
+
+def index_objects(kind, objects):
+    """สร้างเอกสารของหลาย object พร้อมกัน (ใช้กับ import / rebuild)
+
+    objects ต้องโหลด relation ที่ตัวสร้างเอกสารใช้มาแล้ว (เช่น select_related project)
+    """
+    entries = {obj.pk: ENTRY_BUILDERS[kind](obj) for obj in objects}
+    if not entries:
+        return 0
+
+    object_ids = list(entries)
+    SearchToken.objects.filter(document__kind=kind, document__object_id__in=object_ids).delete()
+    SearchDocument.objects.filter(kind=kind, object_id__in=object_ids).delete()
+    SearchDocument.objects.bulk_create([
+        SearchDocument(kind=kind, object_id=pk, **fields)
+        for pk, (fields, _) in entries.items()
+    ])
+    # MySQL ไม่คืน PK จาก bulk_create — อ่าน id กลับมาอีกครั้ง
+    document_ids = dict(
+        SearchDocument.objects.filter(kind=kind, object_id__in=object_ids)
+        .values_list('object_id', 'id')
+    )
+    SearchToken.objects.bulk_create([
+        SearchToken(token=token, document_id=document_ids[pk], weight=weight)
+        for pk, (_, weights) in entries.items()
+        for token, weight in weights.items()
+    ], batch_size=2000)
+    return len(entries)
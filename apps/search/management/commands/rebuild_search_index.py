@@ -0,0 +1,38 @@
+"""Management command: สร้างดัชนีค้นหาใหม่ทั้งหมด"""
+from django.core.management.base import BaseCommand
+
+from apps.budget.models import Expense
+from apps.projects.models import Activity, Project
+from apps.search.indexing import index_objects
+from apps.search.models import SearchDocument, SearchToken
+
+
+class Command(BaseCommand):
+    help = "Rebuild the search index for projects, activities and expenses"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        SearchToken.objects.all().delete()
+        SearchDocument.objects.all().delete()
+
+        sources = [
+            (SearchDocument.KIND_PROJECT, Project.objects.all()),
+            (SearchDocument.KIND_ACTIVITY, Activity.objects.select_related('project')),
+            (SearchDocument.KIND_EXPENSE, Expense.objects.select_related('activity__project')),
+        ]
+        for kind, queryset in sources:
+            total = 0
+            batch = []
+            for obj in queryset.order_by('pk').iterator(chunk_size=batch_size):
+                batch.append(obj)
+                if len(batch) >= batch_size:
+                    total += index_objects(kind, batch)
+                    batch = []
+            total += index_objects(kind, batch)
+            self.stdout.write(f'{kind}: {total} documents')
+
+        self.stdout.write(self.style.SUCCESS('Done — search index rebuilt.'))
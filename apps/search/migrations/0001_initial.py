@@ -0,0 +1,47 @@
+# Generated by Django 5.1.15 on 2026-10-19 14:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('project', 'โครงการ'), ('activity', 'กิจกรรม'), ('expense', 'รายการเบิกจ่าย')], max_length=10, verbose_name='ประเภท')),
+                ('object_id', models.BigIntegerField(verbose_name='ID ต้นทาง')),
+                ('project_id', models.BigIntegerField(db_index=True, verbose_name='ID โครงการ')),
+                ('department_id', models.BigIntegerField(blank=True, db_index=True, null=True, verbose_name='ID แผนก')),
+                ('fiscal_year_id', models.BigIntegerField(blank=True, null=True, verbose_name='ID ปีงบประมาณ')),
+                ('title', models.CharField(max_length=500, verbose_name='หัวเรื่อง')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='ปรับปรุงเมื่อ')),
+            ],
+            options={
+                'verbose_name': 'เอกสารค้นหา',
+                'verbose_name_plural': 'เอกสารค้นหา',
+                'unique_together': {('kind', 'object_id')},
+            },
+        ),
+        migrations.CreateModel(
+            name='SearchToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=32, verbose_name='คำ')),
+                ('weight', models.PositiveSmallIntegerField(default=1, verbose_name='น้ำหนัก')),
+                ('document', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tokens', to='search.searchdocument', verbose_name='เอกสาร')),
+            ],
+            options={
+                'verbose_name': 'คำค้น',
+                'verbose_name_plural': 'คำค้น',
+                'unique_together': {('token', 'document')},
+            },
+        ),
+    ]
@@ -0,0 +1,53 @@
+from django.db import models
+
+
+class SearchDocument(models.Model):
+    """เอกสารค้นหา 1 แถวต่อ 1 object (โครงการ / กิจกรรม / รายการเบิกจ่าย)
+
+    เก็บคีย์สำหรับกรองสิทธิ์ (project/department/fiscal_year) ไว้ในตารางเดียว
+    การค้นหาและจัดอันดับจึงไม่ต้อง join กลับไปตารางต้นทาง
+    """
+    KIND_PROJECT = 'project'
+    KIND_ACTIVITY = 'activity'
+    KIND_EXPENSE = 'expense'
+    KIND_CHOICES = [
+        (KIND_PROJECT, 'โครงการ'),
+        (KIND_ACTIVITY, 'กิจกรรม'),
+        (KIND_EXPENSE, 'รายการเบิกจ่าย'),
+    ]
+
+    kind = models.CharField('ประเภท', max_length=10, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField('ID ต้นทาง')
+    project_id = models.BigIntegerField('ID โครงการ', db_index=True)
+    department_id = models.BigIntegerField('ID แผนก', null=True, blank=True, db_index=True)
+    fiscal_year_id = models.BigIntegerField('ID ปีงบประมาณ', null=True, blank=True)
+    title = models.CharField('หัวเรื่อง', max_length=500)
+    updated_at = models.DateTimeField('ปรับปรุงเมื่อ', auto_now=True)
+
+    class Meta:
+        verbose_name = 'เอกสารค้นหา'
+        verbose_name_plural = 'เอกสารค้นหา'
+        unique_together = ['kind', 'object_id']
+
+    def __str__(self):
+        return f'[{self.kind}] {self.title}'
+
+
+class SearchToken(models.Model):
+    """Inverted index: token → เอกสาร พร้อมน้ำหนักสำหรับจัดอันดับ"""
+    token = models.CharField('คำ', max_length=32)
+    document = models.ForeignKey(
+        SearchDocument,
+        on_delete=models.CASCADE,
+        related_name='tokens',
+        verbose_name='เอกสาร',
+    )
+    weight = models.PositiveSmallIntegerField('น้ำหนัก', default=1)
+
+    class Meta:
+        verbose_name = 'คำค้น'
+        verbose_name_plural = 'คำค้น'
+        unique_together = ['token', 'document']
+
+    def __str__(self):
+        return f'{self.token} → {self.document_id}'
@@ -0,0 +1,101 @@
+"""ค้นหาจากดัชนี — ทุกคำของคำค้นต้องพบในเอกสาร แล้วจัดอันดับตามผลรวมน้ำหนัก
+
+- คำที่เป็นรหัส (มีตัวคั่น เช่น 1.1, 67-001, RC/2567) ต้องตรงกับ token รหัสทั้งก้อน ไม่แยกเป็นส่วนย่อย
+  (รหัสบางส่วน เช่น "67-0" ไม่พบในดัชนี จึงไปใช้ icontains)
+- คำละติน/ตัวเลขอื่นจับคู่แบบขึ้นต้น — "rc" เจอ "rc2567", "256" เจอ "2567"
+- คำไทยจับคู่ token ตรงตัว — อักษรไทยตัวเดียวค้นจากดัชนี bigram ไม่ได้
+
+ถ้าดัชนีตอบคำค้นไม่ได้หรือไม่พบอะไร จะใช้ icontains บนฟิลด์ต้นทางแทน (filter_objects / search)
+"""
+import re
+
+from django.db.models import Q, Sum
+from django.db.models.functions import Coalesce
+
+from apps.projects.utils import get_viewable_projects
+
+from .models import SearchDocument, SearchToken
+from .tokenizer import MAX_TOKEN_LENGTH, exact_token, normalize, tokenize
+
+_CODE_RE = re.compile(r'[0-9a-z]+(?:[^\s0-9a-z\u0e00-\u0e7f]+[0-9a-z]*)+')
+_LATIN_RE = re.compile(r'[0-9a-z]+')
+
+
+def _query_terms(query):
+    """list ของ (token, จับคู่แบบขึ้นต้น) ที่ต้องพบทุกตัว — None ถ้าดัชนีตอบคำค้นนี้ไม่ได้"""
+    terms = []
+    for word in normalize(query).split():
+        if _CODE_RE.fullmatch(word):
+            terms.append((word[:MAX_TOKEN_LENGTH], False))
+            continue
+        for token in tokenize(word):
+            if _LATIN_RE.fullmatch(token):
+                terms.append((token, True))
+            elif len(token) == 1:
+                return None
+            else:
+                terms.append((token, False))
+    return list(dict.fromkeys(terms)) or None
+
+
+def _term_q(token, prefix, field='token'):
+    return Q(**{f'{field}__startswith' if prefix else field: token})
+
+
+def _matching_documents(documents, terms):
+    for token, prefix in terms:
+        documents = documents.filter(
+            pk__in=SearchToken.objects.filter(_term_q(token, prefix)).values('document_id')
+        )
+    return documents
+
+
+def matching_object_ids(kind, query):
+    """Subquery ของ object_id ที่ดัชนีพบ — None ถ้าดัชนีตอบคำค้นนี้ไม่ได้"""
+    terms = _query_terms(query)
+    if terms is None:
+        return None
+    return _matching_documents(SearchDocument.objects.filter(kind=kind), terms).values('object_id')
+
+
+def filter_objects(queryset, kind, query, fallback_fields):
+    """กรอง queryset ต้นทางด้วยคำค้น เช่น
+    filter_objects(projects, 'project', q, ('project_code', 'name'))
+
+    ใช้ดัชนีก่อน — ถ้าดัชนีตอบไม่ได้หรือไม่พบใน queryset จึงใช้ icontains บน fallback_fields
+    """
+    matched = matching_object_ids(kind, query)
+    if matched is not None:
+        indexed = queryset.filter(pk__in=matched)
+        if indexed.exists():
+            return indexed
+    condition = Q()
+    for field in fallback_fields:
+        condition |= Q(**{f'{field}__icontains': query.strip()})
+    return queryset.filter(condition)
+
+
+def search(user, query, kinds=None, limit=30):
+    """คืน list ของ SearchDocument ที่ผู้ใช้มีสิทธิ์เห็น เรียงตามคะแนน (attribute score)"""
+    documents = SearchDocument.objects.filter(project_id__in=get_viewable_projects(user).values('pk'))
+    if kinds:
+        documents = documents.filter(kind__in=kinds)
+
+    results = []
+    terms = _query_terms(query)
+    if terms is not None:
+        # คะแนน = น้ำหนักของ token ที่ตรงกับคำค้น + โบนัสเมื่อรหัสตรงทั้งก้อน
+        matched = Q()
+        for token, prefix in terms:
+            matched |= _term_q(token, prefix, 'tokens__token')
+        exact = Sum('tokens__weight', filter=Q(tokens__token=exact_token(query)))
+        results = list(
+            _matching_documents(documents, terms)
+            .annotate(score=Sum('tokens__weight', filter=matched) + Coalesce(exact, 0))
+            .order_by('-score', '-id')[:limit]
+        )
+    if not results:
+        results = list(documents.filter(title__icontains=query.strip()).order_by('-id')[:limit])
+        for document in results:
+            document.score = 0
+    return results
@@ -0,0 +1,61 @@
+"""ปรับดัชนีค้นหาตามการบันทึก/ลบ โครงการ กิจกรรม และรายการเบิกจ่าย"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.budget.models import Expense
+from apps.projects.models import Activity, Project
+
+from .indexing import index_object, remove_object
+from .models import SearchDocument, SearchToken
+
+# ฟิลด์ที่มีผลต่อดัชนี — save(update_fields=...) ที่ไม่แตะฟิลด์เหล่านี้ไม่ต้องสร้างเอกสารใหม่
+INDEXED_FIELDS = {
+    SearchDocument.KIND_PROJECT: {'project_code', 'name', 'description', 'department', 'fiscal_year'},
+    SearchDocument.KIND_ACTIVITY: {'name', 'description', 'project'},
+    SearchDocument.KIND_EXPENSE: {'description', 'receipt_number', 'remark', 'activity'},
+}
+
+
+def _needs_index(kind, raw, update_fields):
+    if raw:
+        return False
+    return update_fields is None or bool(INDEXED_FIELDS[kind] & set(update_fields))
+
+
+@receiver(post_save, sender=Project)
+def index_project(sender, instance, raw=False, update_fields=None, **kwargs):
+    if not _needs_index(SearchDocument.KIND_PROJECT, raw, update_fields):
+        return
+    index_object(SearchDocument.KIND_PROJECT, instance)
+    # กิจกรรม/รายการเบิกจ่ายของโครงการนี้ใช้ขอบเขตสิทธิ์ตามโครงการ
+    SearchDocument.objects.filter(project_id=instance.pk).exclude(
+        department_id=instance.department_id, fiscal_year_id=instance.fiscal_year_id,
+    ).update(department_id=instance.department_id, fiscal_year_id=instance.fiscal_year_id)
+
+
+@receiver(post_delete, sender=Project)
+def unindex_project(sender, instance, **kwargs):
+    SearchToken.objects.filter(document__project_id=instance.pk).delete()
+    SearchDocument.objects.filter(project_id=instance.pk).delete()
+
+
+@receiver(post_save, sender=Activity)
+def index_activity(sender, instance, raw=False, update_fields=None, **kwargs):
+    if _needs_index(SearchDocument.KIND_ACTIVITY, raw, update_fields):
+        index_object(SearchDocument.KIND_ACTIVITY, instance)
+
+
+@receiver(post_delete, sender=Activity)
+def unindex_activity(sender, instance, **kwargs):
+    remove_object(SearchDocument.KIND_ACTIVITY, instance.pk)
+
+
+@receiver(post_save, sender=Expense)
+def index_expense(sender, instance, raw=False, update_fields=None, **kwargs):
+    if _needs_index(SearchDocument.KIND_EXPENSE, raw, update_fields):
+        index_object(SearchDocument.KIND_EXPENSE, instance)
+
+
+@receiver(post_delete, sender=Expense)
+def unindex_expense(sender, instance, **kwargs):
+    remove_object(SearchDocument.KIND_EXPENSE, instance.pk)
@@ -0,0 +1,65 @@
+"""ตัดคำสำหรับดัชนีค้นหา — รองรับภาษาไทยซึ่งไม่มีช่องว่างระหว่างคำ
+
+ข้อความถูกแยกเป็นช่วงอักษรไทย และช่วงอักษรละติน/ตัวเลข
+- ละติน/ตัวเลข: 1 คำ = 1 token
+- ไทย: ตาม SEARCH_THAI_SEGMENTER
+    'ngram'    (ค่าเริ่มต้น) — bigram ของตัวอักษร ค้นหาส่วนใดของคำก็เจอ ไม่ต้องพึ่งพจนานุกรม
+    'pythainlp' — ตัดคำด้วยพจนานุกรม (newmm) ถ้าติดตั้ง pythainlp ไว้ ไม่เช่นนั้นใช้ bigram
+
+ดัชนีกับคำค้นต้องใช้วิธีเดียวกัน — เปลี่ยนค่า setting แล้วต้องรัน rebuild_search_index
+"""
+import logging
+import re
+import unicodedata
+from functools import lru_cache
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+MAX_TOKEN_LENGTH = 32
+
+_RUN_RE = re.compile(r'[\u0e00-\u0e7f]+|[0-9a-z]+')
+_THAI_DIGITS = str.maketrans('๐๑๒๓๔๕๖๗๘๙', '0123456789')
+
+
+def normalize(text):
+    return unicodedata.normalize('NFC', text or '').translate(_THAI_DIGITS).casefold()
+
+
+@lru_cache(maxsize=1)
+def _thai_word_tokenize():
+    if getattr(settings, 'SEARCH_THAI_SEGMENTER', 'ngram') != 'pythainlp':
+        return None
+    try:
+        from pythainlp.tokenize import word_tokenize
+    except ImportError:
+        logger.warning('SEARCH_THAI_SEGMENTER=pythainlp แต่ไม่ได้ติดตั้ง pythainlp — ใช้ bigram แทน')
+        return None
+    return lambda text: word_tokenize(text, engine='newmm', keep_whitespace=False)
+
+
+def _thai_tokens(run):
+    segment = _thai_word_tokenize()
+    if segment is not None:
+        return [w for w in segment(run) if w.strip()]
+    if len(run) == 1:
+        return [run]
+    return [run[i:i + 2] for i in range(len(run) - 1)]
+
+
+def tokenize(text):
+    """คืน list ของ token (ซ้ำได้ ตามลำดับในข้อความ)"""
+    tokens = []
+    for run in _RUN_RE.findall(normalize(text)):
+        if '\u0e00' <= run[0] <= '\u0e7f':
+            tokens.extend(_thai_tokens(run))
+        else:
+            tokens.append(run)
+    return [t[:MAX_TOKEN_LENGTH] for t in tokens]
+
+
+def exact_token(text):
+    """token ของข้อความทั้งก้อน (เช่น รหัสโครงการ / เลขที่ใบเสร็จ) สำหรับให้คะแนนเมื่อตรงทั้งหมด"""
+    value = normalize(text).strip()
+    return value[:MAX_TOKEN_LENGTH] if value else ''
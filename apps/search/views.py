@@ -0,0 +1,84 @@
+from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
+from django.shortcuts import render
+from django.urls import reverse
+
+from apps.budget.models import Expense
+from apps.projects.models import Activity, Project
+
+from .models import SearchDocument
+from .query import search
+
+KIND_LABELS = dict(SearchDocument.KIND_CHOICES)
+
+
+def _build_results(documents):
+    """แปลงเอกสารค้นหาเป็นข้อมูลแสดงผล โดยโหลด object จริงแบบ batch (ไม่เกิน 3 query)"""
+    ids = {kind: [] for kind in KIND_LABELS}
+    for document in documents:
+        ids[document.kind].append(document.object_id)
+
+    projects = Project.objects.select_related('fiscal_year').in_bulk(ids[SearchDocument.KIND_PROJECT])
+    activities = Activity.objects.select_related('project').in_bulk(ids[SearchDocument.KIND_ACTIVITY])
+    expenses = Expense.objects.select_related('activity__project').in_bulk(ids[SearchDocument.KIND_EXPENSE])
+
+    results = []
+    for document in documents:
+        if document.kind == SearchDocument.KIND_PROJECT:
+            project = projects.get(document.object_id)
+            if project is None:
+                continue
+            title = f'{project.project_code} {project.name}'
+            subtitle = f'{project.fiscal_year} · {project.get_status_display()}'
+            url = reverse('projects:project_detail', kwargs={'pk': project.pk})
+        elif document.kind == SearchDocument.KIND_ACTIVITY:
+            activity = activities.get(document.object_id)
+            if activity is None:
+                continue
+            title = f'กิจกรรมที่ {activity.activity_number} {activity.name}'
+            subtitle = f'{activity.project.project_code} {activity.project.name}'
+            url = reverse('projects:activity_detail', kwargs={
+                'project_pk': activity.project_id, 'pk': activity.pk,
+            })
+        else:
+            expense = expenses.get(document.object_id)
+            if expense is None:
+                continue
+            title = expense.description
+            receipt = f'ใบเสร็จ {expense.receipt_number} · ' if expense.receipt_number else ''
+            subtitle = (
+                f'{receipt}{expense.amount:,.2f} บาท · '
+                f'{expense.activity.project.project_code} / {expense.activity.name}'
+            )
+            url = reverse('projects:activity_detail', kwargs={
+                'project_pk': expense.activity.project_id, 'pk': expense.activity_id,
+            }) + '#expenses'
+        results.append({
+            'kind': document.kind,
+            'kind_label': KIND_LABELS[document.kind],
+            'title': title,
+            'subtitle': subtitle,
+            'url': url,
+            'score': document.score,
+        })
+    return results
+
+
+@login_required
+def global_search(request):
+    query = request.GET.get('q', '').strip()
+    kind = request.GET.get('kind', '')
+    kinds = [kind] if kind in KIND_LABELS else None
+
+    results = _build_results(search(request.user, query, kinds=kinds)) if query else []
+
+    if request.GET.get('format') == 'json':
+        return JsonResponse({'query': query, 'results': results})
+
+    context = {
+        'query': query,
+        'results': results,
+        'kind_choices': SearchDocument.KIND_CHOICES,
+        'current_kind': kind,
+    }
+    return render(request, 'search/results.html', context)
@@ -2,6 +2,7 @@ import os
 from pathlib import Path
 
 import environ
+from celery.schedules import crontab
 
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
 
@@ -27,6 +28,8 @@ INSTALLED_APPS = [
     'apps.notifications',
     'apps.reports',
     'apps.dashboard',
+    'apps.search',
+    'apps.jobs',
 ]
 
 MIDDLEWARE = [
@@ -94,6 +97,35 @@ CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'Asia/Bangkok'
 CELERY_BEAT_SCHEDULER = 'django_celery_beat.schedulers:DatabaseScheduler'
+CELERY_TASK_ALWAYS_EAGER = env.bool('CELERY_TASK_ALWAYS_EAGER', default=False)
+# งานตามเวลา — DatabaseScheduler คัดลอกรายการนี้ลงตาราง django_celery_beat ตอน beat เริ่มทำงาน
+CELERY_BEAT_SCHEDULE = {
+    'reconcile-budgets': {
+        'task': 'apps.budget.tasks.reconcile_budgets',
+        'schedule': crontab(hour=2, minute=30),
+        # True = ซ่อมรายการที่ซ่อมได้อัตโนมัติ (ค่าเริ่มต้นรายงานใน log อย่างเดียว)
+        'kwargs': {'repair': env.bool('BUDGET_RECONCILE_REPAIR', default=False)},
+    },
+}
+
+# งานเบื้องหลัง (apps.jobs) — 'thread': รันใน process ของเว็บ (Waitress บน Windows ไม่มี worker)
+# 'celery': ส่งให้ Celery worker (ตั้ง CELERY_TASK_ALWAYS_EAGER=True เพื่อรันทันทีตอนพัฒนา/ทดสอบ)
+JOBS_BACKEND = env('JOBS_BACKEND', default='thread')
+
+# รายการโครงการ — จำนวนต่อหน้าที่เลือกได้ (ค่าแรกเป็นค่าเริ่มต้น)
+PROJECT_LIST_PAGE_SIZES = env.list('PROJECT_LIST_PAGE_SIZES', cast=int, default=[25, 50, 100])
+
+# ดัชนีค้นหา — วิธีตัดคำภาษาไทย: 'ngram' (bigram, ไม่ต้องติดตั้งเพิ่ม) หรือ 'pythainlp'
+# เปลี่ยนค่าแล้วต้องรัน: python manage.py rebuild_search_index
+SEARCH_THAI_SEGMENTER = env('SEARCH_THAI_SEGMENTER', default='ngram')
+
+# รายงาน PDF — ลงทะเบียนฟอนต์ THSarabunNew และสร้างสไตล์ตอนเริ่ม process (AppConfig.ready)
+REPORTS_PDF_PRELOAD = env.bool('REPORTS_PDF_PRELOAD', default=True)
+# PDF รายโครงการแบบ ZIP — จำนวน process ที่ใช้ render (0 = เท่าจำนวน core)
+REPORTS_BUNDLE_WORKERS = env.int('REPORTS_BUNDLE_WORKERS', default=0)
+
+# Audit Log — จำนวนเดือนล่าสุดที่เก็บในตารางหลัก ที่เหลือย้ายไป AuditLogArchive
+AUDIT_LOG_RETENTION_MONTHS = env.int('AUDIT_LOG_RETENTION_MONTHS', default=12)
 
 # Authentication Backends
 AUTHENTICATION_BACKENDS = [
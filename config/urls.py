@@ -36,6 +36,8 @@ urlpatterns = [
     path('budget/', include('apps.budget.urls')),
     path('notifications/', include('apps.notifications.urls')),
     path('reports/', include('apps.reports.urls')),
+    path('search/', include('apps.search.urls')),
+    path('jobs/', include('apps.jobs.urls')),
     # Serve media files (IIS strips SCRIPT_NAME prefix ก่อนส่งมา Django)
     path('media/<path:path>', media_serve, {'document_root': settings.MEDIA_ROOT}),
 ]
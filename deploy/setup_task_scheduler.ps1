@@ -34,3 +34,30 @@ Register-ScheduledTask `
 Write-Host "Scheduled task '$taskName' registered successfully." -ForegroundColor Green
 Write-Host "To test immediately: Start-ScheduledTask -TaskName '$taskName'"
 Write-Host "To view logs:        Get-ScheduledTaskInfo -TaskName '$taskName'"
+
+# ── Archive audit logs (weekly, Sunday 02:00) ─────────────────────────
+# ย้าย audit log ของเดือนที่เก่ากว่า AUDIT_LOG_RETENTION_MONTHS ไปเก็บแบบบีบอัด
+# (คำสั่งทำซ้ำได้ — เดือนที่เก็บแล้วจะถูกข้าม)
+$archiveTask = "ProjectTracker-ArchiveAuditLogs"
+
+$archiveAction = New-ScheduledTaskAction `
+    -Execute $python `
+    -Argument "$manage archive_audit_logs" `
+    -WorkingDirectory $workDir
+
+$archiveTrigger = New-ScheduledTaskTrigger -Weekly -DaysOfWeek Sunday -At "02:00AM"
+
+$archiveSettings = New-ScheduledTaskSettingsSet `
+    -ExecutionTimeLimit (New-TimeSpan -Hours 1) `
+    -StartWhenAvailable $true
+
+Register-ScheduledTask `
+    -TaskName $archiveTask `
+    -Action $archiveAction `
+    -Trigger $archiveTrigger `
+    -Settings $archiveSettings `
+    -Principal $principal `
+    -Description "Archive closed months of audit logs (ProjectTracker)" `
+    -Force
+
+Write-Host "Scheduled task '$archiveTask' registered successfully." -ForegroundColor Green